@@ -0,0 +1,204 @@
+import argparse
+import time
+
+import db
+
+# Only approved loans (aliased l) with a start date and a term get a schedule
+SCHEDULED = """
+    l.status = 'Approved' AND l.duration_months > 0 AND l.loan_amount > 0
+    AND l.approved_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+"""
+
+SCHEDULED_LOANS = f"""
+    SELECT l.loan_id, CAST(ROUND(l.loan_amount * 100) AS INTEGER), l.interest_rate, l.duration_months, l.approved_date
+    FROM loans l
+    WHERE {SCHEDULED}
+"""
+
+# Each instalment with the principal due by then and what had been repaid by its
+# due date; repayments count against principal, as RepaymentService caps them
+SCHEDULE_VS_PAID = """
+    SELECT s.installment, s.due_date, s.due_paise, s.interest_paise, s.principal_paise, s.balance_paise,
+           SUM(s.principal_paise) OVER (ORDER BY s.installment ROWS UNBOUNDED PRECEDING),
+           (SELECT COALESCE(SUM(CAST(ROUND(r.repay_amount * 100) AS INTEGER)), 0)
+            FROM repayments r WHERE r.loan_id = s.loan_id AND r.repay_date <= s.due_date)
+    FROM loan_schedule s
+    WHERE s.loan_id = ?
+    ORDER BY s.installment
+"""
+
+
+def require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Loan schedules need the numpy package (pip install numpy)")
+    return numpy
+
+
+def build_schedules(principal_paise, annual_rate, months, start_dates):
+    """Amortize many loans at once into equal monthly instalments (EMI)
+
+    Takes one entry per loan: principal in paise, yearly interest rate in
+    percent, term in months and ISO start date. Returns flat arrays with one
+    element per instalment: (loan position, instalment number, due date,
+    due, interest, principal, balance after paying), amounts in paise.
+    Instalment k falls due k months after the start date, on the same day
+    of the month or the month's last day.
+    """
+    np = require_numpy()
+    principal = np.asarray(principal_paise, dtype=np.float64)
+    rate = monthly_rate(annual_rate)
+    months = np.asarray(months, dtype=np.int64)
+
+    # One element per instalment; `loan` points back at the loan's position
+    loan = np.repeat(np.arange(len(months)), months)
+    number = np.arange(len(loan)) - np.repeat(np.cumsum(months) - months, months) + 1
+    last = number == months[loan]
+
+    r, p, e = rate[loan], principal[loan], emi(principal, rate, months)[loan]
+    balance = np.maximum(np.rint(balance_after(p, r, e, number)), 0).astype(np.int64)
+    # The last instalment takes up the rounding so the principal parts add up to the loan
+    balance[last] = 0
+
+    opening = np.roll(balance, 1)
+    opening[number == 1] = np.rint(p[number == 1]).astype(np.int64)
+    principal_part = opening - balance
+    interest = np.rint(opening * r).astype(np.int64)
+
+    due_date = due_dates(np.array(start_dates, dtype='datetime64[D]')[loan], number)
+    return loan, number, due_date, principal_part + interest, interest, principal_part, balance
+
+
+def monthly_rate(annual_rate):
+    """Yearly interest rates in percent as monthly fractions"""
+    np = require_numpy()
+    return np.asarray(annual_rate, dtype=np.float64) / 1200
+
+
+def emi(principal, rate, months):
+    """Equal monthly instalment per loan: P r (1+r)^n / ((1+r)^n - 1), or P / n interest-free
+
+    rate is monthly (see monthly_rate); the result is unrounded, in the
+    principal's unit.
+    """
+    np = require_numpy()
+    interest_free = rate == 0
+    growth = (1 + rate) ** months
+    return np.where(interest_free, principal / months,
+                    principal * np.where(interest_free, 1.0, rate) * growth / np.where(interest_free, 1.0, growth - 1))
+
+
+def balance_after(principal, rate, instalment, number):
+    """Principal still owed after `number` instalments: P (1+r)^k - EMI ((1+r)^k - 1) / r
+
+    Unrounded, in the principal's unit; rate is monthly.
+    """
+    np = require_numpy()
+    interest_free = rate == 0
+    grown = (1 + rate) ** number
+    return np.where(interest_free, principal - instalment * number,
+                    principal * grown - instalment * (grown - 1) / np.where(interest_free, 1.0, rate))
+
+
+def instalments_repaid(principal, rate, instalment, months, repaid):
+    """Whole instalments whose principal parts `repaid` covers, oldest first (0 to months)
+
+    The inverse of balance_after: (1+r)^k = (EMI/r - balance) / (EMI/r - P).
+    """
+    np = require_numpy()
+    interest_free = rate == 0
+    safe_rate = np.where(interest_free, 1.0, rate)
+    remaining = np.maximum(principal - repaid, 0)
+    level = instalment / safe_rate
+    # The branch np.where does not pick may divide by zero or take a log of a negative
+    with np.errstate(divide='ignore', invalid='ignore'):
+        count = np.where(interest_free, repaid / instalment,
+                         np.log((level - remaining) / (level - principal)) / np.log1p(safe_rate))
+    # A little slack so a loan repaid exactly is not a floating point hair short
+    return np.clip(np.floor(count + 1e-9), 0, months).astype(np.int64)
+
+
+def due_dates(start, number):
+    """Due date of instalment `number` (datetime64[D]) for loans starting on `start`
+
+    That is `number` months after the start, on the same day of the month or
+    the month's last day if it is shorter.
+    """
+    np = require_numpy()
+    start_month = start.astype('datetime64[M]')
+    day = start - start_month.astype('datetime64[D]')
+    due_month = start_month + number
+    month_length = (due_month + 1).astype('datetime64[D]') - due_month.astype('datetime64[D]')
+    return due_month.astype('datetime64[D]') + np.minimum(day, month_length - 1)
+
+
+def regenerate(conn=None, loan_ids=None, missing_only=False):
+    """Rebuild loan_schedule for every scheduled loan, or only the given ones, and commit
+
+    With missing_only, loans that still have a schedule are left alone; the
+    loans triggers drop a loan's schedule whenever its terms change, so that
+    brings every schedule up to date. Returns the number of loans scheduled.
+    """
+    np = require_numpy()
+    conn = conn or db.get_connection()
+    cursor = conn.cursor()
+
+    sql, params = SCHEDULED_LOANS, []
+    if loan_ids is not None:
+        loan_ids = list(loan_ids)
+        sql += f" AND l.loan_id IN ({', '.join('?' * len(loan_ids))})"
+        params = loan_ids
+    if missing_only:
+        sql += " AND NOT EXISTS (SELECT 1 FROM loan_schedule s WHERE s.loan_id = l.loan_id)"
+    # In key order, so the schedule rows go into its primary key in order
+    cursor.execute(sql + " ORDER BY l.loan_id", params)
+    loans = cursor.fetchall()
+
+    try:
+        if loan_ids is None and not missing_only:
+            cursor.execute("DELETE FROM loan_schedule")
+        else:
+            cursor.executemany("DELETE FROM loan_schedule WHERE loan_id = ?", [(row[0],) for row in loans])
+        if loans:
+            ids, principal, rate, months, start = zip(*loans)
+            loan, number, due_date, due, interest, principal_part, balance = build_schedules(
+                principal, rate, months, [value[:10] for value in start])
+            # Instalments share few distinct due dates, so each is formatted once
+            day, position = np.unique(due_date, return_inverse=True)
+            due_text = np.array(np.datetime_as_string(day, unit='D').tolist(), dtype=object)[position]
+            cursor.executemany(
+                "INSERT INTO loan_schedule (loan_id, installment, due_date, due_paise, interest_paise, "
+                "principal_paise, balance_paise) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                zip(np.array(ids, dtype=object)[loan].tolist(), number.tolist(),
+                    due_text.tolist(), due.tolist(), interest.tolist(),
+                    principal_part.tolist(), balance.tolist()))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(loans)
+
+
+def schedule_vs_paid(loan_id, conn=None):
+    """The loan's instalments as (number, due date, due, interest, principal, balance,
+    principal due to date, repaid by the due date), in paise
+
+    Only reads, so it can run on a worker thread; build a missing schedule
+    first with regenerate() on the main connection, since a commit from a
+    worker would look like an outside change to the DataWatcher.
+    """
+    conn = conn or db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute(SCHEDULE_VS_PAID, (loan_id,))
+    return cursor.fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the repayment schedule of every approved loan")
+    parser.add_argument('--missing', action='store_true', help="only build schedules that do not exist yet")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = regenerate(missing_only=args.missing)
+    print(f"Scheduled {count} loans in {time.perf_counter() - start:.2f}s")
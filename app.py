@@ -0,0 +1,51 @@
+import tkinter as tk
+
+from dash import Dashboard
+from login import LoginSystem
+import startup
+
+
+class AppShell:
+    """Single-process navigation: one Tk root for the whole session
+
+    Login and dashboard are swapped as frames inside the same root instead of
+    relaunching Python, so imports, fonts, pooled connections, the task runner
+    and other warm caches survive a logout/login cycle.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.screen = None
+
+    def _clear(self):
+        for widget in self.root.winfo_children():
+            widget.destroy()
+
+    def show_login(self):
+        self._clear()
+        self.screen = LoginSystem(self.root, shell=self)
+        return self.screen
+
+    def show_dashboard(self, username):
+        self._clear()
+        self.screen = Dashboard(self.root, shell=self)
+        return self.screen
+
+    def show_member(self, username):
+        # Members get their own window on top of the login screen; the member
+        # module (and fpdf behind it) is only loaded when a member logs in
+        import member
+
+        window = tk.Toplevel(self.root)
+        window.geometry("1000x700")
+        window.title(f"Loan Management System - {username}")
+        return member.LoanManagement(window, "#F6DED8", "#D2665A")
+
+
+def main():
+    # python login.py --profile-startup reports import times and time to first frame
+    startup.launch(lambda root: AppShell(root).show_login())
+
+
+if __name__ == "__main__":
+    main()
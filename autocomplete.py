@@ -0,0 +1,191 @@
+import bisect
+import tkinter as tk
+
+import db
+
+# Suggestions shown under the entry, and how long typing must pause before they are looked up
+MAX_SUGGESTIONS = 10
+DEBOUNCE_MS = 150
+# Sorts after every other character, so prefix + LAST_CHAR bounds all strings starting with prefix
+LAST_CHAR = '\U0010ffff'
+# Keys that move around the entry without changing its text
+NAVIGATION_KEYS = ('Up', 'Down', 'Left', 'Right', 'Return', 'KP_Enter', 'Escape', 'Tab', 'Home', 'End',
+                   'Shift_L', 'Shift_R', 'Control_L', 'Control_R', 'Alt_L', 'Alt_R')
+
+
+class PrefixIndex:
+    """Case-insensitive prefix lookup over (label, value) pairs held in memory
+
+    Labels are kept casefolded in one sorted list, so a lookup is a binary
+    search plus the matches returned; value_of() is a dict lookup.
+    """
+
+    def __init__(self, items=()):
+        self.load(items)
+
+    def load(self, items):
+        # The first value wins when a label repeats, as a linear scan would have found it
+        self.values = {}
+        for label, value in items:
+            self.values.setdefault(label, value)
+        self.keys = sorted((label.casefold(), label) for label in self.values)
+
+    def matches(self, prefix, limit=MAX_SUGGESTIONS):
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(self.keys, (prefix,))
+        found = []
+        for key, label in self.keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            found.append(label)
+        return found
+
+    def value_of(self, label):
+        return self.values.get(label)
+
+    def __contains__(self, label):
+        return label in self.values
+
+    def __len__(self):
+        return len(self.values)
+
+
+class QuerySource:
+    """Prefix lookup straight from an indexed column, for tables too big to copy into memory
+
+    `column >= prefix AND column < prefix + LAST_CHAR` is an index range scan
+    (unlike LIKE, which SQLite only optimizes under case_sensitive_like), so
+    each keystroke reads just the rows it shows. Matching is case-sensitive,
+    as the column's index is.
+    """
+
+    def __init__(self, table, column, value_column=None, cursor=None):
+        self.table = table
+        self.column = column
+        self.value_column = value_column or column
+        self.cursor = cursor
+
+    def _cursor(self):
+        return self.cursor or db.get_cursor()
+
+    def matches(self, prefix, limit=MAX_SUGGESTIONS):
+        cursor = self._cursor()
+        cursor.execute(f"SELECT {self.column} FROM {self.table} WHERE {self.column} >= ? AND {self.column} < ? "
+                       f"ORDER BY {self.column} LIMIT ?", (prefix, prefix + LAST_CHAR, limit))
+        return [label for label, in cursor.fetchall()]
+
+    def value_of(self, label):
+        cursor = self._cursor()
+        cursor.execute(f"SELECT {self.value_column} FROM {self.table} WHERE {self.column} = ? LIMIT 1", (label,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, label):
+        cursor = self._cursor()
+        cursor.execute(f"SELECT 1 FROM {self.table} WHERE {self.column} = ? LIMIT 1", (label,))
+        return cursor.fetchone() is not None
+
+
+class AutocompleteEntry(tk.Entry):
+    """Entry that lists the source's matches for the typed prefix in a drop-down
+
+    Lookups run once typing pauses for DEBOUNCE_MS. Down/Up move through the
+    list, Return or a click picks a match, which fills the entry and calls
+    on_select(label, value). get() and textvariable work as on a plain Entry.
+    """
+
+    def __init__(self, master, source, on_select=None, limit=MAX_SUGGESTIONS, **options):
+        super().__init__(master, **options)
+        self.source = source
+        self.on_select = on_select
+        self.limit = limit
+        self.pending = None
+        self.popup = None
+        self.listbox = None
+
+        self.bind('<KeyRelease>', self.schedule_lookup, add='+')
+        self.bind('<Down>', lambda e: self.move_selection(1))
+        self.bind('<Up>', lambda e: self.move_selection(-1))
+        self.bind('<Return>', self.accept_selection, add='+')
+        self.bind('<KP_Enter>', self.accept_selection, add='+')
+        self.bind('<Escape>', lambda e: self.hide_popup(), add='+')
+        self.bind('<FocusOut>', lambda e: self.hide_popup(), add='+')
+        self.bind('<Destroy>', self.cancel_lookup, add='+')
+
+    def set(self, text):
+        self.delete(0, tk.END)
+        self.insert(0, text)
+
+    def schedule_lookup(self, event=None):
+        if event is not None and event.keysym in NAVIGATION_KEYS:
+            return
+        self.cancel_lookup()
+        self.pending = self.after(DEBOUNCE_MS, self.lookup)
+
+    def cancel_lookup(self, event=None):
+        if self.pending:
+            self.after_cancel(self.pending)
+            self.pending = None
+
+    def lookup(self):
+        self.pending = None
+        text = self.get().strip()
+        matches = self.source.matches(text, self.limit) if text else []
+        if matches and matches != [text]:
+            self.show_popup(matches)
+        else:
+            self.hide_popup()
+
+    def show_popup(self, matches):
+        if self.popup is None:
+            self.popup = tk.Toplevel(self)
+            self.popup.overrideredirect(True)
+            self.listbox = tk.Listbox(self.popup, font=self.cget('font'), activestyle='none',
+                                      exportselection=False, takefocus=0)
+            self.listbox.pack(fill=tk.BOTH, expand=True)
+            # Handled on press, before the Listbox class binding can take focus from the entry
+            self.listbox.bind('<ButtonPress-1>', self.click_selection)
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *matches)
+        self.listbox.config(height=len(matches))
+        self.popup.geometry(f"{self.winfo_width()}x{self.listbox.winfo_reqheight()}"
+                            f"+{self.winfo_rootx()}+{self.winfo_rooty() + self.winfo_height()}")
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def hide_popup(self):
+        if self.popup is not None:
+            self.popup.withdraw()
+
+    def popup_open(self):
+        return self.popup is not None and self.popup.winfo_viewable()
+
+    def move_selection(self, step):
+        if not self.popup_open():
+            self.lookup()
+            return 'break'
+        current = self.listbox.curselection()
+        index = min(max((current[0] + step) if current else 0, 0), self.listbox.size() - 1)
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return 'break'
+
+    def accept_selection(self, event=None):
+        if not self.popup_open():
+            return None
+        current = self.listbox.curselection()
+        self.choose(self.listbox.get(current[0] if current else 0))
+        return 'break'
+
+    def click_selection(self, event):
+        self.choose(self.listbox.get(self.listbox.nearest(event.y)))
+        return 'break'
+
+    def choose(self, label):
+        self.cancel_lookup()
+        self.hide_popup()
+        self.set(label)
+        self.icursor(tk.END)
+        if self.on_select:
+            self.on_select(label, self.source.value_of(label))
@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
+import changes
+import db
+from virtualtable import VirtualTable
 from datetime import datetime
 
 class BankAccountManagement:
@@ -19,22 +22,8 @@ class BankAccountManagement:
         self.refresh_table()
 
     def setup_db(self):
-        self.conn = sqlite3.connect('bankdb.db')
+        self.conn = db.get_connection()
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bank_accounts (
-                account_id TEXT PRIMARY KEY,
-                member_id TEXT NOT NULL CHECK (LENGTH(member_id) > 0),
-                account_holder_name TEXT NOT NULL CHECK (LENGTH(account_holder_name) > 0),
-                account_number TEXT NOT NULL UNIQUE CHECK (LENGTH(account_number) >= 10),
-                bank_name TEXT NOT NULL CHECK (LENGTH(bank_name) > 0),
-                ifsc_code TEXT NOT NULL CHECK (LENGTH(ifsc_code) = 11),
-                account_type TEXT NOT NULL CHECK (account_type IN ('Savings', 'Current', 'Joint')),
-                linked_mobile TEXT NOT NULL CHECK (linked_mobile GLOB '[6-9][0-9]{9}'),
-                verification_status TEXT NOT NULL CHECK (verification_status IN ('Pending', 'Verified', 'Rejected'))
-            )
-        ''')
-        self.conn.commit()
 
     def create_ui(self):
         for widget in self.parent.winfo_children():
@@ -91,6 +80,9 @@ class BankAccountManagement:
 
         self.tree.pack(pady=10, fill='x')
         self.tree.bind("<Double-1>", self.on_tree_select)
+        self.table_view = VirtualTable(self.tree, 'bank_accounts',
+                                       ['member_id', 'account_holder_name', 'account_number', 'bank_name', 'ifsc_code',
+                                        'account_type', 'linked_mobile', 'verification_status'], id_column='account_id')
 
     def generate_account_id(self):
         return f"ACC{int(datetime.now().timestamp())}"
@@ -108,17 +100,18 @@ class BankAccountManagement:
             values = tuple(data.values())
             self.cursor.execute(f"INSERT INTO bank_accounts ({columns}) VALUES ({placeholders})", values)
             self.conn.commit()
-            self.refresh_table()
+            changes.publish('bank_accounts', data['account_id'])
             messagebox.showinfo("Success", "Account added successfully")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
     def refresh_table(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        self.cursor.execute("SELECT member_id, account_holder_name, account_number, bank_name, ifsc_code, account_type, linked_mobile, verification_status FROM bank_accounts")
-        for row in self.cursor.fetchall():
-            self.tree.insert('', 'end', values=row)
+        self.table_view.reload()
+
+    def account_ids(self, member_id):
+        # Accounts are edited by member_id; the table view tracks them by account_id
+        self.cursor.execute("SELECT account_id FROM bank_accounts WHERE member_id = ?", (member_id,))
+        return [row[0] for row in self.cursor.fetchall()]
 
     def on_tree_select(self, event):
         selected = self.tree.selection()
@@ -145,9 +138,10 @@ class BankAccountManagement:
             data = self.get_form_data()
             values = list(data.values()) + [member_id]
             query = f"UPDATE bank_accounts SET {', '.join([f'{k}=?' for k in data])} WHERE member_id = ?"
+            account_ids = self.account_ids(member_id)
             self.cursor.execute(query, values)
             self.conn.commit()
-            self.refresh_table()
+            changes.publish('bank_accounts', *account_ids)
             messagebox.showinfo("Success", "Account updated successfully")
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -161,9 +155,10 @@ class BankAccountManagement:
         if confirm:
             values = self.tree.item(selected[0])['values']
             member_id = values[0]
+            account_ids = self.account_ids(member_id)
             self.cursor.execute("DELETE FROM bank_accounts WHERE member_id = ?", (member_id,))
             self.conn.commit()
-            self.refresh_table()
+            changes.publish('bank_accounts', *account_ids)
             messagebox.showinfo("Deleted", "Account deleted successfully")
 
 if __name__ == "__main__":
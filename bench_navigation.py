@@ -0,0 +1,93 @@
+import argparse
+import subprocess
+import sys
+import time
+import tkinter as tk
+
+# What each relaunch used to pay: a fresh interpreter that imports the screen
+# module, builds it on a new Tk root and draws it once
+RELAUNCH_SCRIPT = '''
+import tkinter as tk
+import {module}
+root = tk.Tk()
+{module}.{screen}(root)
+root.update()
+root.destroy()
+'''
+
+
+def relaunch_cycle():
+    """login -> dashboard -> logout the old way, one subprocess per screen"""
+    start = time.perf_counter()
+    for module, screen in (('login', 'LoginSystem'), ('dash', 'Dashboard'), ('login', 'LoginSystem')):
+        subprocess.run([sys.executable, '-c', RELAUNCH_SCRIPT.format(module=module, screen=screen)], check=True)
+    return time.perf_counter() - start
+
+
+def shell_cycles(cycles):
+    """login -> dashboard -> logout inside one process through AppShell"""
+    import app
+
+    root = tk.Tk()
+    shell = app.AppShell(root)
+    timings = []
+    try:
+        for _ in range(cycles):
+            start = time.perf_counter()
+            shell.show_login()
+            root.update()
+            shell.show_dashboard('selfhelpgroup')
+            root.update()
+            shell.show_login()
+            root.update()
+            timings.append(time.perf_counter() - start)
+    finally:
+        root.destroy()
+    return timings
+
+
+def tab_switches(cached, rounds):
+    """Time dashboard tab switches with the screen cache on or off (rebuild every visit)"""
+    import app
+    import dash
+
+    root = tk.Tk()
+    dashboard = app.AppShell(root).show_dashboard('selfhelpgroup')
+    if not cached:
+        dashboard.screens.capacity = 0
+    # Cycle through as many screens as the cache holds, as an operator would
+    keys = list(dash.SCREENS)[:dash.MAX_CACHED_SCREENS]
+    timings = []
+    try:
+        for _ in range(rounds):
+            for key in keys:
+                start = time.perf_counter()
+                dashboard.show_module(key)
+                root.update()
+                timings.append(time.perf_counter() - start)
+    finally:
+        root.destroy()
+    return timings
+
+
+def report(label, timings):
+    ordered = sorted(timings)
+    print(f"{label:<22} first {timings[0] * 1000:8.1f} ms   "
+          f"median {ordered[len(ordered) // 2] * 1000:8.1f} ms   over {len(timings)} runs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time login -> dashboard -> logout cycles and dashboard tab switches")
+    parser.add_argument('--cycles', type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        tk.Tk().destroy()
+    except tk.TclError as e:
+        sys.exit(f"A display is required to build the screens: {e}")
+
+    report("subprocess relaunch", [relaunch_cycle() for _ in range(args.cycles)])
+    report("in-process shell", shell_cycles(args.cycles))
+
+    report("tab switch, rebuild", tab_switches(False, args.cycles))
+    report("tab switch, cached", tab_switches(True, args.cycles))
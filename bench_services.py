@@ -0,0 +1,82 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import schema
+import services
+
+MEMBER = {
+    'first_name': 'Bench', 'last_name': 'Member', 'dob': '1990-01-01', 'gender': 'Female',
+    'account_status': 'Active', 'primary_phone': None, 'emergency_contact': 'Family',
+}
+CONTRIBUTION = {
+    'member_name': 'Bench Member', 'contribution_type': 'Monthly Savings', 'amount': '5000.00',
+    'payment_method': 'Cash', 'transaction_date': '2025-01-15', 'receipt_proof': '', 'status': 'Verified',
+}
+LOAN = {
+    'applicant_name': 'Bench Member', 'group_name': 'Bench Group', 'loan_amount': '1000', 'purpose': 'Benchmark',
+    'duration_months': '12', 'interest_rate': '12', 'status': 'Approved', 'rejection_reason': '',
+    'approved_date': '2025-01-01', 'funds_allocated': 0,
+}
+
+
+def workload(conn):
+    """The writes each round makes, as (label, service, function adding row i)"""
+    members = services.MemberService(conn)
+    contributions = services.ContributionService(conn)
+    loans = services.LoanService(conn)
+    repayments = services.RepaymentService(conn)
+    loan_ids = []
+
+    def add_member(i):
+        members.add(dict(MEMBER, primary_phone=f"9{i:09d}"))
+
+    def add_loan(i):
+        loan_ids.append(loans.add(LOAN))
+
+    def add_repayment(i):
+        repayments.add(loan_ids[i % len(loan_ids)], 10, f"2025-{i % 12 + 1:02d}-01")
+
+    return [
+        ('member registrations', members, add_member),
+        ('contributions', contributions, lambda i: contributions.add(CONTRIBUTION)),
+        ('loan approvals', loans, add_loan),
+        ('repayments', repayments, add_repayment),
+    ]
+
+
+def run(count, batched):
+    """Time `count` writes of each kind against a fresh database; one transaction per kind if batched"""
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    schema.apply_migrations(conn.cursor())
+    conn.commit()
+    try:
+        for label, service, add in workload(conn):
+            start = time.perf_counter()
+            if batched:
+                with service.batch():
+                    for i in range(count):
+                        add(i)
+            else:
+                for i in range(count):
+                    add(i)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<22} {'batched' if batched else 'one by one':<11} "
+                  f"{count / elapsed:10,.0f} per second   ({elapsed * 1000:8.1f} ms for {count})")
+    finally:
+        conn.close()
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the throughput of the service layer without a display")
+    parser.add_argument('--count', type=int, default=1000, help="writes of each kind per run")
+    args = parser.parse_args()
+
+    run(args.count, batched=False)
+    run(args.count, batched=True)
@@ -0,0 +1,319 @@
+import argparse
+import csv
+import re
+import time
+from datetime import date
+
+import contacts
+import dates
+import db
+import money
+import tasks
+
+# Valid rows are inserted this many at a time with executemany
+BATCH_SIZE = 1000
+
+
+def _required(value):
+    if not value:
+        raise ValueError("is required")
+    return value
+
+
+def _optional(value):
+    return value
+
+
+def _amount(value):
+    paise = money.to_paise(_required(value))
+    if paise <= 0:
+        raise ValueError(f"must be positive, got {value!r}")
+    # Store plain rupees so the generated paise column can CAST it ("1,000" would not)
+    return money.to_text(value)
+
+
+def _date(value):
+    return dates.to_iso(_required(value))
+
+
+def _date_or_today(value):
+    return dates.to_iso(value) if value else dates.today()
+
+
+def _choice(*options):
+    """Validator accepting the options in any letter case and storing them as written here"""
+    lookup = {option.lower(): option for option in options}
+
+    def check(value):
+        try:
+            return lookup[value.lower()]
+        except KeyError:
+            raise ValueError(f"must be one of {', '.join(options)}")
+    return check
+
+
+def _phone(value):
+    number = contacts.clean_phone(value)
+    if not re.fullmatch(r'\+?\d{7,15}', number):
+        raise ValueError(f"is not a phone number: {value!r}")
+    return number
+
+
+def _optional_phone(value):
+    return _phone(value) if value else None
+
+
+def _optional_email(value):
+    # NULL rather than '' so that any number of members can leave it blank under UNIQUE
+    if not value:
+        return None
+    if not re.fullmatch(r'[^@\s]+@[^@\s]+\.[^@\s]+', value):
+        raise ValueError(f"is not an email address: {value!r}")
+    return contacts.clean_email(value)
+
+
+# table -> (id column, prefix for generated ids, [(column, validator)], columns
+# that must be unique besides the id). The file header uses the column names,
+# and the id column may be left out or blank.
+TARGETS = {
+    'contributions': ('contribution_id', 'CNT', [
+        ('member_name', _required),
+        ('contribution_type', _required),
+        ('amount', _amount),
+        ('payment_method', _required),
+        ('transaction_date', _date),
+        ('receipt_proof', _optional),
+        ('status', _choice('Pending', 'Verified', 'Rejected')),
+    ], ()),
+    'credits': ('credit_id', 'CRD', [
+        ('member_name', _required),
+        ('credit_amount', _amount),
+        ('credit_date', _date),
+        ('credit_reason', _required),
+    ], ()),
+    'users': ('user_id', 'USR', [
+        ('first_name', _required),
+        ('last_name', _required),
+        ('dob', _date),
+        ('gender', _choice('Male', 'Female', 'Other')),
+        ('reg_date', _date_or_today),
+        ('account_status', _choice('Active', 'Inactive', 'Pending')),
+        ('primary_phone', _phone),
+        ('secondary_phone', _optional_phone),
+        ('email', _optional_email),
+        ('emergency_contact', _required),
+        ('street', _optional),
+        ('city', _optional),
+        ('state', _optional),
+        ('postal_code', _optional),
+        ('country', _optional),
+    ], ('primary_phone', 'email')),
+}
+
+# Validators whose column may be missing from the file altogether
+OPTIONAL_VALIDATORS = (_optional, _optional_phone, _optional_email, _date_or_today)
+
+
+class ImportReport:
+    """Outcome of one import: rows inserted, rejected rows with reasons, and whether it was cancelled"""
+
+    def __init__(self, table):
+        self.table = table
+        self.header = []
+        self.inserted = 0
+        self.errors = []
+        self.rejected = []
+        self.cancelled = False
+
+    def reject(self, line, values, message):
+        self.errors.append((line, message))
+        self.rejected.append(values)
+
+    def summary(self):
+        if self.cancelled:
+            return "Import cancelled, nothing was saved"
+        return f"{self.inserted} {self.table} imported, {len(self.errors)} rows rejected"
+
+    def write_rejects(self, path):
+        """Write the rejected rows as they were read, plus line and error columns
+
+        The extra columns are ignored on import, so the file can be fixed up
+        and imported again.
+        """
+        width = len(self.header)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.header + ['line', 'error'])
+            for values, (line, message) in zip(self.rejected, self.errors):
+                writer.writerow((list(values) + [''] * width)[:width] + [line, message])
+
+
+def _cell_text(value):
+    """Spreadsheet cell to the text a CSV file would have held"""
+    if value is None:
+        return ''
+    if isinstance(value, date):
+        return dates.to_iso(value)
+    if isinstance(value, float) and value.is_integer():
+        # Phone numbers and postal codes typed into Excel come back as floats
+        return str(int(value))
+    return str(value)
+
+
+def _csv_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        total = max(sum(1 for _ in f) - 1, 0)
+
+    def rows():
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            for values in reader:
+                yield reader.line_num, values
+    return total, rows()
+
+
+def _xlsx_rows(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Importing .xlsx files needs the openpyxl package; save the sheet as CSV instead")
+    # Read-only mode streams the sheet instead of loading every cell
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    sheet = workbook.active
+
+    def rows():
+        try:
+            for line, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+                yield line, [_cell_text(value) for value in values]
+        finally:
+            workbook.close()
+    return max((sheet.max_row or 1) - 1, 0), rows()
+
+
+def _read_header(rows, validators):
+    _, values = next(rows, (0, []))
+    header = [name.strip().lower() for name in values]
+    missing = [column for column, check in validators if check not in OPTIONAL_VALIDATORS and column not in header]
+    if missing:
+        raise ValueError(f"File is missing the column(s): {', '.join(missing)}")
+    return header
+
+
+def _insert_batch(cursor, table, columns, unique, batch, report):
+    """Drop rows whose unique values already exist, then insert the rest with one executemany
+
+    Each unique column is checked with a single IN (...) lookup, answered by
+    its primary key or UNIQUE index. Phone numbers and emails are compared
+    cleaned on both sides (see contacts.USER_KEYS), through expression indexes.
+    """
+    taken = set()
+    for column, index in unique.items():
+        values = [row[index] for _, _, row in batch if row[index] is not None]
+        if not values:
+            continue
+        key = contacts.USER_KEYS.get(column, column) if table == 'users' else column
+        cursor.execute(f"SELECT {key} FROM {table} WHERE {key} IN ({', '.join('?' * len(values))})", values)
+        taken.update((column, value) for value, in cursor.fetchall())
+
+    rows = []
+    for line, values, row in batch:
+        clash = next((column for column, index in unique.items() if (column, row[index]) in taken), None)
+        if clash:
+            report.reject(line, values, f"{clash} {row[unique[clash]]} already exists")
+        else:
+            rows.append(row)
+    cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+    report.inserted += len(rows)
+
+
+def import_file(path, table, conn=None, batch_size=BATCH_SIZE):
+    """Validate and insert every row of a CSV or .xlsx file in a single transaction
+
+    Rows that fail validation or repeat a unique value (earlier in the file
+    or already in the table) are recorded in the report and skipped; the
+    rest are committed together. Call it through the task runner to get
+    progress as (rows read, total rows) via tasks.report_progress() and to be
+    able to cancel, which rolls back.
+    """
+    id_column, prefix, validators, unique = TARGETS[table]
+    columns = [id_column] + [column for column, _ in validators]
+    # Unique column -> its position in the inserted row
+    unique = {column: columns.index(column) for column in (id_column,) + unique}
+    conn = conn or db.get_connection()
+    cursor = conn.cursor()
+    report = ImportReport(table)
+
+    total, rows = (_xlsx_rows if path.lower().endswith(('.xlsx', '.xlsm')) else _csv_rows)(path)
+    # Generated ids share one timestamp and differ by line
+    stamp = int(time.time())
+    seen = {column: set() for column in unique}
+    batch = []
+    try:
+        header = report.header = _read_header(rows, validators)
+        for line, values in rows:
+            if not any(v.strip() for v in values):
+                continue
+            record = {name: value.strip() for name, value in zip(header, values)}
+            try:
+                row = [record.get(id_column) or f"{prefix}{stamp}{line:07d}"]
+                for column, check in validators:
+                    try:
+                        row.append(check(record.get(column, '')))
+                    except ValueError as e:
+                        raise ValueError(f"{column}: {e}")
+            except ValueError as e:
+                report.reject(line, values, str(e))
+                continue
+            repeated = next((column for column, index in unique.items()
+                             if row[index] is not None and row[index] in seen[column]), None)
+            if repeated:
+                report.reject(line, values, f"{repeated} {row[unique[repeated]]} appears more than once in the file")
+                continue
+            for column, index in unique.items():
+                seen[column].add(row[index])
+            batch.append((line, values, row))
+
+            if len(batch) >= batch_size:
+                if tasks.cancelled():
+                    report.cancelled = True
+                    break
+                _insert_batch(cursor, table, columns, unique, batch, report)
+                batch = []
+                tasks.report_progress(line - 1, total)
+
+        # A cancel can arrive during the last, partial batch too (a small file has no other)
+        if batch and not report.cancelled and not tasks.cancelled():
+            _insert_batch(cursor, table, columns, unique, batch, report)
+        if report.cancelled or tasks.cancelled():
+            report.cancelled = True
+            conn.rollback()
+            report.inserted = 0
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        rows.close()
+
+    tasks.report_progress(total, total)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import members, contributions or credits from a CSV or .xlsx file")
+    parser.add_argument('table', choices=sorted(TARGETS))
+    parser.add_argument('file')
+    # --errors was the original name of this option
+    parser.add_argument('--rejects', '--errors', dest='rejects',
+                        help="write the rejected rows, with the reason, to this CSV file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = import_file(args.file, args.table)
+    print(f"{result.summary()} in {time.perf_counter() - start:.2f}s")
+    for line, message in result.errors[:20]:
+        print(f"  line {line}: {message}")
+    if args.rejects and result.errors:
+        result.write_rejects(args.rejects)
+        print(f"Rejected rows written to {args.rejects}")
@@ -0,0 +1,25 @@
+import weakref
+
+# table name -> weak references to callbacks taking a tuple of primary keys
+_subscribers = {}
+
+
+def subscribe(table, callback):
+    """Call back with the primary keys of rows written to a table
+
+    Bound methods are held weakly, so a destroyed screen stops receiving
+    notifications without having to unsubscribe.
+    """
+    ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+    _subscribers.setdefault(table, []).append(ref)
+
+
+def publish(table, *keys):
+    """Report that the rows with these primary keys were inserted, updated or deleted"""
+    if not keys:
+        return
+    for ref in list(_subscribers.get(table, [])):
+        callback = ref()
+        if callback is not None:
+            callback(keys)
+    _subscribers[table] = [ref for ref in _subscribers.get(table, []) if ref() is not None]
@@ -0,0 +1,37 @@
+# Characters people type inside phone numbers. They are dropped whenever a
+# number is stored or compared, so "98765 43210" and "98765-43210" are one number.
+PHONE_SEPARATORS = ' ().-'
+_DROP_SEPARATORS = str.maketrans('', '', PHONE_SEPARATORS)
+
+
+def clean_phone(value):
+    """Phone number text without separators"""
+    return str(value).strip().translate(_DROP_SEPARATORS)
+
+
+def clean_email(value):
+    """Email address lower-cased; None when blank, so UNIQUE lets many members leave it out"""
+    value = (value or '').strip()
+    return value.lower() or None
+
+
+def phone_key(column):
+    """SQL expression comparing a stored phone number the way clean_phone() writes it"""
+    expression = column
+    for separator in PHONE_SEPARATORS:
+        expression = f"replace({expression}, '{separator}', '')"
+    return expression
+
+
+def email_key(column):
+    """SQL expression comparing a stored email the way clean_email() writes it"""
+    return f"lower({column})"
+
+
+# Unique member contact columns -> the expression they are compared by. Rows
+# saved before numbers and emails were cleaned may still hold them as typed;
+# expression indexes in indexes.py answer these lookups.
+USER_KEYS = {
+    'primary_phone': phone_key('primary_phone'),
+    'email': email_key('email'),
+}
@@ -2,8 +2,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
 import sqlite3
-from datetime import datetime
-from fpdf import FPDF
+import contributiontrends
+import dates
+import db
+import importdialog
+import tasks
+from virtualtable import VirtualTable
+import services
 import os
 
 class ContributionManagement:
@@ -23,31 +28,9 @@ class ContributionManagement:
         self.refresh_credits_table()
 
     def setup_db(self):
-        self.conn = sqlite3.connect('contributiondb.db')
+        self.conn = db.get_connection()
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS contributions (
-                contribution_id TEXT PRIMARY KEY,
-                member_name TEXT NOT NULL,
-                contribution_type TEXT NOT NULL,
-                amount TEXT NOT NULL,
-                payment_method TEXT NOT NULL,
-                transaction_date TEXT NOT NULL,
-                receipt_proof TEXT,
-                status TEXT NOT NULL
-            )
-        ''')
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS credits (
-                credit_id TEXT PRIMARY KEY,
-                member_name TEXT NOT NULL,
-                credit_amount TEXT NOT NULL,
-                credit_date TEXT NOT NULL,
-                credit_reason TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
+        self.contribution_service = services.ContributionService(self.conn)
 
     def create_ui(self):
         for widget in self.parent.winfo_children():
@@ -120,7 +103,8 @@ class ContributionManagement:
 
             elif field_type == 'date':
                 date_entry = DateEntry(form_frame, width=20, font=self.entry_font, 
-                                     background='darkblue', foreground='white', borderwidth=2)
+                                     background='darkblue', foreground='white', borderwidth=2,
+                                     date_pattern=dates.DATE_PATTERN)
                 date_entry.grid(row=i, column=1, sticky='w', padx=5, pady=5)
                 self.entries[field] = date_entry
 
@@ -146,6 +130,10 @@ class ContributionManagement:
                  bg=self.fg_color, fg='white', **btn_cfg).pack(side='left', padx=10)
         tk.Button(button_frame, text="Generate PDF", command=self.generate_pdf, 
                  bg=self.fg_color, fg='white', **btn_cfg).pack(side='left', padx=10)
+        tk.Button(button_frame, text="Import File", command=lambda: self.import_file('contributions'),
+                 bg=self.fg_color, fg='white', **btn_cfg).pack(side='left', padx=10)
+        tk.Button(button_frame, text="Trends", command=self.open_trends,
+                 bg=self.fg_color, fg='white', **btn_cfg).pack(side='left', padx=10)
 
         # Contributions table
         self.tree = ttk.Treeview(self.left_scrollable_frame, 
@@ -156,6 +144,8 @@ class ContributionManagement:
             self.tree.column(col, width=100)
         self.tree.grid(row=2, column=0, padx=20, pady=10, sticky='nsew')
         self.tree.bind("<Double-1>", self.on_tree_select)
+        self.table_view = VirtualTable(self.tree, 'contributions', ['contribution_id', 'member_name', 'contribution_type', 'amount', 'payment_method', 'transaction_date', 'status'],
+                                       id_column='contribution_id')
 
         # Right side - Credits Management with scrollbar
         self.right_frame = tk.Frame(self.main_container, bg=self.bg_color, width=350)
@@ -194,7 +184,8 @@ class ContributionManagement:
         self.credit_amount.grid(row=1, column=1, sticky='w', padx=5, pady=5)
 
         tk.Label(credits_form, text="Date:", bg=self.bg_color).grid(row=2, column=0, sticky='e', padx=5, pady=5)
-        self.credit_date = DateEntry(credits_form, width=20, background='darkblue', foreground='white', borderwidth=2)
+        self.credit_date = DateEntry(credits_form, width=20, background='darkblue', foreground='white', borderwidth=2,
+                                     date_pattern=dates.DATE_PATTERN)
         self.credit_date.grid(row=2, column=1, sticky='w', padx=5, pady=5)
 
         tk.Label(credits_form, text="Reason:", bg=self.bg_color).grid(row=3, column=0, sticky='e', padx=5, pady=5)
@@ -214,6 +205,8 @@ class ContributionManagement:
                  bg=self.fg_color, fg='white', **btn_cfg).pack(side='left', padx=5)
         tk.Button(credit_buttons, text="Clear", command=self.clear_credit_form, 
                  bg=self.fg_color, fg='white', **btn_cfg).pack(side='left', padx=5)
+        tk.Button(credit_buttons, text="Import", command=lambda: self.import_file('credits'),
+                 bg=self.fg_color, fg='white', **btn_cfg).pack(side='left', padx=5)
 
         # Credits table
         credits_table_frame = tk.LabelFrame(self.right_scrollable_frame, text="Debits", 
@@ -227,6 +220,8 @@ class ContributionManagement:
             self.credits_tree.heading(col, text=col)
             self.credits_tree.column(col, width=80)
         self.credits_tree.pack(fill='x', padx=5, pady=5)
+        self.credits_view = VirtualTable(self.credits_tree, 'credits', ['credit_id', 'member_name', 'credit_amount', 'credit_date', 'credit_reason'],
+                                         id_column='credit_id')
         self.credits_tree.bind("<Double-1>", self.on_credit_tree_select)
 
         # Member credits calculation
@@ -257,6 +252,18 @@ class ContributionManagement:
         tk.Button(total_frame, text="Calculate Net Total", command=self.calculate_net_total, 
                  bg=self.fg_color, fg='white', font=self.button_font).pack(pady=5)
 
+    def import_file(self, table):
+        """Bulk import contributions or credits from a CSV or Excel file on a worker thread"""
+        view = self.table_view if table == 'contributions' else self.credits_view
+        importdialog.ask_and_import(self.parent, table, self.bg_color, self.fg_color, lambda report: view.reload())
+
+    def open_trends(self):
+        """Monthly collection trends, read from the contribution rollup"""
+        window = tk.Toplevel(self.parent, bg=self.bg_color)
+        window.title("Contribution Trends")
+        window.geometry("900x650")
+        contributiontrends.ContributionTrends(window, self.bg_color, self.fg_color)
+
     def browse_file(self, var):
         filepath = filedialog.askopenfilename()
         if filepath:
@@ -277,37 +284,20 @@ class ContributionManagement:
 
     def add_contribution(self):
         try:
-            contribution_id = f"CNT{int(datetime.now().timestamp())}"
+            contribution_id = self.contribution_service.add(self.get_form_data(include_id=False))
             self.entries['contribution_id'].config(state='normal')
             self.entries['contribution_id'].delete(0, tk.END)
             self.entries['contribution_id'].insert(0, contribution_id)
             self.entries['contribution_id'].config(state='disabled')
-
-            data = self.get_form_data()
-            columns = ', '.join(data.keys())
-            placeholders = ', '.join(['?'] * len(data))
-            values = tuple(data.values())
-
-            self.cursor.execute(f"INSERT INTO contributions ({columns}) VALUES ({placeholders})", values)
-            self.conn.commit()
-            self.refresh_table()
             messagebox.showinfo("Success", "Contribution added successfully")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
     def refresh_table(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        self.cursor.execute("SELECT contribution_id, member_name, contribution_type, amount, payment_method, transaction_date, status FROM contributions")
-        for row in self.cursor.fetchall():
-            self.tree.insert('', 'end', values=row)
+        self.table_view.reload()
 
     def refresh_credits_table(self):
-        for row in self.credits_tree.get_children():
-            self.credits_tree.delete(row)
-        self.cursor.execute("SELECT credit_id, member_name, credit_amount, credit_date, credit_reason FROM credits")
-        for row in self.cursor.fetchall():
-            self.credits_tree.insert('', 'end', values=row)
+        self.credits_view.reload()
 
     def on_tree_select(self, event):
         selected = self.tree.selection()
@@ -334,12 +324,7 @@ class ContributionManagement:
     def update_contribution(self):
         try:
             data = self.get_form_data()
-            contribution_id = data.pop('contribution_id')
-            values = list(data.values()) + [contribution_id]
-            query = f"UPDATE contributions SET {', '.join([f'{k}=?' for k in data])} WHERE contribution_id = ?"
-            self.cursor.execute(query, values)
-            self.conn.commit()
-            self.refresh_table()
+            self.contribution_service.update(data.pop('contribution_id'), data)
             messagebox.showinfo("Success", "Contribution updated successfully")
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -351,14 +336,23 @@ class ContributionManagement:
             return
         confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this record?")
         if confirm:
-            contribution_id = self.tree.item(selected[0])['values'][0]
-            self.cursor.execute("DELETE FROM contributions WHERE contribution_id = ?", (contribution_id,))
-            self.conn.commit()
-            self.refresh_table()
+            self.contribution_service.delete(self.tree.item(selected[0])['values'][0])
             messagebox.showinfo("Deleted", "Contribution deleted successfully")
 
     def generate_pdf(self):
         data = self.get_form_data()
+        filename = f"receipt_{data.get('contribution_id', 'unknown')}.pdf"
+        save_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")], initialfile=filename)
+        if save_path:
+            # Render off the UI thread; the message box waits for the file
+            tasks.get_runner(self.tree).submit(
+                self.write_receipt, data, save_path,
+                on_done=lambda path: messagebox.showinfo("Success", f"PDF generated and saved as {os.path.basename(path)}"))
+
+    def write_receipt(self, data, save_path):
+        """Render the contribution receipt to save_path (runs on a worker thread)"""
+        from fpdf import FPDF
+
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Arial", size=12)
@@ -369,11 +363,8 @@ class ContributionManagement:
         for key, value in data.items():
             pdf.cell(200, 10, txt=f"{key.replace('_', ' ').title()}: {value}", ln=True)
 
-        filename = f"receipt_{data.get('contribution_id', 'unknown')}.pdf"
-        save_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")], initialfile=filename)
-        if save_path:
-            pdf.output(save_path)
-            messagebox.showinfo("Success", f"PDF generated and saved as {os.path.basename(save_path)}")
+        pdf.output(save_path)
+        return save_path
 
     def on_credit_tree_select(self, event):
         selected = self.credits_tree.selection()
@@ -394,22 +385,12 @@ class ContributionManagement:
 
     def add_credit(self):
         try:
-            member_name = self.credit_member_name.get()
-            amount = self.credit_amount.get()
-            date = self.credit_date.get()
-            reason = self.credit_reason.get()
-
-            if not all([member_name, amount, date, reason]):
-                messagebox.showwarning("Input Error", "All fields are required")
-                return
-
-            credit_id = f"CRD{int(datetime.now().timestamp())}"
-            self.cursor.execute("INSERT INTO credits VALUES (?, ?, ?, ?, ?)",
-                               (credit_id, member_name, amount, date, reason))
-            self.conn.commit()
-            self.refresh_credits_table()
+            self.contribution_service.add_credit(self.credit_member_name.get(), self.credit_amount.get(),
+                                                 self.credit_date.get(), self.credit_reason.get())
             self.clear_credit_form()
             messagebox.showinfo("Success", "Debit added successfully")
+        except services.ServiceError as e:
+            messagebox.showwarning("Input Error", str(e))
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -420,25 +401,13 @@ class ContributionManagement:
             return
 
         try:
-            credit_id = self.credits_tree.item(selected[0])['values'][0]
-            member_name = self.credit_member_name.get()
-            amount = self.credit_amount.get()
-            date = self.credit_date.get()
-            reason = self.credit_reason.get()
-
-            if not all([member_name, amount, date, reason]):
-                messagebox.showwarning("Input Error", "All fields are required")
-                return
-
-            self.cursor.execute("""
-                UPDATE credits 
-                SET member_name=?, credit_amount=?, credit_date=?, credit_reason=?
-                WHERE credit_id=?
-            """, (member_name, amount, date, reason, credit_id))
-            self.conn.commit()
-            self.refresh_credits_table()
+            self.contribution_service.update_credit(self.credits_tree.item(selected[0])['values'][0],
+                                                    self.credit_member_name.get(), self.credit_amount.get(),
+                                                    self.credit_date.get(), self.credit_reason.get())
             self.clear_credit_form()
             messagebox.showinfo("Success", "Credit updated successfully")
+        except services.ServiceError as e:
+            messagebox.showwarning("Input Error", str(e))
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -450,10 +419,7 @@ class ContributionManagement:
 
         confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this credit?")
         if confirm:
-            credit_id = self.credits_tree.item(selected[0])['values'][0]
-            self.cursor.execute("DELETE FROM credits WHERE credit_id=?", (credit_id,))
-            self.conn.commit()
-            self.refresh_credits_table()
+            self.contribution_service.delete_credit(self.credits_tree.item(selected[0])['values'][0])
             self.clear_credit_form()
             messagebox.showinfo("Deleted", "Credit deleted successfully")
 
@@ -464,28 +430,15 @@ class ContributionManagement:
             return
 
         try:
-            self.cursor.execute("""
-                SELECT SUM(CAST(credit_amount AS REAL)) 
-                FROM credits 
-                WHERE member_name=?
-            """, (member_name,))
-            total = self.cursor.fetchone()[0] or 0
+            total = self.contribution_service.member_credits(member_name)
             self.member_credit_total.config(text=f"Total: ₹{total:,.2f}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to calculate credits: {str(e)}")
 
     def calculate_net_total(self):
         try:
-            # Calculate total verified contributions
-            self.cursor.execute("SELECT SUM(CAST(amount AS REAL)) FROM contributions WHERE status='Verified'")
-            total_contributions = self.cursor.fetchone()[0] or 0
-            
-            # Calculate total credits
-            self.cursor.execute("SELECT SUM(CAST(credit_amount AS REAL)) FROM credits")
-            total_credits = self.cursor.fetchone()[0] or 0
-            
-            # Calculate net total (contributions - credits)
-            net_total = total_contributions - total_credits
+            # Verified contributions less credits, from the fund ledger
+            net_total, total_contributions, total_credits = self.contribution_service.net_total()
             
             self.total_label.config(text=f"Net Total: ₹{net_total:,.2f}\n"
                                       f"(Contributions: ₹{total_contributions:,.2f}\n"
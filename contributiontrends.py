@@ -0,0 +1,114 @@
+import tkinter as tk
+from tkinter import ttk
+
+import changes
+import datawatch
+import db
+import money
+import tasks
+import trends
+
+# Month ranges offered for the chart
+MONTH_CHOICES = ('6', '12', '24', '36')
+
+
+class ContributionTrends:
+    """Monthly collections chart and table, read from the contribution rollup in the background"""
+
+    def __init__(self, parent, bg_color, fg_color):
+        self.parent = parent
+        self.bg_color = bg_color
+        self.fg_color = fg_color
+        self.label_font = ('Arial', 12)
+        self.button_font = ('Arial', 12, 'bold')
+
+        # Refresh still in flight, and the last trend shown (redrawn on resize)
+        self.task = None
+        self.trend = None
+
+        self.create_ui()
+        changes.subscribe('contributions', self.on_contributions_changed)
+        datawatch.get_watcher(self.tree).watch(db.get_connection(), self.refresh)
+        self.refresh()
+
+    def create_ui(self):
+        frame = tk.Frame(self.parent, bg=self.bg_color)
+        frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        controls = tk.Frame(frame, bg=self.bg_color)
+        controls.pack(fill=tk.X)
+        tk.Label(controls, text="Months:", font=self.label_font, bg=self.bg_color).pack(side=tk.LEFT)
+        self.months_var = tk.StringVar(value='12')
+        ttk.Combobox(controls, textvariable=self.months_var, values=MONTH_CHOICES, width=4,
+                     state='readonly').pack(side=tk.LEFT, padx=(5, 15))
+        tk.Label(controls, text="Split by:", font=self.label_font, bg=self.bg_color).pack(side=tk.LEFT)
+        self.by_var = tk.StringVar(value='Total')
+        ttk.Combobox(controls, textvariable=self.by_var, values=list(trends.BREAKDOWNS), width=15,
+                     state='readonly').pack(side=tk.LEFT, padx=(5, 15))
+        tk.Label(controls, text="Member:", font=self.label_font, bg=self.bg_color).pack(side=tk.LEFT)
+        self.member_entry = tk.Entry(controls, width=20, font=self.label_font)
+        self.member_entry.pack(side=tk.LEFT, padx=(5, 15))
+        tk.Button(controls, text="Refresh", command=self.refresh, font=self.button_font,
+                  bg=self.fg_color, fg='white', bd=0, padx=15).pack(side=tk.RIGHT)
+
+        self.status_label = tk.Label(frame, text="Loading trend...", font=self.label_font,
+                                     bg=self.bg_color, fg=self.fg_color)
+        self.status_label.pack(fill=tk.X, pady=5)
+
+        # Bars of the monthly totals
+        self.chart = tk.Canvas(frame, height=220, bg='white', highlightthickness=0)
+        self.chart.pack(fill=tk.X, pady=5)
+        self.chart.bind('<Configure>', lambda e: self.draw_chart())
+
+        table_frame = tk.Frame(frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        columns = [("Month", 100), ("Series", 200), ("Contributions", 120), ("Amount", 150)]
+        self.tree = ttk.Treeview(table_frame, columns=[name for name, _ in columns], show='headings', height=10)
+        for name, width in columns:
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=width, anchor='center')
+        scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def on_contributions_changed(self, keys):
+        self.refresh()
+
+    def refresh(self):
+        if self.task:
+            self.task.cancel()
+        self.task = tasks.get_runner(self.tree).submit(
+            trends.monthly_trend, int(self.months_var.get()), self.by_var.get(), self.member_entry.get().strip(),
+            on_done=self.show_trend, owner=self.tree,
+            on_error=lambda e: self.status_label.config(text=f"Trend unavailable: {str(e)}"))
+
+    def show_trend(self, trend):
+        self.trend = trend
+        totals = trend.totals()
+        self.status_label.config(text=f"{trend.months[0]} to {trend.months[-1]}: "
+                                      f"{money.format_rupees(sum(totals))} collected")
+        self.draw_chart()
+
+        self.tree.delete(*self.tree.get_children())
+        for i, month in enumerate(trend.months):
+            for name, values in sorted(trend.series.items()):
+                entries, paise = values[i]
+                if entries:
+                    self.tree.insert('', 'end', values=(month, name, entries, money.format_rupees(paise)))
+
+    def draw_chart(self):
+        self.chart.delete('all')
+        if self.trend is None:
+            return
+        totals = self.trend.totals()
+        width, height = self.chart.winfo_width(), int(self.chart['height'])
+        slot = max(width - 20, 1) / len(totals)
+        top = max(totals) or 1
+        for i, (month, paise) in enumerate(zip(self.trend.months, totals)):
+            x = 10 + i * slot
+            bar = (height - 40) * paise / top
+            self.chart.create_rectangle(x + slot * 0.15, height - 20 - bar, x + slot * 0.85, height - 20,
+                                        fill=self.fg_color, outline='')
+            # Month as MM/YY under the bar
+            self.chart.create_text(x + slot / 2, height - 10, text=f"{month[5:]}/{month[2:4]}", font=('Arial', 8))
@@ -2,8 +2,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
 import sqlite3
+import changes
+import dates
+import db
+import tasks
+from virtualtable import VirtualTable
+import money
 from datetime import datetime
-from fpdf import FPDF
 import os
 
 class ContributionManagement:
@@ -23,31 +28,8 @@ class ContributionManagement:
         self.refresh_credits_table()
 
     def setup_db(self):
-        self.conn = sqlite3.connect('contributiondb.db')
+        self.conn = db.get_connection()
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS contributions (
-                contribution_id TEXT PRIMARY KEY,
-                member_name TEXT NOT NULL,
-                contribution_type TEXT NOT NULL,
-                amount TEXT NOT NULL,
-                payment_method TEXT NOT NULL,
-                transaction_date TEXT NOT NULL,
-                receipt_proof TEXT,
-                status TEXT NOT NULL
-            )
-        ''')
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS credits (
-                credit_id TEXT PRIMARY KEY,
-                member_name TEXT NOT NULL,
-                credit_amount TEXT NOT NULL,
-                credit_date TEXT NOT NULL,
-                credit_reason TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
 
     def create_ui(self):
         for widget in self.parent.winfo_children():
@@ -120,7 +102,8 @@ class ContributionManagement:
 
             elif field_type == 'date':
                 date_entry = DateEntry(form_frame, width=20, font=self.entry_font, 
-                                     background='darkblue', foreground='white', borderwidth=2)
+                                     background='darkblue', foreground='white', borderwidth=2,
+                                     date_pattern=dates.DATE_PATTERN)
                 date_entry.grid(row=i, column=1, sticky='w', padx=5, pady=5)
                 self.entries[field] = date_entry
 
@@ -156,6 +139,8 @@ class ContributionManagement:
             self.tree.column(col, width=100)
         self.tree.grid(row=2, column=0, padx=20, pady=10, sticky='nsew')
         self.tree.bind("<Double-1>", self.on_tree_select)
+        self.table_view = VirtualTable(self.tree, 'contributions', ['contribution_id', 'member_name', 'contribution_type', 'amount', 'payment_method', 'transaction_date', 'status'],
+                                       id_column='contribution_id')
 
         # Right side - Credits Management with scrollbar
         self.right_frame = tk.Frame(self.main_container, bg=self.bg_color, width=350)
@@ -194,7 +179,8 @@ class ContributionManagement:
         self.credit_amount.grid(row=1, column=1, sticky='w', padx=5, pady=5)
 
         tk.Label(credits_form, text="Date:", bg=self.bg_color).grid(row=2, column=0, sticky='e', padx=5, pady=5)
-        self.credit_date = DateEntry(credits_form, width=20, background='darkblue', foreground='white', borderwidth=2)
+        self.credit_date = DateEntry(credits_form, width=20, background='darkblue', foreground='white', borderwidth=2,
+                                     date_pattern=dates.DATE_PATTERN)
         self.credit_date.grid(row=2, column=1, sticky='w', padx=5, pady=5)
 
         tk.Label(credits_form, text="Reason:", bg=self.bg_color).grid(row=3, column=0, sticky='e', padx=5, pady=5)
@@ -227,6 +213,8 @@ class ContributionManagement:
             self.credits_tree.heading(col, text=col)
             self.credits_tree.column(col, width=80)
         self.credits_tree.pack(fill='x', padx=5, pady=5)
+        self.credits_view = VirtualTable(self.credits_tree, 'credits', ['credit_id', 'member_name', 'credit_amount', 'credit_date', 'credit_reason'],
+                                         id_column='credit_id')
         self.credits_tree.bind("<Double-1>", self.on_credit_tree_select)
 
         # Member credits calculation
@@ -284,30 +272,24 @@ class ContributionManagement:
             self.entries['contribution_id'].config(state='disabled')
 
             data = self.get_form_data()
+            # Store plain rupees; the generated paise column cannot CAST "1,000" or "₹500"
+            data['amount'] = money.to_text(data['amount'])
             columns = ', '.join(data.keys())
             placeholders = ', '.join(['?'] * len(data))
             values = tuple(data.values())
 
             self.cursor.execute(f"INSERT INTO contributions ({columns}) VALUES ({placeholders})", values)
             self.conn.commit()
-            self.refresh_table()
+            changes.publish('contributions', contribution_id)
             messagebox.showinfo("Success", "Contribution added successfully")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
     def refresh_table(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        self.cursor.execute("SELECT contribution_id, member_name, contribution_type, amount, payment_method, transaction_date, status FROM contributions")
-        for row in self.cursor.fetchall():
-            self.tree.insert('', 'end', values=row)
+        self.table_view.reload()
 
     def refresh_credits_table(self):
-        for row in self.credits_tree.get_children():
-            self.credits_tree.delete(row)
-        self.cursor.execute("SELECT credit_id, member_name, credit_amount, credit_date, credit_reason FROM credits")
-        for row in self.cursor.fetchall():
-            self.credits_tree.insert('', 'end', values=row)
+        self.credits_view.reload()
 
     def on_tree_select(self, event):
         selected = self.tree.selection()
@@ -334,12 +316,14 @@ class ContributionManagement:
     def update_contribution(self):
         try:
             data = self.get_form_data()
+            # Store plain rupees; the generated paise column cannot CAST "1,000" or "₹500"
+            data['amount'] = money.to_text(data['amount'])
             contribution_id = data.pop('contribution_id')
             values = list(data.values()) + [contribution_id]
             query = f"UPDATE contributions SET {', '.join([f'{k}=?' for k in data])} WHERE contribution_id = ?"
             self.cursor.execute(query, values)
             self.conn.commit()
-            self.refresh_table()
+            changes.publish('contributions', contribution_id)
             messagebox.showinfo("Success", "Contribution updated successfully")
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -354,11 +338,23 @@ class ContributionManagement:
             contribution_id = self.tree.item(selected[0])['values'][0]
             self.cursor.execute("DELETE FROM contributions WHERE contribution_id = ?", (contribution_id,))
             self.conn.commit()
-            self.refresh_table()
+            changes.publish('contributions', contribution_id)
             messagebox.showinfo("Deleted", "Contribution deleted successfully")
 
     def generate_pdf(self):
         data = self.get_form_data()
+        filename = f"receipt_{data.get('contribution_id', 'unknown')}.pdf"
+        save_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")], initialfile=filename)
+        if save_path:
+            # Render off the UI thread; the message box waits for the file
+            tasks.get_runner(self.tree).submit(
+                self.write_receipt, data, save_path,
+                on_done=lambda path: messagebox.showinfo("Success", f"PDF generated and saved as {os.path.basename(path)}"))
+
+    def write_receipt(self, data, save_path):
+        """Render the contribution receipt to save_path (runs on a worker thread)"""
+        from fpdf import FPDF
+
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Arial", size=12)
@@ -369,11 +365,8 @@ class ContributionManagement:
         for key, value in data.items():
             pdf.cell(200, 10, txt=f"{key.replace('_', ' ').title()}: {value}", ln=True)
 
-        filename = f"receipt_{data.get('contribution_id', 'unknown')}.pdf"
-        save_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")], initialfile=filename)
-        if save_path:
-            pdf.output(save_path)
-            messagebox.showinfo("Success", f"PDF generated and saved as {os.path.basename(save_path)}")
+        pdf.output(save_path)
+        return save_path
 
     def on_credit_tree_select(self, event):
         selected = self.credits_tree.selection()
@@ -402,12 +395,14 @@ class ContributionManagement:
             if not all([member_name, amount, date, reason]):
                 messagebox.showwarning("Input Error", "All fields are required")
                 return
+            # Store plain rupees; the generated paise column cannot CAST "1,000" or "₹500"
+            amount = money.to_text(amount)
 
             credit_id = f"CRD{int(datetime.now().timestamp())}"
             self.cursor.execute("INSERT INTO credits VALUES (?, ?, ?, ?, ?)",
                                (credit_id, member_name, amount, date, reason))
             self.conn.commit()
-            self.refresh_credits_table()
+            changes.publish('credits', credit_id)
             self.clear_credit_form()
             messagebox.showinfo("Success", "Credit added successfully")
         except Exception as e:
@@ -429,6 +424,8 @@ class ContributionManagement:
             if not all([member_name, amount, date, reason]):
                 messagebox.showwarning("Input Error", "All fields are required")
                 return
+            # Store plain rupees; the generated paise column cannot CAST "1,000" or "₹500"
+            amount = money.to_text(amount)
 
             self.cursor.execute("""
                 UPDATE credits 
@@ -436,7 +433,7 @@ class ContributionManagement:
                 WHERE credit_id=?
             """, (member_name, amount, date, reason, credit_id))
             self.conn.commit()
-            self.refresh_credits_table()
+            changes.publish('credits', credit_id)
             self.clear_credit_form()
             messagebox.showinfo("Success", "Credit updated successfully")
         except Exception as e:
@@ -453,7 +450,7 @@ class ContributionManagement:
             credit_id = self.credits_tree.item(selected[0])['values'][0]
             self.cursor.execute("DELETE FROM credits WHERE credit_id=?", (credit_id,))
             self.conn.commit()
-            self.refresh_credits_table()
+            changes.publish('credits', credit_id)
             self.clear_credit_form()
             messagebox.showinfo("Deleted", "Credit deleted successfully")
 
@@ -465,11 +462,11 @@ class ContributionManagement:
 
         try:
             self.cursor.execute("""
-                SELECT SUM(CAST(credit_amount AS REAL)) 
+                SELECT SUM(credit_amount_paise) 
                 FROM credits 
                 WHERE member_name=?
             """, (member_name,))
-            total = self.cursor.fetchone()[0] or 0
+            total = money.to_rupees(self.cursor.fetchone()[0])
             self.member_credit_total.config(text=f"Total: ₹{total:,.2f}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to calculate credits: {str(e)}")
@@ -477,12 +474,12 @@ class ContributionManagement:
     def calculate_net_total(self):
         try:
             # Calculate total verified contributions
-            self.cursor.execute("SELECT SUM(CAST(amount AS REAL)) FROM contributions WHERE status='Verified'")
-            total_contributions = self.cursor.fetchone()[0] or 0
+            self.cursor.execute("SELECT SUM(amount_paise) FROM contributions WHERE status='Verified'")
+            total_contributions = money.to_rupees(self.cursor.fetchone()[0])
             
             # Calculate total credits
-            self.cursor.execute("SELECT SUM(CAST(credit_amount AS REAL)) FROM credits")
-            total_credits = self.cursor.fetchone()[0] or 0
+            self.cursor.execute("SELECT SUM(credit_amount_paise) FROM credits")
+            total_credits = money.to_rupees(self.cursor.fetchone()[0])
             
             # Calculate net total (contributions - credits)
             net_total = total_contributions - total_credits
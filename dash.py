@@ -1,13 +1,101 @@
-import subprocess
+import importlib
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import ttk, messagebox
 from tkinter.font import Font
-from PIL import Image, ImageTk
 import os
 
+import datawatch
+import db
+import icons
+import loansummary
+import metrics
+import search
+import tasks
+
+# Management screens: key -> (module, class, takes colours, name used in load errors)
+SCREENS = {
+    'users': ('user', 'UserManagement', True, 'user'),
+    'complaints': ('loanapplication', 'LoanManagementSystem', True, 'loanapplication'),
+    'staff': ('staff', 'StaffManagement', True, 'staff'),
+    'events': ('event', 'EventManagement', True, 'event'),
+    'contributions': ('contribution', 'ContributionManagement', True, 'contribution'),
+    'loanpayments': ('loandemo', 'LoanManagement', True, 'loan'),
+    'loanrepayments': ('loanrepayment', 'LoanRepaymentSystem', False, 'loan repayment'),
+    'bankinfo': ('bank', 'BankAccountManagement', True, 'bank'),
+    'portfoliorisk': ('portfoliorisk', 'PortfolioRisk', True, 'portfolio risk'),
+}
+
+# Screen that opens a search hit of each kind
+SEARCH_SCREENS = {'user': 'users', 'staff': 'staff', 'event': 'events', 'loan': 'loanpayments'}
+# Pause after the last keystroke before searching
+SEARCH_DELAY_MS = 150
+
+# KPIs shown under each tile's title, from the metrics cache
+TILE_KPIS = {
+    'users': ('active_members',),
+    'contributions': ('monthly_collections',),
+    'loanpayment': ('pending_loans', 'fund_balance'),
+}
+
+# Screens kept alive after a visit; the least recently used beyond this are destroyed
+MAX_CACHED_SCREENS = 4
+
+
+class ScreenCache:
+    """Builds each management screen once and swaps them with pack_forget
+
+    A screen shown again is not rebuilt: its tables are kept current through
+    changes.publish, and its on_show() hook (if any) does the rest of the
+    refresh. With capacity 0 every visit rebuilds, as the dashboard used to.
+    """
+
+    def __init__(self, container, capacity=MAX_CACHED_SCREENS):
+        self.container = container
+        self.capacity = capacity
+        self.screens = OrderedDict()
+        self.current = None
+        self.disposable = None
+
+    def show_frame(self, frame, disposable=False):
+        """Show a frame in place of the current one; disposable frames are destroyed when left"""
+        previous = self.current
+        if previous is not None and previous is not frame and previous.winfo_exists():
+            if previous is self.disposable:
+                previous.destroy()
+            else:
+                previous.pack_forget()
+        frame.pack(fill="both", expand=True)
+        self.current = frame
+        self.disposable = frame if disposable else None
+
+    def show(self, key, build):
+        """Show the screen for key, calling build(host_frame) only if it is not cached"""
+        if key in self.screens:
+            self.screens.move_to_end(key)
+            host, screen = self.screens[key]
+            self.show_frame(host)
+            on_show = getattr(screen, 'on_show', None)
+            if on_show:
+                on_show()
+            return screen
+
+        host = tk.Frame(self.container, bg=self.container['bg'])
+        self.show_frame(host, disposable=True)
+        screen = build(host)
+        if self.capacity > 0:
+            while len(self.screens) >= self.capacity:
+                _, (old_host, _) = self.screens.popitem(last=False)
+                old_host.destroy()
+            self.screens[key] = (host, screen)
+            self.disposable = None
+        return screen
+
+
 class Dashboard:
-    def __init__(self, root):
+    def __init__(self, root, shell=None):
         self.root = root
+        self.shell = shell
         self.root.title("Self Help Group Management System - Dashboard")
         self.root.geometry("{0}x{1}+0+0".format(root.winfo_screenwidth(), root.winfo_screenheight()))
         self.root.configure(bg="#F6DED8")  # Background color
@@ -39,51 +127,13 @@ class Dashboard:
         self.main_container.pack(fill="both", expand=True)
         
     def load_icons(self):
-        """Create proper image icons with text"""
-        icon_size = (64, 64)
-        icon_bg = (246, 222, 216)  # RGB for #F6DED8
-        
-        # Dictionary of icons with their Unicode characters
-        icon_chars = {
-            "users": "👥",
-            "complaints": "📝",
-            "staff": "👨‍💼",
-            "member": "👤",
-            "events": "📅",
-            "contributions": "💰",
-            "loanpayment": "🏦",
-            "bankinfo": "🏛️",
-            "loanrepayment": "💵"
-        }
-        
-        self.icons = {}
-        
-        # Try to load image icons
+        """Load the tile icons from the on-disk atlas, rendering it on first run"""
         try:
-            for key, char in icon_chars.items():
-                # Create image with white background
-                img = Image.new('RGB', icon_size, color=icon_bg)
-                draw = ImageDraw.Draw(img)
-                
-                # Use a font that supports these characters
-                try:
-                    font = ImageFont.truetype("arial.ttf", 32)
-                except:
-                    font = ImageFont.load_default()
-                
-                # Calculate text position (centered)
-                text_width, text_height = draw.textsize(char, font=font)
-                position = ((icon_size[0] - text_width) // 2, (icon_size[1] - text_height) // 2)
-                
-                # Draw the text
-                draw.text(position, char, font=font, fill=(0, 0, 0))  # Black text
-                
-                # Convert to PhotoImage
-                self.icons[key] = ImageTk.PhotoImage(img)
+            self.icons = icons.load_icons(self.root, icons.DASHBOARD_ICONS, 64, "white")
         except Exception as e:
             print(f"Error creating icons: {e}")
-            # Fallback to Unicode characters if image creation fails
-            self.icons = icon_chars
+            # Fallback to Unicode characters if the atlas cannot be rendered or read
+            self.icons = dict(icons.DASHBOARD_ICONS)
     
     def create_header(self):
         header_frame = tk.Frame(self.main_container, bg=self.fg_color)
@@ -97,6 +147,71 @@ class Dashboard:
                             font=self.button_font, fg="white", bg=self.fg_color)
         user_label.pack(side="right", padx=20, pady=10)
         
+        # Busy indicator while background jobs (reports, refreshes) are running
+        busy_label = tk.Label(header_frame, text="", font=self.button_font, fg="white", bg=self.fg_color)
+        busy_label.pack(side="right", padx=20, pady=10)
+        tasks.get_runner(self.root).add_busy_listener(
+            lambda busy: busy_label.config(text="Working..." if busy else ""))
+
+        self.create_search(header_frame)
+
+    def create_search(self, header_frame):
+        """Search box in the header; hits from every module are listed under the header"""
+        self.search_var = tk.StringVar()
+        self.search_job = None
+        self.search_hits = []
+
+        search_entry = tk.Entry(header_frame, textvariable=self.search_var, font=self.button_font, width=30)
+        search_entry.pack(side="right", padx=10, pady=10, ipady=3)
+        tk.Label(header_frame, text="Search:", font=self.button_font, fg="white", bg=self.fg_color).pack(side="right")
+        search_entry.bind("<KeyRelease>", lambda e: self.schedule_search())
+        search_entry.bind("<Return>", lambda e: self.open_search_hit(0))
+        search_entry.bind("<Escape>", lambda e: self.clear_search())
+
+        # Packed below the header only while there are hits to show
+        self.search_header = header_frame
+        self.search_frame = tk.Frame(self.main_container, bg=self.bg_color)
+        self.search_list = tk.Listbox(self.search_frame, font=self.button_font, height=8, activestyle="none")
+        self.search_list.pack(fill="x", padx=10)
+        self.search_list.bind("<Double-1>", lambda e: self.open_selected_hit())
+        self.search_list.bind("<Return>", lambda e: self.open_selected_hit())
+
+    def schedule_search(self):
+        if self.search_job:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        self.search_hits = search.search(self.search_var.get())
+        self.search_list.delete(0, tk.END)
+        for kind, key, title, snippet in self.search_hits:
+            self.search_list.insert(tk.END, f"{search.KIND_LABELS[kind]:<8} {title}   {snippet}")
+        if self.search_hits:
+            self.search_frame.pack(fill="x", after=self.search_header)
+        else:
+            self.search_frame.pack_forget()
+
+    def clear_search(self):
+        self.search_var.set("")
+        self.run_search()
+
+    def open_selected_hit(self):
+        selection = self.search_list.curselection()
+        if selection:
+            self.open_search_hit(selection[0])
+
+    def open_search_hit(self, index):
+        """Open the screen a hit belongs to and select its row there"""
+        if index >= len(self.search_hits):
+            return
+        kind, key, _, _ = self.search_hits[index]
+        self.search_frame.pack_forget()
+        screen = self.show_module(SEARCH_SCREENS[kind])
+        table_view = getattr(screen, 'table_view', None)
+        if table_view is not None:
+            table_view.show_row(key)
+        
     def create_navigation(self):
         nav_frame = tk.Frame(self.main_container, bg=self.bg_color)
         nav_frame.pack(fill="x", padx=10, pady=5)
@@ -112,6 +227,7 @@ class Dashboard:
             ("Loan Approvals", self.show_loanpayments),
             ("Loan Repayments", self.show_loanrepayments),
             ("Bank Info", self.show_bankinfo),
+            ("Portfolio Risk", self.show_portfoliorisk),
             ("Logout", self.logout)
         ]
         
@@ -127,13 +243,17 @@ class Dashboard:
     def create_main_content(self):
         self.content_frame = tk.Frame(self.main_container, bg=self.bg_color)
         self.content_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        self.screens = ScreenCache(self.content_frame)
+        datawatch.get_watcher(self.root).watch(db.get_connection(), self.on_external_change)
         
         # Create dashboard sections
+        self.home_frame = tk.Frame(self.content_frame, bg=self.bg_color)
         self.create_dashboard_sections()
+        self.screens.show_frame(self.home_frame)
         
     def create_dashboard_sections(self):
         # Clear existing content
-        for widget in self.content_frame.winfo_children():
+        for widget in self.home_frame.winfo_children():
             widget.destroy()
         
         # Create a grid of sections
@@ -145,9 +265,12 @@ class Dashboard:
             ("Contributions", "contributions", self.show_contributions),
             ("Loan Approvals", "loanpayment", self.show_loanpayments),
             ("Loan Repayments", "loanrepayment", self.show_loanrepayments),
-            ("Bank Info", "bankinfo", self.show_bankinfo)
+            ("Bank Info", "bankinfo", self.show_bankinfo),
+            ("Portfolio Risk", "portfoliorisk", self.show_portfoliorisk)
         ]
         
+        self.kpi_labels = {}
+
         # Calculate grid layout
         cols = 4
         rows = (len(sections) + cols - 1) // cols
@@ -156,7 +279,7 @@ class Dashboard:
             row = i // cols
             col = i % cols
             
-            section_frame = tk.Frame(self.content_frame, bg="white", bd=2, relief="groove")
+            section_frame = tk.Frame(self.home_frame, bg="white", bd=2, relief="groove")
             section_frame.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
             section_frame.bind("<Button-1>", lambda e, c=command: c())
             
@@ -173,275 +296,120 @@ class Dashboard:
             title_label = tk.Label(section_frame, text=title, 
                                   font=self.section_font, bg="white")
             title_label.pack(pady=(0, 15))
+
+            if icon_key in TILE_KPIS:
+                title_label.pack_configure(pady=0)
+                kpi_label = tk.Label(section_frame, font=self.button_font, bg="white", fg=self.active_color)
+                kpi_label.pack(pady=(2, 15))
+                kpi_label.bind("<Button-1>", lambda e, c=command: c())
+                self.kpi_labels[icon_key] = kpi_label
             
             # Configure grid weights
-            self.content_frame.grid_columnconfigure(col, weight=1)
-            self.content_frame.grid_rowconfigure(row, weight=1)
+            self.home_frame.grid_columnconfigure(col, weight=1)
+            self.home_frame.grid_rowconfigure(row, weight=1)
+
+        # Loan summary strip, shared with the Loan Approvals screen and filled in the background
+        self.summary_label = tk.Label(self.home_frame, text="Loading loan summary...",
+                                      font=self.button_font, bg=self.bg_color, fg=self.active_color)
+        self.summary_label.grid(row=rows, column=0, columnspan=cols, pady=(10, 0))
+        self.refresh_loan_summary()
+        self.refresh_kpis()
+
+    def refresh_kpis(self):
+        """Fill in the tile KPIs; only those whose tables changed since last time are queried"""
+        for icon_key, label in self.kpi_labels.items():
+            try:
+                label.config(text="\n".join(metrics.get(key) for key in TILE_KPIS[icon_key]))
+            except Exception as e:
+                # The tile itself shows the failure, like the loan summary strip
+                label.config(text=f"Unavailable: {str(e)}", wraplength=200)
+
+    def refresh_loan_summary(self):
+        tasks.get_runner(self.root).submit(
+            loansummary.summary_text, owner=self.summary_label,
+            on_done=lambda text: self.summary_label.config(text=text),
+            on_error=lambda e: self.summary_label.config(text=f"Loan summary unavailable: {str(e)}"))
     
+    def on_external_change(self):
+        """Another connection wrote to the database: refresh whatever is on screen
+
+        Screen tables refresh themselves (see VirtualTable.refresh); this
+        covers the home tiles and the rest of the current screen.
+        """
+        metrics.clear()
+        if self.screens.current is self.home_frame:
+            self.refresh_loan_summary()
+            self.refresh_kpis()
+            return
+        for host, screen in self.screens.screens.values():
+            if host is self.screens.current and hasattr(screen, 'on_show'):
+                screen.on_show()
+
     # Section display methods
     def show_dashboard(self):
-        self.create_dashboard_sections()
-   
-    def show_users(self):
-        self.clear_content()
-    
+        self.screens.show_frame(self.home_frame)
+        self.refresh_loan_summary()
+        self.refresh_kpis()
+
+    def show_module(self, key):
+        """Show a management screen, building it on first use and reusing it afterwards"""
+        module_name, class_name, takes_colors, label = SCREENS[key]
+
+        def build(host):
+            screen_class = getattr(importlib.import_module(module_name), class_name)
+            if takes_colors:
+                return screen_class(host, self.bg_color, self.fg_color)
+            return screen_class(host)
+
         try:
-            # Get the directory of the current script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            user_script = os.path.join(script_dir, "user.py")
-        
-            # Check if user.py exists
-            if not os.path.exists(user_script):
-                raise FileNotFoundError("user.py not found in the same directory")
-        
-            # Clear current content
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Import the UserManagement class from user.py
-            from user import UserManagement
-        
-            # Create an instance of UserManagement in the content frame
-            user_mgmt = UserManagement(self.content_frame, self.bg_color, self.fg_color)
-        
+            return self.screens.show(key, build)
         except Exception as e:
-            # Fallback to simple label if user.py can't be loaded
-            error_label = tk.Label(self.content_frame, 
-                                text=f"Failed to load user module: {str(e)}",
+            # Fallback to simple label if the module can't be loaded
+            error_frame = tk.Frame(self.content_frame, bg=self.bg_color)
+            self.screens.show_frame(error_frame, disposable=True)
+            error_label = tk.Label(error_frame, 
+                                text=f"Failed to load {label} module: {str(e)}",
                                 font=self.section_font, 
                                 bg=self.bg_color,
                                 fg="red")
             error_label.pack(pady=20)
-     
+
+    def show_users(self):
+        self.show_module('users')
+
     def show_complaints(self):
-        self.clear_content()
-        
-        try:
-            # Get the directory of the current script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            user_script = os.path.join(script_dir, "loanapplication.py")
-        
-            # Check if user.py exists
-            if not os.path.exists(user_script):
-                raise FileNotFoundError("loanapplication.py not found in the same directory")
-        
-            # Clear current content
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Import the UserManagement class from user.py
-            from loanapplication import LoanManagementSystem
-        
-            # Create an instance of UserManagement in the content frame
-            staf_mgmt = LoanManagementSystem(self.content_frame, self.bg_color, self.fg_color)
-        
-        except Exception as e:
-            # Fallback to simple label if user.py can't be loaded
-            error_label = tk.Label(self.content_frame, 
-                                text=f"Failed to load loanapplication module: {str(e)}",
-                                font=self.section_font, 
-                                bg=self.bg_color,
-                                fg="red")
-            error_label.pack(pady=20)
-        
+        self.show_module('complaints')
+
     def show_staff(self):
-        self.clear_content()
-        
-        try:
-            # Get the directory of the current script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            user_script = os.path.join(script_dir, "staff.py")
-        
-            # Check if user.py exists
-            if not os.path.exists(user_script):
-                raise FileNotFoundError("staff.py not found in the same directory")
-        
-            # Clear current content
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Import the UserManagement class from user.py
-            from staff import StaffManagement
-        
-            # Create an instance of UserManagement in the content frame
-            staf_mgmt = StaffManagement(self.content_frame, self.bg_color, self.fg_color)
-        
-        except Exception as e:
-            # Fallback to simple label if user.py can't be loaded
-            error_label = tk.Label(self.content_frame, 
-                                text=f"Failed to load user module: {str(e)}",
-                                font=self.section_font, 
-                                bg=self.bg_color,
-                                fg="red")
-            error_label.pack(pady=20)
-    
+        self.show_module('staff')
+
     def show_events(self):
-        self.clear_content()
-        
-        try:
-            # Get the directory of the current script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            user_script = os.path.join(script_dir, "event.py")
-        
-            # Check if user.py exists
-            if not os.path.exists(user_script):
-                raise FileNotFoundError("event.py not found in the same directory")
-        
-            # Clear current content
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Import the UserManagement class from user.py
-            from event import EventManagement
-        
-            # Create an instance of UserManagement in the content frame
-            user_mgmt = EventManagement(self.content_frame, self.bg_color, self.fg_color)
-        
-        except Exception as e:
-            # Fallback to simple label if user.py can't be loaded
-            error_label = tk.Label(self.content_frame, 
-                                text=f"Failed to load event module: {str(e)}",
-                                font=self.section_font, 
-                                bg=self.bg_color,
-                                fg="red")
-            error_label.pack(pady=20)
-         
+        self.show_module('events')
+
     def show_contributions(self):
-        self.clear_content()
-        
-        try:
-            # Get the directory of the current script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            user_script = os.path.join(script_dir, "contribution.py")
-        
-            # Check if user.py exists
-            if not os.path.exists(user_script):
-                raise FileNotFoundError("contribution.py not found in the same directory")
-        
-            # Clear current content
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Import the UserManagement class from user.py
-            from contribution import ContributionManagement
-        
-            # Create an instance of UserManagement in the content frame
-            user_mgmt = ContributionManagement(self.content_frame, self.bg_color, self.fg_color)
-        
-        except Exception as e:
-            # Fallback to simple label if user.py can't be loaded
-            error_label = tk.Label(self.content_frame, 
-                                text=f"Failed to load contibution module: {str(e)}",
-                                font=self.section_font, 
-                                bg=self.bg_color,
-                                fg="red")
-            error_label.pack(pady=20)
-        
+        self.show_module('contributions')
+
     def show_loanpayments(self):
-        self.clear_content()
-        
-        try:
-            # Get the directory of the current script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            user_script = os.path.join(script_dir, "loandemo.py")
-        
-            # Check if user.py exists
-            if not os.path.exists(user_script):
-                raise FileNotFoundError("loandemo not found in the same directory")
-        
-            # Clear current content
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Import the UserManagement class from user.py
-            from loandemo import LoanManagement 
-        
-            # Create an instance of UserManagement in the content frame
-            loan_mgmt = LoanManagement(self.content_frame, self.bg_color, self.fg_color)
-        
-        except Exception as e:
-            # Fallback to simple label if user.py can't be loaded
-            error_label = tk.Label(self.content_frame, 
-                                text=f"Failed to load loan module: {str(e)}",
-                                font=self.section_font, 
-                                bg=self.bg_color,
-                                fg="red")
-            error_label.pack(pady=20)
-            
+        self.show_module('loanpayments')
+
     def show_loanrepayments(self):
-        self.clear_content()
-        
-        try:
-            # Get the directory of the current script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            user_script = os.path.join(script_dir, "loanrepayment.py")
-        
-            # Check if loanrepayment.py exists
-            if not os.path.exists(user_script):
-                raise FileNotFoundError("loanrepayment.py not found in the same directory")
-        
-            # Clear current content
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Import the LoanRepaymentSystem from loanrepayment.py
-            from loanrepayment import LoanRepaymentSystem
-        
-            # Create an instance of LoanRepaymentSystem in the content frame
-            # Pass only the required number of arguments (2 instead of 4)
-            repayment_mgmt = LoanRepaymentSystem(self.content_frame)
-        
-        except Exception as e:
-            # Fallback to simple label if loanrepayment.py can't be loaded
-            error_label = tk.Label(self.content_frame, 
-                                text=f"Failed to load loan repayment module: {str(e)}",
-                                font=self.section_font, 
-                                bg=self.bg_color,
-                                fg="red")
-            error_label.pack(pady=20)
-        
+        self.show_module('loanrepayments')
+
     def show_bankinfo(self):
-        self.clear_content()
-        
-        try:
-            # Get the directory of the current script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            user_script = os.path.join(script_dir, "bank.py")
-        
-            # Check if user.py exists
-            if not os.path.exists(user_script):
-                raise FileNotFoundError("bank.py not found in the same directory")
-        
-            # Clear current content
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Import the UserManagement class from user.py
-            from bank import BankAccountManagement
-        
-            # Create an instance of UserManagement in the content frame
-            user_mgmt = BankAccountManagement(self.content_frame, self.bg_color, self.fg_color)
-        
-        except Exception as e:
-            # Fallback to simple label if user.py can't be loaded
-            error_label = tk.Label(self.content_frame, 
-                                text=f"Failed to load bank module: {str(e)}",
-                                font=self.section_font, 
-                                bg=self.bg_color,
-                                fg="red")
-            error_label.pack(pady=20)
-        
-    def clear_content(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-    
+        self.show_module('bankinfo')
+
+    def show_portfoliorisk(self):
+        self.show_module('portfoliorisk')
+
     def logout(self):
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
-            self.root.destroy()
-            subprocess.Popen(["python", "login.py"])
-            # Here you would typically return to the login screen
+            # Return to the login screen in this process; see app.AppShell
+            if self.shell is None:
+                import app
+                self.shell = app.AppShell(self.root)
+            self.shell.show_login()
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = Dashboard(root)
-    root.mainloop()
\ No newline at end of file
+    # --profile-startup reports import times and time to first frame
+    import startup
+    startup.launch(Dashboard)
\ No newline at end of file
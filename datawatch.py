@@ -0,0 +1,95 @@
+import sqlite3
+import weakref
+from tkinter import messagebox
+
+# How often the watched databases are checked for commits by other connections
+POLL_INTERVAL_MS = 1000
+
+_watchers = {}
+
+
+class DataWatcher:
+    """Polls PRAGMA data_version on a Tk timer and calls back when a database changed
+
+    data_version moves only when a different connection commits to the
+    file: another copy of the app, a worker thread, or a command-line tool.
+    This process's own writes on the main thread are left to changes.publish.
+    Idle cost is one pragma per watched connection per tick, with no table
+    reads; callbacks run only after an actual external commit. Refreshes a
+    callback starts must therefore not commit from a worker thread, or every
+    refresh triggers the next one.
+    """
+
+    def __init__(self, root, interval_ms=POLL_INTERVAL_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        # connection -> [last data_version seen, weak refs to callbacks]
+        self.watched = {}
+        self.job = None
+
+    def watch(self, conn, callback):
+        """Call callback() after another connection commits to conn's database
+
+        Bound methods are held weakly, so a destroyed screen stops being
+        called without unwatching.
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+        if conn not in self.watched:
+            self.watched[conn] = [self._version(conn), []]
+        self.watched[conn][1].append(ref)
+        if self.job is None:
+            self.job = self.root.after(self.interval_ms, self.poll)
+
+    def _version(self, conn):
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll(self):
+        self.job = None
+        try:
+            for conn, entry in list(self.watched.items()):
+                try:
+                    version = self._version(conn)
+                except sqlite3.Error:
+                    # Closed connection (e.g. after logout); forget it
+                    del self.watched[conn]
+                    continue
+                if version != entry[0]:
+                    entry[0] = version
+                    self._notify(entry[1])
+                entry[1] = [ref for ref in entry[1] if ref() is not None]
+                if not entry[1]:
+                    del self.watched[conn]
+        finally:
+            if self.watched:
+                self.job = self.root.after(self.interval_ms, self.poll)
+
+    def _notify(self, refs):
+        for ref in list(refs):
+            callback = ref()
+            if callback is None:
+                continue
+            try:
+                callback()
+            except Exception as e:
+                # One failing screen must not stop the others, or the timer
+                messagebox.showerror("Error", f"Failed to refresh after a change made elsewhere: {str(e)}")
+
+    def stop(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+
+def get_watcher(widget):
+    """Return the DataWatcher for the Tk application a widget belongs to"""
+    root = widget.nametowidget('.')
+    watcher = _watchers.get(root)
+    if watcher is None:
+        watcher = _watchers[root] = DataWatcher(root)
+
+        def on_destroy(event):
+            if event.widget is root:
+                _watchers.pop(root, watcher).stop()
+
+        root.bind('<Destroy>', on_destroy, add='+')
+    return watcher
@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+# Every stored date is ISO 8601 text, so string order is date order and
+# range filters can use an index: 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%d %H:%M'
+# tkcalendar pattern that makes DateEntry.get() return DATE_FORMAT
+DATE_PATTERN = 'yyyy-mm-dd'
+
+# Formats found in older rows; DateEntry's default en_US pattern is m/d/yy,
+# so month-first is tried before day-first
+DATE_INPUT_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%y', '%m/%d/%Y', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y')
+TIME_INPUT_FORMATS = ('%H:%M:%S', '%H:%M')
+# Month-first formats; '05/04/2025' read through them may have been meant day-first
+MONTH_FIRST_FORMATS = ('%m/%d/%y', '%m/%d/%Y')
+
+
+@lru_cache(maxsize=4096)
+def _parse_text(text):
+    # Returns None instead of raising so that bad values are cached as well
+    # ISO input (everything written since the dates migration) skips strptime
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    day, _, clock = text.partition(' ')
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            parsed = datetime.strptime(day, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        return None
+    if not clock:
+        return parsed
+    for fmt in TIME_INPUT_FORMATS:
+        try:
+            moment = datetime.strptime(clock.strip(), fmt)
+            return parsed.replace(hour=moment.hour, minute=moment.minute, second=moment.second)
+        except ValueError:
+            continue
+    return None
+
+
+def _parse(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    parsed = _parse_text(str(value).strip())
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value!r}")
+    return parsed
+
+
+def to_iso(value):
+    """Convert a date in any accepted format (str, date or datetime) to 'YYYY-MM-DD'"""
+    return _parse(value).strftime(DATE_FORMAT)
+
+
+def to_iso_datetime(value):
+    """Convert a date and time to 'YYYY-MM-DD HH:MM'; a bare date means midnight"""
+    return _parse(value).strftime(DATETIME_FORMAT)
+
+
+def parse(value):
+    """Stored ISO text back to a datetime"""
+    return _parse(value)
+
+
+def is_ambiguous(value):
+    """True if text was read month-first but would be a different valid date read day-first"""
+    if isinstance(value, date):
+        return False
+    day = str(value).strip().partition(' ')[0]
+    # Same order as _parse_text, so this is the format the value was read with
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            parsed = datetime.strptime(day, fmt)
+        except ValueError:
+            continue
+        return fmt in MONTH_FIRST_FORMATS and parsed.day <= 12 and parsed.day != parsed.month
+    return False
+
+
+def today():
+    return date.today().strftime(DATE_FORMAT)
+
+
+def date_range(start, end):
+    """Half-open bounds [start, day after end) covering both dates and datetimes
+
+    Use as `WHERE column >= ? AND column < ?` so the filter is an index range scan.
+    """
+    return to_iso(start), (_parse(end) + timedelta(days=1)).strftime(DATE_FORMAT)
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+
+import migrate
+import schema
+
+# Number of compiled statements each connection keeps ready for reuse
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _resolve(path):
+    return os.path.abspath(path)
+
+
+def _setup_main_database(cursor):
+    schema.apply_migrations(cursor)
+    migrate.import_legacy(cursor.connection, os.path.dirname(_resolve(schema.DB_PATH)))
+
+
+def get_connection(path=None):
+    """Return the shared connection for a database file, opening it on first use"""
+    path = _resolve(path or schema.DB_PATH)
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute("PRAGMA foreign_keys = ON")
+        connections[path] = conn
+        if path == _resolve(schema.DB_PATH):
+            ensure_schema(path, 'shg', _setup_main_database)
+    return conn
+
+
+def get_cursor(path=None):
+    """Hand out a cursor on the shared connection for a database file"""
+    return get_connection(path).cursor()
+
+
+def ensure_schema(path, name, setup):
+    """Run a schema setup function once per process for a database file"""
+    key = (_resolve(path), name)
+    if key in _schema_ready:
+        return
+
+    with _schema_lock:
+        if key in _schema_ready:
+            return
+        conn = get_connection(path)
+        setup(conn.cursor())
+        conn.commit()
+        _schema_ready.add(key)
+
+
+def close_all():
+    """Close every connection opened by the calling thread"""
+    connections = getattr(_local, 'connections', {})
+    for conn in connections.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
@@ -2,6 +2,10 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 import sqlite3
+import changes
+import dates
+import db
+from virtualtable import VirtualTable
 from datetime import datetime
 
 class EventManagement:
@@ -19,21 +23,8 @@ class EventManagement:
         self.create_ui()
 
     def setup_db(self):
-        self.conn = sqlite3.connect('eventdb.db')
+        self.conn = db.get_connection()
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS events (
-                event_id TEXT PRIMARY KEY,
-                title TEXT NOT NULL,
-                event_type TEXT NOT NULL,
-                start_datetime TEXT NOT NULL,
-                end_datetime TEXT NOT NULL,
-                location TEXT NOT NULL,
-                organizer TEXT NOT NULL,
-                status TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
 
     def create_ui(self):
         for widget in self.parent.winfo_children():
@@ -90,7 +81,8 @@ class EventManagement:
                 self.entries[field] = var
 
             elif field_type == 'datetime':
-                date_entry = DateEntry(form_frame, width=12, font=self.entry_font, background='darkblue', foreground='white', borderwidth=2)
+                date_entry = DateEntry(form_frame, width=12, font=self.entry_font, background='darkblue', foreground='white', borderwidth=2,
+                                       date_pattern=dates.DATE_PATTERN)
                 date_entry.grid(row=i, column=1, sticky='w', padx=5, pady=5)
                 
                 time_frame = tk.Frame(form_frame, bg=self.bg_color)
@@ -139,6 +131,9 @@ class EventManagement:
             self.tree.column(col, width=150, anchor='w')
             self.tree.heading(col, text=col)
 
+        self.table_view = VirtualTable(self.tree, 'events',
+                                       ['event_id', 'title', 'event_type', 'start_datetime', 'end_datetime', 'status'], id_column='event_id',
+                                       numbered=True)
         self.tree.bind('<<TreeviewSelect>>', self.on_event_select)
         self.scrollable_frame.grid_columnconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
@@ -152,7 +147,7 @@ class EventManagement:
                 continue
             if isinstance(entry, tuple):  # datetime field
                 date_widget, hour_var, min_var = entry
-                datetime_str = f"{date_widget.get()} {hour_var.get()}:{min_var.get()}"
+                datetime_str = dates.to_iso_datetime(f"{date_widget.get()} {hour_var.get()}:{min_var.get()}")
                 data[field] = datetime_str
             elif isinstance(entry, tk.Entry):
                 data[field] = entry.get()
@@ -177,7 +172,7 @@ class EventManagement:
             self.cursor.execute(f"INSERT INTO events ({columns}) VALUES ({placeholders})", values)
             self.conn.commit()
             messagebox.showinfo("Success", "Event added successfully")
-            self.load_events()
+            changes.publish('events', event_id)
             self.clear_form()
         except sqlite3.IntegrityError as e:
             messagebox.showerror("Error", f"Integrity error: {e}")
@@ -194,7 +189,7 @@ class EventManagement:
             self.cursor.execute(f"UPDATE events SET {updates} WHERE event_id=?", values)
             self.conn.commit()
             messagebox.showinfo("Success", "Event updated successfully")
-            self.load_events()
+            changes.publish('events', event_id)
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -207,7 +202,7 @@ class EventManagement:
         self.cursor.execute("DELETE FROM events WHERE event_id=?", (event_id,))
         self.conn.commit()
         messagebox.showinfo("Success", "Event deleted successfully")
-        self.load_events()
+        changes.publish('events', event_id)
         self.clear_form()
 
     def clear_form(self):
@@ -227,11 +222,7 @@ class EventManagement:
                 min_var.set('00')
 
     def load_events(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        self.cursor.execute("SELECT event_id, title, event_type, start_datetime, end_datetime, status FROM events")
-        for i, row in enumerate(self.cursor.fetchall(), start=1):
-            self.tree.insert('', 'end', text=str(i), values=row)
+        self.table_view.reload()
 
     def on_event_select(self, event):
         selected_item = self.tree.selection()
@@ -255,7 +246,7 @@ class EventManagement:
                         entry.set(event_data[i])
                     elif isinstance(entry, tuple):
                         date_widget, hour_var, min_var = entry
-                        dt_obj = datetime.strptime(event_data[i], "%Y-%m-%d %H:%M")
+                        dt_obj = dates.parse(event_data[i])
                         date_widget.set_date(dt_obj.date())
                         hour_var.set(f"{dt_obj.hour:02d}")
                         min_var.set(f"{dt_obj.minute:02d}")
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tkinter as tk
+
+# Dashboard tile icons, in atlas order
+DASHBOARD_ICONS = {
+    "users": "👥",
+    "complaints": "📝",
+    "staff": "👨‍💼",
+    "member": "👤",
+    "events": "📅",
+    "contributions": "💰",
+    "loanpayment": "🏦",
+    "bankinfo": "🏛️",
+    "loanrepayment": "💵",
+    "portfoliorisk": "📉",
+}
+
+# Rendered atlases live here, one PNG per icon set, size and background colour
+CACHE_DIR = 'icon_cache'
+
+# Fonts tried in order when rendering; colour emoji fonts only come in fixed sizes
+EMOJI_FONTS = (
+    ('seguiemj.ttf', None),
+    ('NotoColorEmoji.ttf', 109),
+    ('/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf', 109),
+    ('/System/Library/Fonts/Apple Color Emoji.ttc', 160),
+    ('DejaVuSans.ttf', None),
+    ('arial.ttf', None),
+)
+# Fraction of the icon the glyph may fill
+GLYPH_SCALE = 0.75
+
+
+def atlas_path(icons, size, background):
+    """Cache file for an icon set; a changed set, size or theme gets a new file"""
+    digest = hashlib.sha1(''.join(f"{k}={v};" for k, v in icons.items()).encode()).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, f"atlas_{size}_{background.lstrip('#').lower()}_{digest}.png")
+
+
+def _load_font(size):
+    from PIL import ImageFont
+
+    for name, fixed_size in EMOJI_FONTS:
+        try:
+            return ImageFont.truetype(name, fixed_size or size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _render_glyph(char, size, font):
+    """Draw one glyph and scale it to fit a size x size tile (RGBA)"""
+    from PIL import Image, ImageDraw
+
+    canvas_size = max(getattr(font, 'size', size), size) * 2
+    canvas = Image.new('RGBA', (canvas_size, canvas_size), (0, 0, 0, 0))
+    ImageDraw.Draw(canvas).text((canvas_size // 4, canvas_size // 4), char, font=font,
+                                fill=(0, 0, 0, 255), embedded_color=True)
+    box = canvas.getbbox()
+    glyph = canvas.crop(box) if box else canvas
+    limit = max(1, int(size * GLYPH_SCALE))
+    ratio = min(limit / glyph.width, limit / glyph.height)
+    return glyph.resize((max(1, round(glyph.width * ratio)), max(1, round(glyph.height * ratio))), Image.LANCZOS)
+
+
+def render_atlas(icons, size, background, path):
+    """Render every icon side by side into one PNG strip at path (needs Pillow)"""
+    from PIL import Image
+
+    font = _load_font(int(size * GLYPH_SCALE))
+    atlas = Image.new('RGB', (size * len(icons), size), background)
+    for i, char in enumerate(icons.values()):
+        glyph = _render_glyph(char, size, font)
+        atlas.paste(glyph, (i * size + (size - glyph.width) // 2, (size - glyph.height) // 2), glyph)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so an interrupted render never leaves a half-written atlas
+    temp_path = f"{path}.tmp"
+    atlas.save(temp_path, 'PNG', optimize=True)
+    os.replace(temp_path, path)
+
+
+def load_icons(master, icons=DASHBOARD_ICONS, size=64, background='white'):
+    """Return {key: PhotoImage} for an icon set, rendering its atlas only if not cached
+
+    Cached atlases are read with Tk's own PNG support, so later starts need
+    neither Pillow nor any font rasterization. Raises if the atlas is missing
+    and cannot be rendered (e.g. Pillow is not installed).
+    """
+    path = atlas_path(icons, size, background)
+    if not os.path.exists(path):
+        render_atlas(icons, size, background, path)
+
+    atlas = tk.PhotoImage(master=master, file=path)
+    images = {}
+    for i, key in enumerate(icons):
+        image = tk.PhotoImage(master=master, width=size, height=size)
+        image.tk.call(image, 'copy', atlas, '-from', i * size, 0, (i + 1) * size, size)
+        images[key] = image
+    return images
+
+
+if __name__ == "__main__":
+    # Pre-render the dashboard atlas, e.g. as part of installing the app
+    path = atlas_path(DASHBOARD_ICONS, 64, 'white')
+    render_atlas(DASHBOARD_ICONS, 64, 'white', path)
+    print(f"Wrote {path}")
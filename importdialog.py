@@ -0,0 +1,71 @@
+import os
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+import bulkimport
+import metrics
+import tasks
+
+FILETYPES = [("CSV or Excel files", "*.csv *.xlsx"), ("CSV files", "*.csv"), ("Excel files", "*.xlsx"), ("All files", "*.*")]
+# Rejected rows listed in the summary; the rest are only in the reject file
+SHOWN_ERRORS = 10
+
+
+def ask_and_import(parent, table, bg_color, fg_color, on_finished):
+    """Ask for a file and import it into table, calling on_finished(report) once committed"""
+    path = filedialog.askopenfilename(title=f"Import {table}", filetypes=FILETYPES)
+    if path:
+        ImportDialog(parent, table, path, bg_color, fg_color, on_finished)
+
+
+class ImportDialog:
+    """Progress window for a bulk import running on the task runner"""
+
+    def __init__(self, parent, table, path, bg_color, fg_color, on_finished):
+        self.table = table
+        self.on_finished = on_finished
+
+        self.window = tk.Toplevel(parent, bg=bg_color)
+        self.window.title(f"Importing {table}")
+        self.window.transient(parent.winfo_toplevel())
+        self.status = tk.Label(self.window, text=f"Reading {os.path.basename(path)}...", font=('Arial', 12), bg=bg_color)
+        self.status.pack(padx=20, pady=(15, 5))
+        self.progress = ttk.Progressbar(self.window, length=320, mode='determinate')
+        self.progress.pack(padx=20, pady=5)
+        tk.Button(self.window, text="Cancel", command=self.cancel, font=('Arial', 12, 'bold'),
+                  bg=fg_color, fg='white', bd=0).pack(pady=(5, 15))
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.task = tasks.get_runner(parent).submit(bulkimport.import_file, path, table, on_done=self.finished,
+                                                    on_error=self.failed, on_progress=self.update_progress,
+                                                    owner=self.window)
+
+    def update_progress(self, done, total):
+        self.progress.config(maximum=max(total, 1), value=done)
+        self.status.config(text=f"{done:,} of {total:,} rows checked")
+
+    def cancel(self):
+        # The import rolls back at its next batch; its result is dropped
+        self.task.cancel()
+        self.window.destroy()
+
+    def failed(self, error):
+        self.window.destroy()
+        messagebox.showerror("Import failed", f"Nothing was imported: {error}")
+
+    def finished(self, report):
+        self.window.destroy()
+        # Bulk inserts are not published row by row
+        metrics.invalidate(self.table)
+        self.on_finished(report)
+
+        lines = [f"Line {line}: {message}" for line, message in report.errors[:SHOWN_ERRORS]]
+        if len(report.errors) > SHOWN_ERRORS:
+            lines.append(f"... and {len(report.errors) - SHOWN_ERRORS} more")
+        messagebox.showinfo("Import finished", "\n".join([report.summary()] + lines))
+
+        if report.errors and messagebox.askyesno("Rejected rows", "Save the rejected rows to a reject file?"):
+            path = filedialog.asksaveasfilename(defaultextension=".csv", initialfile=f"{self.table}_rejected.csv",
+                                                filetypes=[("CSV files", "*.csv")])
+            if path:
+                report.write_rejects(path)
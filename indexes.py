@@ -0,0 +1,154 @@
+import argparse
+import re
+import sys
+
+import contacts
+
+# Sort key of the repayments table's pages; repay_date may be NULL in older rows
+REPAYMENT_PAGE_KEY = "COALESCE(repay_date, '')"
+
+# Secondary indexes backing the WHERE / ORDER BY clauses the screens issue.
+# Each entry is (index name, table, columns); extra trailing columns make the
+# aggregate queries index-only.
+INDEXES = [
+    ('idx_repayments_loan_id', 'repayments', ('loan_id', 'repay_amount')),
+    ('idx_repayments_repay_date', 'repayments', ('repay_date',)),
+    # Pages of the repayments screen, newest first (see REPAYMENT_PAGE_KEY)
+    ('idx_repayments_page', 'repayments', (REPAYMENT_PAGE_KEY,)),
+    # A loan's repayments in (date, id) order, for recomputing `remaining`
+    ('idx_repayments_loan_date', 'repayments', ('loan_id', 'repay_date')),
+    ('idx_loans_status', 'loans', ('status', 'loan_amount')),
+    ('idx_loans_funds_allocated', 'loans', ('funds_allocated', 'loan_amount')),
+    ('idx_contributions_status', 'contributions', ('status', 'amount_paise')),
+    ('idx_credits_member_name', 'credits', ('member_name', 'credit_amount_paise')),
+    ('idx_bank_accounts_member_id', 'bank_accounts', ('member_id',)),
+    ('idx_users_account_status', 'users', ('account_status',)),
+    # Phone and email uniqueness lookups compare cleaned values (see contacts.py)
+    ('idx_users_phone_key', 'users', (contacts.USER_KEYS['primary_phone'],)),
+    ('idx_users_email_key', 'users', (contacts.USER_KEYS['email'],)),
+    # Date columns hold ISO text (see dates.py), so date ranges are index range scans
+    ('idx_contributions_transaction_date', 'contributions', ('transaction_date', 'status', 'amount_paise')),
+    ('idx_credits_credit_date', 'credits', ('credit_date', 'credit_amount_paise')),
+    ('idx_loans_approved_date', 'loans', ('approved_date', 'loan_amount')),
+    ('idx_events_start_datetime', 'events', ('start_datetime',)),
+    # One member's months in the contribution rollup
+    ('idx_contribution_monthly_member', 'contribution_monthly', ('member_name', 'month')),
+]
+
+# Queries run on every refresh or write; each must be answered through an index
+HOT_QUERIES = [
+    ('repayments by loan', "SELECT SUM(repay_amount) FROM repayments WHERE loan_id = ?", ('LOAN',)),
+    ('repayments of a loan from a date',
+     "SELECT id FROM repayments WHERE loan_id = ? AND (repay_date, id) >= (?, ?) ORDER BY repay_date DESC, id DESC",
+     ('LOAN', '2024-01-01', 0)),
+    # First page of the repayments table, as VirtualTable pages it
+    ('repayments newest first',
+     f"SELECT {REPAYMENT_PAGE_KEY}, id, id, loan_id, repay_amount, repay_date, remaining FROM repayments "
+     f"ORDER BY {REPAYMENT_PAGE_KEY} DESC, id DESC LIMIT ?", (100,)),
+    ('repayments next page',
+     f"SELECT {REPAYMENT_PAGE_KEY}, id, id, loan_id, repay_amount, repay_date, remaining FROM repayments "
+     f"WHERE {REPAYMENT_PAGE_KEY} <= ? AND ({REPAYMENT_PAGE_KEY}, id) < (?, ?) "
+     f"ORDER BY {REPAYMENT_PAGE_KEY} DESC, id DESC LIMIT ?", ('2024-01-01', '2024-01-01', 0, 100)),
+    ('repayments above the window',
+     f"SELECT COUNT(*) FROM repayments WHERE {REPAYMENT_PAGE_KEY} >= ? AND ({REPAYMENT_PAGE_KEY}, id) > (?, ?)",
+     ('2024-01-01', '2024-01-01', 0)),
+    ('loan balance', "SELECT loan_amount, total_paid FROM loan_balances WHERE loan_id = ?", ('LOAN',)),
+    ('loan schedule', "SELECT installment, due_date, due_paise FROM loan_schedule WHERE loan_id = ? ORDER BY installment",
+     ('LOAN',)),
+    ('repaid by a due date',
+     "SELECT SUM(repay_amount) FROM repayments WHERE loan_id = ? AND repay_date <= ?", ('LOAN', '2024-01-01')),
+    ('loans by status', "SELECT COUNT(*), SUM(loan_amount) FROM loans WHERE status = ?", ('Approved',)),
+    ('loan summary', "SELECT status, COUNT(*), SUM(loan_amount), SUM(funds_allocated = 1) FROM loans GROUP BY status", ()),
+    ('loans with funds allocated', "SELECT COUNT(*) FROM loans WHERE funds_allocated = 1", ()),
+    ('verified contributions', "SELECT SUM(amount_paise) FROM contributions WHERE status = 'Verified'", ()),
+    ('credits by member', "SELECT SUM(credit_amount_paise) FROM credits WHERE member_name = ?", ('member',)),
+    ('users by phone', f"SELECT {contacts.USER_KEYS['primary_phone']} FROM users "
+                       f"WHERE {contacts.USER_KEYS['primary_phone']} IN (?, ?)", ('9876543210', '9123456789')),
+    ('users by email', f"SELECT {contacts.USER_KEYS['email']} FROM users WHERE {contacts.USER_KEYS['email']} IN (?, ?)",
+     ('a@example.com', 'b@example.com')),
+    ('member phone taken', f"SELECT 1 FROM users WHERE {contacts.USER_KEYS['primary_phone']} = ? AND user_id IS NOT ?",
+     ('9876543210', 'USR1')),
+    ('loan ids by prefix',
+     "SELECT loan_id FROM loans WHERE loan_id >= ? AND loan_id < ? ORDER BY loan_id LIMIT ?", ('LN1', 'LN1\U0010ffff', 10)),
+    ('active members', "SELECT COUNT(*) FROM users WHERE account_status = 'Active'", ()),
+    ('pending loans', "SELECT COUNT(*), COALESCE(SUM(loan_amount), 0) FROM loans WHERE status = 'Pending'", ()),
+    ('bank accounts by member', "SELECT account_id FROM bank_accounts WHERE member_id = ?", ('member',)),
+    ('repayments in date range',
+     "SELECT SUM(repay_amount) FROM repayments WHERE repay_date >= ? AND repay_date < ?", ('2024-01-01', '2024-02-01')),
+    ('contributions in date range',
+     "SELECT SUM(amount_paise) FROM contributions WHERE transaction_date >= ? AND transaction_date < ? "
+     "AND status = 'Verified'", ('2024-01-01', '2024-02-01')),
+    ('credits in date range',
+     "SELECT SUM(credit_amount_paise) FROM credits WHERE credit_date >= ? AND credit_date < ?", ('2024-01-01', '2024-02-01')),
+    ('loans approved in date range',
+     "SELECT COUNT(*), SUM(loan_amount) FROM loans WHERE approved_date >= ? AND approved_date < ?",
+     ('2024-01-01', '2024-02-01')),
+    ('contribution trend',
+     "SELECT month, SUM(entries), SUM(amount_paise) FROM contribution_monthly "
+     "WHERE month >= ? AND month <= ? GROUP BY month", ('2024-01', '2024-12')),
+    ('member contribution trend',
+     "SELECT month, SUM(entries), SUM(amount_paise) FROM contribution_monthly "
+     "WHERE member_name = ? AND month >= ? AND month <= ? GROUP BY month", ('member', '2024-01', '2024-12')),
+    ('upcoming events',
+     "SELECT event_id, title, start_datetime FROM events WHERE start_datetime >= ? ORDER BY start_datetime",
+     ('2024-01-01',)),
+]
+
+
+# Hot queries that summarise every row of their table; reading a whole index is the best they can do
+WHOLE_TABLE_QUERIES = {'loan summary'}
+
+
+def ensure_indexes(cursor):
+    """Create every registered index that does not exist yet"""
+    for name, table, columns in INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+
+def full_scans(cursor, sql, params=(), whole_table=False):
+    """Return the query plan steps that read a whole table or a whole index
+
+    Scanning through an index still reads every entry, so it only passes
+    when a LIMIT stops it after a page, or for a whole_table query that
+    has to aggregate every row anyway.
+    """
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    steps = [row[3] for row in cursor.fetchall()]
+    # Views and subqueries are evaluated as co-routines whose own steps are
+    # listed separately; scanning their (already filtered) output is fine
+    derived = {step.split()[-1] for step in steps if step.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+    bounded = whole_table or re.search(r'\bLIMIT\b', sql, re.IGNORECASE)
+    return [step for step in steps
+            if (step.startswith('SCAN ') and step.split()[1] not in derived
+                and (' USING ' not in step or not bounded))
+            or 'TEMP B-TREE' in step]
+
+
+def check_query_plans(conn):
+    """Run EXPLAIN QUERY PLAN over every hot query and return the offenders"""
+    cursor = conn.cursor()
+    failures = []
+    for name, sql, params in HOT_QUERIES:
+        scans = full_scans(cursor, sql, params, name in WHOLE_TABLE_QUERIES)
+        if scans:
+            failures.append((name, scans))
+    return failures
+
+
+if __name__ == "__main__":
+    import db
+
+    parser = argparse.ArgumentParser(description="Create registered indexes and check hot query plans")
+    parser.add_argument('command', choices=['create', 'check'])
+    args = parser.parse_args()
+
+    conn = db.get_connection()
+    ensure_indexes(conn.cursor())
+    conn.commit()
+    if args.command == 'check':
+        failures = check_query_plans(conn)
+        for name, scans in failures:
+            print(f"FULL SCAN in '{name}': {'; '.join(scans)}")
+        if failures:
+            sys.exit(1)
+        print(f"All {len(HOT_QUERIES)} hot queries use an index")
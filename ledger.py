@@ -0,0 +1,63 @@
+import argparse
+
+import db
+import money
+import schema
+
+LEDGER_COLUMNS = ('contributions_paise', 'credits_paise', 'allocated_paise')
+
+
+def get_balances(cursor):
+    """Read the running fund totals (in rupees) as a dict in one row lookup"""
+    cursor.execute(f"SELECT {', '.join(LEDGER_COLUMNS)} FROM fund_ledger WHERE id = 1")
+    contributions, credits, allocated = cursor.fetchone() or (0, 0, 0)
+    return {
+        'total_contributions': money.to_rupees(contributions),
+        'total_credits': money.to_rupees(credits),
+        'total_allocated': money.to_rupees(allocated),
+        'net_total': money.to_rupees(contributions - credits),
+        'available': money.to_rupees(contributions - credits - allocated),
+    }
+
+
+def get_available_funds(cursor):
+    """Funds left for new loans: verified contributions - credits - allocated"""
+    cursor.execute("SELECT contributions_paise - credits_paise - allocated_paise FROM fund_ledger WHERE id = 1")
+    row = cursor.fetchone()
+    return money.to_rupees(row[0] if row else 0)
+
+
+def verify(conn):
+    """Recompute the ledger from scratch and return the drift (in paise) per column"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(LEDGER_COLUMNS)} FROM fund_ledger WHERE id = 1")
+    stored = cursor.fetchone() or (0, 0, 0)
+    cursor.execute(schema.FUND_LEDGER_TOTALS)
+    expected = cursor.fetchone()
+    return {column: have - want
+            for column, have, want in zip(LEDGER_COLUMNS, stored, expected)
+            if have != want}
+
+
+def rebuild(conn):
+    """Replace the stored ledger with totals recomputed from the source tables"""
+    drift = verify(conn)
+    conn.execute(f"INSERT OR REPLACE INTO fund_ledger (id, {', '.join(LEDGER_COLUMNS)}) "
+                 f"SELECT 1, * FROM ({schema.FUND_LEDGER_TOTALS})")
+    conn.commit()
+    return drift
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or rebuild the materialized fund ledger")
+    parser.add_argument('command', choices=['verify', 'rebuild'])
+    args = parser.parse_args()
+
+    conn = db.get_connection()
+    drift = rebuild(conn) if args.command == 'rebuild' else verify(conn)
+    if not drift:
+        print("Fund ledger matches the source tables")
+    for column, amount in drift.items():
+        print(f"{column}: drift of {money.format_rupees(amount)}" + (" (fixed)" if args.command == 'rebuild' else ""))
+    if drift and args.command == 'verify':
+        raise SystemExit(1)
@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
+import datawatch
+import db
+from autocomplete import AutocompleteEntry, PrefixIndex
 
 class LoanManagementSystem:
     def __init__(self, master, bg_color, fg_color):
@@ -18,24 +21,27 @@ class LoanManagementSystem:
                  font=("Arial", 16, "bold"), bg=bg_color, fg=fg_color).pack(pady=20)
 
         # DB connection
-        self.conn = sqlite3.connect("memberloandb.db")
+        self.conn = db.get_connection("memberloandb.db")
         self.cursor = self.conn.cursor()
-        self.create_loan_table()
+        db.ensure_schema("memberloandb.db", "loan_applications", self.create_loan_table)
 
         # Fonts
         self.label_font = ("Arial", 12)
         self.entry_font = ("Arial", 12)
 
         self.entries = {}
-        self.member_names = []
+        # Applicant name -> group name, searched by prefix as the name is typed
+        self.member_index = PrefixIndex()
 
         # UI
         self.create_ui()
         self.create_table_view()
+        # Applications may also be filed from another copy of the app
+        datawatch.get_watcher(self.master).watch(self.conn, self.load_loans)
         self.load_loans()
 
-    def create_loan_table(self):
-        self.cursor.execute('''
+    def create_loan_table(self, cursor):
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS loans (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 applicant_name TEXT NOT NULL,
@@ -44,7 +50,6 @@ class LoanManagementSystem:
                 loan_reason TEXT NOT NULL
             )
         ''')
-        self.conn.commit()
 
     def fetch_members(self):
         self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='members'")
@@ -57,30 +62,25 @@ class LoanManagementSystem:
             messagebox.showerror("Error", "The 'members' table does not contain the required fields.")
             return []
 
-    def on_member_select(self, event):
-        selected_name = self.entries['applicant_name'].get()
-        for name, group in self.member_names:
-            if name == selected_name:
-                self.entries['group_name'].config(state='normal')
-                self.entries['group_name'].delete(0, tk.END)
-                self.entries['group_name'].insert(0, group)
-                self.entries['group_name'].config(state='readonly')
-                break
+    def on_member_select(self, name, group):
+        self.entries['group_name'].config(state='normal')
+        self.entries['group_name'].delete(0, tk.END)
+        self.entries['group_name'].insert(0, group)
+        self.entries['group_name'].config(state='readonly')
 
     def create_ui(self):
         form_frame = tk.LabelFrame(self.master, text="Loan Application Form", padx=10, pady=10, font=self.label_font)
         form_frame.pack(padx=20, pady=20, fill="x")
 
-        self.member_names = self.fetch_members()
-        if not self.member_names:
+        self.member_index.load(self.fetch_members())
+        if not self.member_index:
             return
 
         # Applicant Name
         tk.Label(form_frame, text="Applicant Name:", font=self.label_font).grid(row=0, column=0, sticky='e', padx=5, pady=5)
-        applicant_combo = ttk.Combobox(form_frame, values=[name for name, _ in self.member_names], width=30, font=self.entry_font, state='readonly')
-        applicant_combo.grid(row=0, column=1, sticky='w', padx=5, pady=5, ipady=3)
-        applicant_combo.bind("<<ComboboxSelected>>", self.on_member_select)
-        self.entries['applicant_name'] = applicant_combo
+        applicant_entry = AutocompleteEntry(form_frame, self.member_index, on_select=self.on_member_select, width=30, font=self.entry_font)
+        applicant_entry.grid(row=0, column=1, sticky='w', padx=5, pady=5, ipady=3)
+        self.entries['applicant_name'] = applicant_entry
 
         # Group Name
         tk.Label(form_frame, text="Group Name:", font=self.label_font).grid(row=1, column=0, sticky='e', padx=5, pady=5)
@@ -127,12 +127,17 @@ class LoanManagementSystem:
         for row in self.cursor.fetchall():
             self.tree.insert("", "end", values=row)
 
+    def on_show(self):
+        """Called by the dashboard when this cached screen is shown again"""
+        # Applications are submitted from the member window
+        self.load_loans()
+
     def refresh_members(self):
-        self.member_names = self.fetch_members()
-        if not self.member_names:
+        self.member_index.load(self.fetch_members())
+        if not self.member_index:
             return
 
-        self.entries['applicant_name']['values'] = [name for name, _ in self.member_names]
+        self.entries['applicant_name'].set('')
         self.entries['group_name'].config(state='normal')
         self.entries['group_name'].delete(0, tk.END)
         self.entries['group_name'].config(state='readonly')
@@ -146,6 +151,9 @@ class LoanManagementSystem:
         if not applicant or not group or not amount or not reason:
             messagebox.showerror("Error", "Please fill all fields.")
             return
+        if applicant not in self.member_index:
+            messagebox.showerror("Error", "Please pick the applicant from the member list.")
+            return
 
         try:
             amount = float(amount)
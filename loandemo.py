@@ -2,8 +2,15 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 import sqlite3
+import dates
+import db
+import tasks
+import ledger
+import loansummary
+import scrolling
+import services
+from virtualtable import VirtualTable
 from datetime import datetime
-from fpdf import FPDF
 import os
 
 class LoanManagement:
@@ -17,67 +24,18 @@ class LoanManagement:
         self.entry_font = ('Arial', 12)
         self.button_font = ('Arial', 12, 'bold')
 
+        # Background refreshes still in flight
+        self.summary_task = None
+        self.fund_task = None
+
         self.setup_db()
         self.create_ui()
 
     def setup_db(self):
         # Set up loan database
-        self.conn = sqlite3.connect('loandb.db')
+        self.conn = db.get_connection()
         self.cursor = self.conn.cursor()
-        
-        # Check if loans table exists
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='loans'")
-        table_exists = self.cursor.fetchone() is not None
-        
-        if not table_exists:
-            # Create the table with all columns if it doesn't exist
-            self.cursor.execute('''
-                CREATE TABLE loans (
-                    loan_id TEXT PRIMARY KEY,
-                    applicant_name TEXT NOT NULL,
-                    group_name TEXT NOT NULL,
-                    loan_amount REAL NOT NULL,
-                    purpose TEXT NOT NULL,
-                    duration_months INTEGER NOT NULL,
-                    interest_rate REAL NOT NULL,
-                    status TEXT NOT NULL,
-                    rejection_reason TEXT,
-                    approved_date TEXT,
-                    funds_allocated INTEGER DEFAULT 0
-                )
-            ''')
-        else:
-            # Check if approved_date column exists
-            try:
-                self.cursor.execute("SELECT approved_date FROM loans LIMIT 1")
-            except sqlite3.OperationalError:
-                # Add approved_date column if it doesn't exist
-                self.cursor.execute("ALTER TABLE loans ADD COLUMN approved_date TEXT")
-            
-            # Check if funds_allocated column exists
-            try:
-                self.cursor.execute("SELECT funds_allocated FROM loans LIMIT 1")
-            except sqlite3.OperationalError:
-                # Add funds_allocated column if it doesn't exist
-                self.cursor.execute("ALTER TABLE loans ADD COLUMN funds_allocated INTEGER DEFAULT 0")
-        
-        # Set up fund allocation tracking table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS fund_allocation (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                total_available REAL,
-                total_allocated REAL,
-                last_updated TEXT
-            )
-        ''')
-        
-        # Initialize fund allocation if not exists
-        self.cursor.execute("SELECT COUNT(*) FROM fund_allocation")
-        if self.cursor.fetchone()[0] == 0:
-            self.cursor.execute("INSERT INTO fund_allocation (total_available, total_allocated, last_updated) VALUES (0, 0, ?)", 
-                               (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
-        
-        self.conn.commit()
+        self.loan_service = services.LoanService(self.conn)
 
     def create_ui(self):
         for widget in self.parent.winfo_children():
@@ -109,8 +67,8 @@ class LoanManagement:
         # Configure canvas to resize the scrollable frame when the canvas size changes
         self.canvas.bind('<Configure>', self.on_canvas_resize)
         
-        # Bind mouse wheel to scrolling
-        self.canvas.bind_all("<MouseWheel>", self.on_mousewheel)
+        # Wheel scrolling only while the pointer is over this screen (it may be cached and hidden)
+        scrolling.bind_mousewheel(self.canvas)
         self.parent.bind("<Down>", lambda event: self.canvas.yview_scroll(1, "units"))
         self.parent.bind("<Up>", lambda event: self.canvas.yview_scroll(-1, "units"))
 
@@ -181,7 +139,8 @@ class LoanManagement:
             elif field_type == 'date':
                 self.entries[field] = tk.StringVar()
                 date_entry = DateEntry(form_frame, width=15, background=self.fg_color,
-                                      foreground='white', borderwidth=2, textvariable=self.entries[field])
+                                      foreground='white', borderwidth=2, textvariable=self.entries[field],
+                                      date_pattern=dates.DATE_PATTERN)
                 date_entry.grid(row=i, column=1, sticky='w', padx=5, pady=5, ipady=3)
                 
             elif field_type == 'checkbox':
@@ -224,6 +183,10 @@ class LoanManagement:
             self.tree.column(col, width=width, anchor='w')
             self.tree.heading(col, text=col)
 
+        self.table_view = VirtualTable(self.tree, 'loans',
+                                       ['loan_id', 'applicant_name', 'group_name', 'loan_amount', 'purpose',
+                                        'duration_months', 'interest_rate', 'status', 'approved_date', 'funds_allocated'], id_column='loan_id',
+                                       formatter=self.format_loan_row, numbered=True)
         self.tree.bind('<<TreeviewSelect>>', self.on_loan_select)
         self.scrollable_frame.grid_columnconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
@@ -254,10 +217,6 @@ class LoanManagement:
         # Update the width of the scrollable frame when the canvas changes
         self.canvas.itemconfig(self.canvas_window, width=event.width)
         
-    def on_mousewheel(self, event):
-        """Handle mouse wheel scrolling"""
-        self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-
     def get_form_data(self, include_loan_id=True):
         data = {}
         for field, entry in self.entries.items():
@@ -278,18 +237,17 @@ class LoanManagement:
             if current_status == "Approved":
                 # Set the approved date to today if empty
                 if not self.entries['approved_date'].get():
-                    self.entries['approved_date'].set(datetime.now().strftime('%Y-%m-%d'))
+                    self.entries['approved_date'].set(dates.today())
                 
                 # Check the funds_allocated checkbox
                 self.entries['funds_allocated'].set(1)
                 
                 # Check if we have funds for this loan
-                loan_amount = float(self.entries['loan_amount'].get())
-                funds_available = self.get_available_funds()
-                
-                if loan_amount > funds_available:
+                try:
+                    self.loan_service.require_funds(float(self.entries['loan_amount'].get()))
+                except services.InsufficientFunds as e:
                     messagebox.showwarning("Insufficient Funds", 
-                                          f"Cannot approve this loan. Required amount (₹{loan_amount:,.2f}) exceeds available funds (₹{funds_available:,.2f}).")
+                                          f"Cannot approve this loan. Required amount (₹{e.required:,.2f}) exceeds available funds (₹{e.available:,.2f}).")
                     # Reset status to Pending
                     self.entries['status'].set("Pending")
                     self.entries['funds_allocated'].set(0)
@@ -301,56 +259,9 @@ class LoanManagement:
 
     def add_loan(self):
         try:
-            loan_id = f"LOAN{int(datetime.now().timestamp())}"
-            self.entries['loan_id'].config(state='normal')
-            self.entries['loan_id'].delete(0, tk.END)
-            self.entries['loan_id'].insert(0, loan_id)
-            self.entries['loan_id'].config(state='disabled')
-
-            data = self.get_form_data()
-
-            # Validate numeric fields
-            try:
-                data['loan_amount'] = float(data['loan_amount'])
-                data['duration_months'] = int(data['duration_months'])
-                data['interest_rate'] = float(data['interest_rate'])
-            except ValueError:
-                messagebox.showerror("Error", "Please enter valid numbers for amount, duration and interest rate")
-                return
-                
-            # Check if loan is approved and if we have enough funds
-            if data['status'] == "Approved":
-                funds_available = self.get_available_funds()
-                if data['loan_amount'] > funds_available:
-                    messagebox.showerror("Error", f"Insufficient funds available. Required: ₹{data['loan_amount']:,.2f}, Available: ₹{funds_available:,.2f}")
-                    return
-                
-                # Ensure approved_date is set for approved loans
-                if not data['approved_date']:
-                    data['approved_date'] = datetime.now().strftime('%Y-%m-%d')
-                
-                # Make sure funds_allocated is set to 1 if status is approved
-                data['funds_allocated'] = 1
-            else:
-                # If not approved, funds should not be allocated
-                data['funds_allocated'] = 0
-                # Clear approved date if status is not approved
-                if data['status'] != "Approved":
-                    data['approved_date'] = ""
-
-            columns = ', '.join(data.keys())
-            placeholders = ', '.join(['?'] * len(data))
-            values = tuple(data.values())
-
-            self.cursor.execute(f"INSERT INTO loans ({columns}) VALUES ({placeholders})", values)
-            
-            # Update fund allocation if loan is approved
-            if data['status'] == "Approved" and data['funds_allocated'] == 1:
-                self.update_fund_allocation(data['loan_amount'])
-                
-            self.conn.commit()
+            # Fund checks, approval date and allocation are applied by the loan service
+            self.loan_service.add(self.get_form_data(include_loan_id=False))
             messagebox.showinfo("Success", "Loan application added successfully")
-            self.load_loans()
             self.clear_form()
             self.refresh_fund_status()
             self.update_loan_summary()
@@ -369,75 +280,9 @@ class LoanManagement:
             if not loan_id:
                 messagebox.showwarning("Warning", "Please select a loan to update")
                 return
-                
-            # Get the original loan data to check if status is changing
-            self.cursor.execute("SELECT status, loan_amount, funds_allocated FROM loans WHERE loan_id=?", (loan_id,))
-            original_data = self.cursor.fetchone()
-            if not original_data:
-                messagebox.showerror("Error", "Loan record not found")
-                return
-                
-            original_status, original_amount, original_funds_allocated = original_data
-            
-            # Convert funds_allocated to int if it's None
-            if original_funds_allocated is None:
-                original_funds_allocated = 0
-            
-            # Get new data from form
-            data = self.get_form_data(include_loan_id=False)
-            
-            # Validate numeric fields
-            try:
-                data['loan_amount'] = float(data['loan_amount'])
-                data['duration_months'] = int(data['duration_months'])
-                data['interest_rate'] = float(data['interest_rate'])
-            except ValueError:
-                messagebox.showerror("Error", "Please enter valid numbers for amount, duration and interest rate")
-                return
-            
-            # Check if status is changing to Approved and if we have enough funds
-            if data['status'] == "Approved" and original_status != "Approved":
-                funds_available = self.get_available_funds()
-                if data['loan_amount'] > funds_available:
-                    messagebox.showerror("Error", f"Insufficient funds available. Required: ₹{data['loan_amount']:,.2f}, Available: ₹{funds_available:,.2f}")
-                    return
-                # Add approval date for newly approved loans if not already set
-                if not data['approved_date']:
-                    data['approved_date'] = datetime.now().strftime('%Y-%m-%d')
-                # Set funds_allocated to 1
-                data['funds_allocated'] = 1
-            
-            # Check if status is changing from Approved to something else
-            if original_status == "Approved" and data['status'] != "Approved" and original_funds_allocated == 1:
-                # Return the funds to the available pool
-                self.update_fund_allocation(-original_amount)
-                data['funds_allocated'] = 0
-                # Clear the approved date
-                data['approved_date'] = ""
-            
-            # Check if loan amount is changing while status remains Approved
-            if data['status'] == "Approved" and original_status == "Approved" and data['loan_amount'] != original_amount and original_funds_allocated == 1:
-                # Calculate difference and update allocation
-                difference = data['loan_amount'] - original_amount
-                funds_available = self.get_available_funds()
-                if difference > 0 and difference > funds_available:
-                    messagebox.showerror("Error", f"Insufficient funds for amount increase. Required: ₹{difference:,.2f}, Available: ₹{funds_available:,.2f}")
-                    return
-                self.update_fund_allocation(difference)
-            
-            # Consistency check: ensure funds_allocated aligns with status
-            if data['status'] == "Approved":
-                data['funds_allocated'] = 1
-            else:
-                data['funds_allocated'] = 0
-
-            updates = ', '.join([f"{key}=?" for key in data])
-            values = tuple(data.values()) + (loan_id,)
 
-            self.cursor.execute(f"UPDATE loans SET {updates} WHERE loan_id=?", values)
-            self.conn.commit()
+            self.loan_service.update(loan_id, self.get_form_data(include_loan_id=False))
             messagebox.showinfo("Success", "Loan updated successfully")
-            self.load_loans()
             self.refresh_fund_status()
             self.update_loan_summary()
             
@@ -455,24 +300,19 @@ class LoanManagement:
         
         loan_id = self.tree.item(selected_item)['values'][0]
         
-        # Check if this is an approved loan with allocated funds
-        self.cursor.execute("SELECT status, loan_amount, funds_allocated FROM loans WHERE loan_id=?", (loan_id,))
-        loan_data = self.cursor.fetchone()
-        if loan_data and loan_data[0] == "Approved" and loan_data[2] == 1:
-            # Return funds to available pool
-            self.update_fund_allocation(-loan_data[1])
-        
-        self.cursor.execute("DELETE FROM loans WHERE loan_id=?", (loan_id,))
-        self.conn.commit()
-        messagebox.showinfo("Success", "Loan deleted successfully")
-        self.load_loans()
-        self.clear_form()
-        self.refresh_fund_status()
-        self.update_loan_summary()
-        
-        # Ensure canvas scrolling shows all content after update
-        self.scrollable_frame.update_idletasks()
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        try:
+            # Its repayments and allocated funds go with it
+            self.loan_service.delete(loan_id)
+            messagebox.showinfo("Success", "Loan deleted successfully")
+            self.clear_form()
+            self.refresh_fund_status()
+            self.update_loan_summary()
+            
+            # Ensure canvas scrolling shows all content after update
+            self.scrollable_frame.update_idletasks()
+            self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
 
     def clear_form(self):
         for field, entry in self.entries.items():
@@ -488,79 +328,35 @@ class LoanManagement:
                 entry.set(0)
 
     def load_loans(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-            
-        # Check which columns exist
-        try:
-            self.cursor.execute("SELECT loan_id, applicant_name, group_name, loan_amount, purpose, duration_months, interest_rate, status, approved_date, funds_allocated FROM loans")
-        except sqlite3.OperationalError:
-            # Fallback to basic query without the new columns
-            self.cursor.execute("SELECT loan_id, applicant_name, group_name, loan_amount, purpose, duration_months, interest_rate, status FROM loans")
-            
-        for i, row in enumerate(self.cursor.fetchall(), start=1):
-            formatted_row = list(row)
-            formatted_row[3] = f"₹{formatted_row[3]:,.2f}"  # Format amount
-            formatted_row[6] = f"{formatted_row[6]}%"      # Format interest rate
-            
-            # Handle the case where we might not have all columns
-            if len(formatted_row) > 8:  # If we have approved_date and funds_allocated
-                if formatted_row[9] is not None:
-                    formatted_row[9] = "Yes" if formatted_row[9] == 1 else "No"  # Format funds_allocated
-                else:
-                    formatted_row.append("")  # Empty placeholder for funds_allocated
-            else:
-                # Add empty values for missing columns
-                formatted_row.append("")  # Empty placeholder for approved_date
-                formatted_row.append("No")  # Default for funds_allocated
-                
-            self.tree.insert('', 'end', text=str(i), values=formatted_row)
+        self.table_view.reload()
+
+    def on_show(self):
+        """Called by the dashboard when this cached screen is shown again"""
+        self.refresh_fund_status()
+        self.update_loan_summary()
+
+    def format_loan_row(self, row):
+        formatted_row = list(row)
+        formatted_row[3] = f"₹{formatted_row[3]:,.2f}"  # Format amount
+        formatted_row[6] = f"{formatted_row[6]}%"      # Format interest rate
+        formatted_row[9] = "Yes" if formatted_row[9] == 1 else "No"  # Format funds_allocated
+        return formatted_row
     
     def update_loan_summary(self):
         """Update the loan summary information"""
-        try:
-            # Get total number of loans
-            self.cursor.execute("SELECT COUNT(*) FROM loans")
-            total_loans = self.cursor.fetchone()[0]
-            
-            # Get number of approved loans
-            self.cursor.execute("SELECT COUNT(*) FROM loans WHERE status='Approved'")
-            approved_loans = self.cursor.fetchone()[0]
-            
-            # Get number of pending loans
-            self.cursor.execute("SELECT COUNT(*) FROM loans WHERE status='Pending'")
-            pending_loans = self.cursor.fetchone()[0]
-            
-            # Get total amount of approved loans
-            self.cursor.execute("SELECT SUM(loan_amount) FROM loans WHERE status='Approved'")
-            total_approved_amount = self.cursor.fetchone()[0] or 0
-            
-            # Get total amount of pending loans
-            self.cursor.execute("SELECT SUM(loan_amount) FROM loans WHERE status='Pending'")
-            total_pending_amount = self.cursor.fetchone()[0] or 0
-            
-            # Try to get total with funds allocated
-            try:
-                self.cursor.execute("SELECT COUNT(*) FROM loans WHERE funds_allocated=1")
-                funds_allocated_count = self.cursor.fetchone()[0]
-            except sqlite3.OperationalError:
-                funds_allocated_count = 0
-            
-            summary_text = (
-                f"Total Loans: {total_loans}   |   "
-                f"Approved: {approved_loans} (₹{total_approved_amount:,.2f})   |   "
-                f"Pending: {pending_loans} (₹{total_pending_amount:,.2f})   |   "
-                f"Funds Allocated: {funds_allocated_count}   |   "
-                f"Available Funds: ₹{self.get_available_funds():,.2f}"
-            )
-            
-            self.summary_label.config(text=summary_text)
-            
-            # Ensure summary is visible by adjusting canvas scroll region
-            self.scrollable_frame.update_idletasks()
-            self.canvas.config(scrollregion=self.canvas.bbox("all"))
-        except Exception as e:
-            self.summary_label.config(text=f"Error updating summary: {str(e)}")
+        # Only the latest refresh matters; drop one still in flight
+        if self.summary_task:
+            self.summary_task.cancel()
+        self.summary_task = tasks.get_runner(self.summary_label).submit(
+            loansummary.summary_text, on_done=self.show_loan_summary, owner=self.summary_label,
+            on_error=lambda e: self.summary_label.config(text=f"Error updating summary: {str(e)}"))
+
+    def show_loan_summary(self, summary_text):
+        self.summary_label.config(text=summary_text)
+        
+        # Ensure summary is visible by adjusting canvas scroll region
+        self.scrollable_frame.update_idletasks()
+        self.canvas.config(scrollregion=self.canvas.bbox("all"))
 
     def on_loan_select(self, event):
         selected_item = self.tree.selection()
@@ -585,88 +381,47 @@ class LoanManagement:
                     elif isinstance(entry, tk.IntVar):
                         entry.set(1 if loan_data[i] == 1 else 0)
     
-    def get_contribution_net_total(self):
-        """Get the net total from the contributions database"""
-        try:
-            # Connect to the contribution database
-            contribution_conn = sqlite3.connect('contributiondb.db')
-            contribution_cursor = contribution_conn.cursor()
-            
-            # Calculate total verified contributions
-            contribution_cursor.execute("SELECT SUM(CAST(amount AS REAL)) FROM contributions WHERE status='Verified'")
-            total_contributions = contribution_cursor.fetchone()[0] or 0
-            
-            # Calculate total credits
-            contribution_cursor.execute("SELECT SUM(CAST(credit_amount AS REAL)) FROM credits")
-            total_credits = contribution_cursor.fetchone()[0] or 0
-            
-            # Calculate net total (contributions - credits)
-            net_total = total_contributions - total_credits
-            
-            contribution_conn.close()
-            return net_total
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Failed to access contribution data: {str(e)}")
-            return 0
-    
-    def get_total_allocated_funds(self):
-        """Get the total amount allocated to approve"""
-        
-    def get_total_allocated_funds(self):
-        """Get the total amount allocated to approved loans"""
-        try:
-            self.cursor.execute("SELECT total_allocated FROM fund_allocation LIMIT 1")
-            result = self.cursor.fetchone()
-            return result[0] if result else 0
-        except Exception as e:
-            return 0
-    
-    def update_fund_allocation(self, amount_change):
-        """Update the fund allocation when approving/unapproving loans"""
-        try:
-            self.cursor.execute("SELECT total_allocated FROM fund_allocation LIMIT 1")
-            current_allocated = self.cursor.fetchone()[0]
-            new_allocated = current_allocated + amount_change
-            self.cursor.execute("UPDATE fund_allocation SET total_allocated = ?, last_updated = ?", 
-                              (new_allocated, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-            self.conn.commit()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update fund allocation: {str(e)}")
-    
-    def get_available_funds(self):
-        """Calculate available funds (net total - allocated)"""
-        try:
-            net_total = self.get_contribution_net_total()
-            allocated = self.get_total_allocated_funds()
-            return net_total - allocated
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to calculate available funds: {str(e)}")
-            return 0
-    
     def refresh_fund_status(self):
         """Refresh the fund status display"""
-        try:
-            net_total = self.get_contribution_net_total()
-            allocated = self.get_total_allocated_funds()
-            available = net_total - allocated
-            
-            # Update fund allocation database with latest net total
-            self.cursor.execute("UPDATE fund_allocation SET total_available = ?, last_updated = ?", 
-                              (net_total, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        if self.fund_task:
+            self.fund_task.cancel()
+        self.fund_task = tasks.get_runner(self.fund_status_label).submit(
+            self.snapshot_fund_status, on_done=self.show_fund_status, owner=self.fund_status_label,
+            on_error=lambda e: self.fund_status_label.config(text=f"Error: {str(e)}"))
+
+    def snapshot_fund_status(self):
+        """Read the ledger (runs on a worker thread)
+
+        Read-only: a commit from the worker's connection would count as an
+        external change (see datawatch) and refresh this screen again.
+        """
+        return ledger.get_balances(db.get_cursor())
+
+    def record_fund_status(self, balances):
+        """Snapshot the ledger totals into the fund allocation record, on the main connection
+
+        Only when they changed, so two open copies of the app do not keep
+        waking each other's watchers with identical snapshots.
+        """
+        self.cursor.execute("UPDATE fund_allocation SET total_available = ?, total_allocated = ?, last_updated = ? "
+                            "WHERE total_available IS NOT ? OR total_allocated IS NOT ?",
+                            (balances['net_total'], balances['total_allocated'], datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                             balances['net_total'], balances['total_allocated']))
+        if self.cursor.rowcount:
             self.conn.commit()
-            
-            status_text = (
-                f"Total Fund: ₹{net_total:,.2f}\n"
-                f"Allocated: ₹{allocated:,.2f}\n"
-                f"Available: ₹{available:,.2f}"
-            )
-            self.fund_status_label.config(text=status_text)
-            
-            # After updating the fund status, make sure scrolling is updated
-            self.scrollable_frame.update_idletasks()
-            self.canvas.config(scrollregion=self.canvas.bbox("all"))
-        except Exception as e:
-            self.fund_status_label.config(text=f"Error: {str(e)}")
+
+    def show_fund_status(self, balances):
+        self.record_fund_status(balances)
+        status_text = (
+            f"Total Fund: ₹{balances['net_total']:,.2f}\n"
+            f"Allocated: ₹{balances['total_allocated']:,.2f}\n"
+            f"Available: ₹{balances['available']:,.2f}"
+        )
+        self.fund_status_label.config(text=status_text)
+        
+        # After updating the fund status, make sure scrolling is updated
+        self.scrollable_frame.update_idletasks()
+        self.canvas.config(scrollregion=self.canvas.bbox("all"))
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -2,7 +2,15 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 import sqlite3
-from fpdf import FPDF
+import amortization
+import dates
+import db
+import indexes
+import money
+import services
+import tasks
+from autocomplete import AutocompleteEntry, QuerySource
+from virtualtable import VirtualTable
 import os
 
 class LoanRepaymentSystem:
@@ -16,42 +24,12 @@ class LoanRepaymentSystem:
         self.setup_databases()
         self.create_widgets()
         self.load_data()
-        self.load_loan_ids()
 
     def setup_databases(self):
-        """Set up and connect to all required databases and create tables if they don't exist"""
-        # Set up loan database
-        self.loan_conn = sqlite3.connect('loandb.db')
-        self.loan_cursor = self.loan_conn.cursor()
-        
-        # Create loans table if it doesn't exist
-        self.loan_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS loans (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                loan_id TEXT UNIQUE,
-                borrower_name TEXT,
-                loan_amount REAL,
-                loan_date TEXT,
-                loan_term TEXT
-            )
-        ''')
-        self.loan_conn.commit()
-        
-        # Set up repayment database
-        self.repay_conn = sqlite3.connect('repaymentdb.db')
-        self.repay_cursor = self.repay_conn.cursor()
-        
-        # Create repayments table if it doesn't exist
-        self.repay_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS repayments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                loan_id TEXT,
-                repay_amount REAL,
-                repay_date TEXT,
-                remaining REAL
-            )
-        ''')
-        self.repay_conn.commit()
+        """Connect to the shared SHG database holding both loans and repayments"""
+        self.conn = db.get_connection()
+        self.cursor = self.conn.cursor()
+        self.repayment_service = services.RepaymentService(self.conn)
 
     def create_widgets(self):
         # Main frame with padding
@@ -63,14 +41,14 @@ class LoanRepaymentSystem:
                             bg="#F6DED8", fg="#D2665A", font=("Arial", 14, "bold"))
         frame.pack(fill="x", pady=10)
 
-        # Loan ID with dropdown
+        # Loan ID, suggested from the loans primary key as it is typed
         tk.Label(frame, text="Loan ID:", bg="#F6DED8", fg="#D2665A", 
                 font=("Arial", 12, "bold")).grid(row=0, column=0, sticky="e", pady=10)
         self.loan_id_var = tk.StringVar()
-        self.loan_id_combobox = ttk.Combobox(frame, textvariable=self.loan_id_var, 
-                                            font=("Arial", 12), width=38)
-        self.loan_id_combobox.grid(row=0, column=1, padx=10)
-        self.loan_id_combobox.bind("<FocusOut>", self.validate_loan_id)
+        self.loan_id_entry = AutocompleteEntry(frame, QuerySource('loans', 'loan_id', cursor=self.cursor),
+                                               textvariable=self.loan_id_var, font=("Arial", 12), width=38)
+        self.loan_id_entry.grid(row=0, column=1, padx=10)
+        self.loan_id_entry.bind("<FocusOut>", self.validate_loan_id, add='+')
 
         # Other fields
         tk.Label(frame, text="Repay Amount:", bg="#F6DED8", fg="#D2665A", 
@@ -80,7 +58,7 @@ class LoanRepaymentSystem:
 
         tk.Label(frame, text="Repay Date:", bg="#F6DED8", fg="#D2665A", 
                 font=("Arial", 12, "bold")).grid(row=2, column=0, sticky="e", pady=10)
-        self.date_entry = DateEntry(frame, date_pattern="yyyy-mm-dd", 
+        self.date_entry = DateEntry(frame, date_pattern=dates.DATE_PATTERN, 
                                   font=("Arial", 12), width=37)
         self.date_entry.grid(row=2, column=1, padx=10)
 
@@ -95,6 +73,7 @@ class LoanRepaymentSystem:
         tk.Button(button_frame, text="Update", command=self.update_repayment, **style).grid(row=0, column=1, padx=5)
         tk.Button(button_frame, text="Delete", command=self.delete_repayment, **style).grid(row=0, column=2, padx=5)
         tk.Button(button_frame, text="Clear", command=self.clear_form, **style).grid(row=0, column=3, padx=5)
+        tk.Button(button_frame, text="Schedule", command=self.show_schedule, **style).grid(row=0, column=4, padx=5)
        # tk.Button(button_frame, text="Generate PDF", command=self.generate_pdf, **style).grid(row=0, column=4, padx=5)
 
         # Table with scrollbars
@@ -136,25 +115,19 @@ class LoanRepaymentSystem:
             self.tree.heading(col_name, text=col_name)
             self.tree.column(col_name, width=width, anchor="center")
 
+        # Newest first; id breaks ties between repayments made on the same date
+        self.table_view = VirtualTable(self.tree, 'repayments', ['id', 'loan_id', 'repay_amount', 'repay_date', 'remaining'], id_column='id',
+                                       order_by=(indexes.REPAYMENT_PAGE_KEY, 'id'), descending=True,
+                                       formatter=self.format_repayment_row)
         self.tree.bind('<<TreeviewSelect>>', self.on_select)
 
-    def load_loan_ids(self):
-        """Load all valid loan IDs from the loans database"""
-        try:
-            self.loan_cursor.execute("SELECT loan_id FROM loans")
-            loan_ids = [row[0] for row in self.loan_cursor.fetchall()]
-            self.loan_id_combobox['values'] = loan_ids
-        except sqlite3.Error as e:
-            messagebox.showwarning("Warning", f"Could not load loan IDs: {str(e)}")
-
     def validate_loan_id(self, event=None):
         """Validate that the entered loan ID exists"""
         loan_id = self.loan_id_var.get().strip()
         if loan_id:
             try:
-                self.loan_cursor.execute("SELECT 1 FROM loans WHERE loan_id = ?", (loan_id,))
-                if not self.loan_cursor.fetchone():
-                    messagebox.showerror("Error", "Invalid Loan ID. Please select from the dropdown.")
+                if not self.repayment_service.loan_exists(loan_id):
+                    messagebox.showerror("Error", "Invalid Loan ID. Please pick one from the suggestions.")
                     self.loan_id_var.set('')
                     return False
             except sqlite3.Error as e:
@@ -166,47 +139,14 @@ class LoanRepaymentSystem:
         if not self.validate_loan_id():
             return
 
-        loan_id = self.loan_id_var.get().strip()
-        try:
-            repay_amount = float(self.repay_amount_entry.get().strip())
-            if repay_amount <= 0:
-                raise ValueError
-        except ValueError:
-            messagebox.showerror("Error", "Please enter a valid positive amount")
-            return
-
-        repay_date = self.date_entry.get()
-
-        # Get loan details
         try:
-            self.loan_cursor.execute("SELECT loan_amount FROM loans WHERE loan_id = ?", (loan_id,))
-            loan_data = self.loan_cursor.fetchone()
-            if not loan_data:
-                messagebox.showerror("Error", "Loan not found. Please select a valid loan ID.")
-                return
-
-            loan_amount = float(loan_data[0])
-
-            # Calculate total paid so far
-            self.repay_cursor.execute("SELECT SUM(repay_amount) FROM repayments WHERE loan_id = ?", (loan_id,))
-            total_paid = self.repay_cursor.fetchone()[0] or 0.0
-            new_total_paid = total_paid + repay_amount
-
-            if new_total_paid > loan_amount:
-                messagebox.showerror("Error", 
-                                   f"Repayment exceeds loan amount. Maximum payment allowed: {loan_amount - total_paid:,.2f}")
-                return
-
-            remaining = loan_amount - new_total_paid
-
-            self.repay_cursor.execute(
-                "INSERT INTO repayments (loan_id, repay_amount, repay_date, remaining) VALUES (?, ?, ?, ?)",
-                (loan_id, repay_amount, repay_date, remaining)
-            )
-            self.repay_conn.commit()
-            self.load_data()
+            # The service keeps the loan's repayments within its amount
+            self.repayment_service.add(self.loan_id_var.get().strip(), self.repay_amount_entry.get(),
+                                       self.date_entry.get())
             self.clear_form()
             messagebox.showinfo("Success", "Repayment added successfully!")
+        except services.ServiceError as e:
+            messagebox.showerror("Error", str(e))
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"Failed to add repayment: {str(e)}")
 
@@ -219,52 +159,14 @@ class LoanRepaymentSystem:
         if not self.validate_loan_id():
             return
 
-        item = self.tree.item(selected)
-        repay_id = item["values"][0]
-        loan_id = self.loan_id_var.get().strip()
-
-        try:
-            repay_amount = float(self.repay_amount_entry.get().strip())
-            if repay_amount <= 0:
-                raise ValueError
-        except ValueError:
-            messagebox.showerror("Error", "Please enter a valid positive amount")
-            return
-
-        repay_date = self.date_entry.get()
-
+        repay_id = self.tree.item(selected)["values"][0]
         try:
-            # Get loan details
-            self.loan_cursor.execute("SELECT loan_amount FROM loans WHERE loan_id = ?", (loan_id,))
-            loan_data = self.loan_cursor.fetchone()
-            if not loan_data:
-                messagebox.showerror("Error", "Loan not found. Please select a valid loan ID.")
-                return
-
-            loan_amount = float(loan_data[0])
-
-            # Calculate total paid excluding current record
-            self.repay_cursor.execute(
-                "SELECT SUM(repay_amount) FROM repayments WHERE loan_id = ? AND id != ?",
-                (loan_id, repay_id)
-            )
-            other_paid = self.repay_cursor.fetchone()[0] or 0.0
-
-            if repay_amount + other_paid > loan_amount:
-                messagebox.showerror("Error", 
-                                   f"Updated amount exceeds loan limit. Maximum payment allowed: {loan_amount - other_paid:,.2f}")
-                return
-
-            remaining = loan_amount - (repay_amount + other_paid)
-
-            self.repay_cursor.execute(
-                "UPDATE repayments SET loan_id = ?, repay_amount = ?, repay_date = ?, remaining = ? WHERE id = ?",
-                (loan_id, repay_amount, repay_date, remaining, repay_id)
-            )
-            self.repay_conn.commit()
-            self.load_data()
+            self.repayment_service.update(repay_id, self.loan_id_var.get().strip(), self.repay_amount_entry.get(),
+                                          self.date_entry.get())
             self.clear_form()
             messagebox.showinfo("Success", "Repayment updated successfully!")
+        except services.ServiceError as e:
+            messagebox.showerror("Error", str(e))
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"Failed to update repayment: {str(e)}")
 
@@ -277,9 +179,7 @@ class LoanRepaymentSystem:
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this repayment record?"):
             repay_id = self.tree.item(selected)["values"][0]
             try:
-                self.repay_cursor.execute("DELETE FROM repayments WHERE id = ?", (repay_id,))
-                self.repay_conn.commit()
-                self.load_data()
+                self.repayment_service.delete(repay_id)
                 self.clear_form()
                 messagebox.showinfo("Success", "Repayment deleted successfully.")
             except sqlite3.Error as e:
@@ -291,31 +191,21 @@ class LoanRepaymentSystem:
         self.date_entry.set_date('')
 
     def load_data(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        
         try:
-            # Load repayment data without total amount column
-            self.repay_cursor.execute('''
-                SELECT id, loan_id, repay_amount, repay_date, remaining 
-                FROM repayments
-                ORDER BY repay_date DESC
-            ''')
-            
-            for row in self.repay_cursor.fetchall():
-                # Format money values
-                formatted_row = [
-                    row[0],                  # ID
-                    row[1],                  # Loan ID
-                    f"{row[2]:,.2f}",        # Repay amount
-                    row[3],                  # Date
-                    f"{row[4]:,.2f}"         # Remaining
-                ]
-                self.tree.insert("", "end", values=formatted_row)
-                
+            self.table_view.reload()
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"Failed to load repayment data: {str(e)}")
 
+    def format_repayment_row(self, row):
+        # Format money values
+        return [
+            row[0],                  # ID
+            row[1],                  # Loan ID
+            f"{row[2]:,.2f}",        # Repay amount
+            row[3],                  # Date
+            f"{row[4]:,.2f}"         # Remaining
+        ]
+
     def on_select(self, event):
         selected = self.tree.selection()
         if not selected:
@@ -343,6 +233,55 @@ class LoanRepaymentSystem:
             # If date format is incompatible or empty
             pass
 
+    def show_schedule(self):
+        """Compare the entered loan's repayments with its expected EMI schedule"""
+        if not self.validate_loan_id():
+            return
+        loan_id = self.loan_id_var.get().strip()
+        if not loan_id:
+            messagebox.showerror("Error", "Please enter a loan ID.")
+            return
+        try:
+            # Written here, on the main connection, so that the worker only reads
+            amortization.regenerate(self.conn, [loan_id], missing_only=True)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to build the schedule: {str(e)}")
+            return
+        tasks.get_runner(self.tree).submit(
+            amortization.schedule_vs_paid, loan_id, on_done=lambda rows: self.open_schedule(loan_id, rows),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to build the schedule: {str(e)}"))
+
+    def open_schedule(self, loan_id, rows):
+        if not rows:
+            messagebox.showinfo("Schedule", f"Loan {loan_id} has no schedule; only approved loans with an "
+                                            "approved date and a duration get one.")
+            return
+
+        window = tk.Toplevel(self.root, bg="#F6DED8")
+        window.title(f"Schedule for loan {loan_id}")
+        columns = [("No.", 50), ("Due Date", 110), ("EMI", 110), ("Interest", 100), ("Principal", 110),
+                   ("Balance", 120), ("Principal To Date", 130), ("Paid By Then", 120), ("Status", 130)]
+        tree = ttk.Treeview(window, columns=[name for name, _ in columns], show="headings", height=15)
+        for name, width in columns:
+            tree.heading(name, text=name)
+            tree.column(name, width=width, anchor="center")
+        vsb = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.pack(side="left", fill="both", expand=True, padx=(20, 0), pady=20)
+        vsb.pack(side="left", fill="y", pady=20, padx=(0, 20))
+
+        today = dates.today()
+        # Repayments are capped at the loan amount, so they are measured against principal
+        for number, due_date, due, interest, principal, balance, principal_to_date, paid in rows:
+            if paid >= principal_to_date:
+                status = "Paid"
+            elif due_date < today:
+                status = f"Short {money.to_rupees(principal_to_date - paid):,.2f}"
+            else:
+                status = "Upcoming"
+            tree.insert("", "end", values=(number, due_date, *(f"{money.to_rupees(v):,.2f}" for v in (
+                due, interest, principal, balance, principal_to_date, paid)), status))
+
     def generate_pdf(self):
         selected = self.tree.selection()
         if not selected:
@@ -353,63 +292,60 @@ class LoanRepaymentSystem:
         if not values:
             return
         
+        tasks.get_runner(self.tree).submit(
+            self.write_receipt, values, on_done=self.open_receipt,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to generate PDF: {str(e)}"))
+
+    def write_receipt(self, values):
+        """Render a repayment receipt and return its file name (runs on a worker thread)"""
+        # Get loan amount from database for PDF, on this worker's own connection
+        loan_id = values[1]
+        cursor = db.get_cursor()
+        cursor.execute("SELECT loan_amount FROM loans WHERE loan_id = ?", (loan_id,))
+        loan_data = cursor.fetchone()
+        total_amount = "Unknown"
+        if loan_data and loan_data[0]:
+            total_amount = f"{float(loan_data[0]):,.2f}"
+
+        from fpdf import FPDF
+
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Arial", size=14)
+        
+        # Header
+        pdf.cell(200, 10, txt="Loan Repayment Receipt", ln=True, align="C")
+        pdf.ln(10)
+        
+        # Loan details
+        pdf.set_font("Arial", size=12)
+        pdf.cell(200, 10, txt=f"Repayment ID: {values[0]}", ln=True)
+        pdf.cell(200, 10, txt=f"Loan ID: {values[1]}", ln=True)
+        pdf.cell(200, 10, txt=f"Total Loan Amount: {'' if total_amount == 'Unknown' else '₹'}{total_amount}", ln=True)
+        pdf.cell(200, 10, txt=f"Amount Paid: ₹{values[2]}", ln=True)
+        pdf.cell(200, 10, txt=f"Payment Date: {values[3]}", ln=True)
+        pdf.cell(200, 10, txt=f"Remaining Balance: ₹{values[4]}", ln=True)
+        
+        filename = f"Repayment_Receipt_{values[0]}.pdf"
+        pdf.output(filename)
+        return filename
+
+    def open_receipt(self, filename):
+        messagebox.showinfo("Success", f"PDF receipt generated: {filename}")
+        
+        # Try to open the file with default application
         try:
-            # Get loan amount from database for PDF
-            loan_id = values[1]
-            self.loan_cursor.execute("SELECT loan_amount FROM loans WHERE loan_id = ?", (loan_id,))
-            loan_data = self.loan_cursor.fetchone()
-            total_amount = "Unknown"
-            if loan_data and loan_data[0]:
-                total_amount = f"{float(loan_data[0]):,.2f}"
-                
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=14)
-            
-            # Header
-            pdf.cell(200, 10, txt="Loan Repayment Receipt", ln=True, align="C")
-            pdf.ln(10)
-            
-            # Loan details
-            pdf.set_font("Arial", size=12)
-            pdf.cell(200, 10, txt=f"Repayment ID: {values[0]}", ln=True)
-            pdf.cell(200, 10, txt=f"Loan ID: {values[1]}", ln=True)
-            pdf.cell(200, 10, txt=f"Total Loan Amount: {'' if total_amount == 'Unknown' else '₹'}{total_amount}", ln=True)
-            pdf.cell(200, 10, txt=f"Amount Paid: ₹{values[2]}", ln=True)
-            pdf.cell(200, 10, txt=f"Payment Date: {values[3]}", ln=True)
-            pdf.cell(200, 10, txt=f"Remaining Balance: ₹{values[4]}", ln=True)
-            
-            filename = f"Repayment_Receipt_{values[0]}.pdf"
-            pdf.output(filename)
-            
-            messagebox.showinfo("Success", f"PDF receipt generated: {filename}")
-            
-            # Try to open the file with default application
+            os.startfile(filename)
+        except AttributeError:
+            # For non-Windows platforms
+            import subprocess
             try:
-                os.startfile(filename)
-            except AttributeError:
-                # For non-Windows platforms
-                import subprocess
+                subprocess.call(('xdg-open', filename))  # Linux
+            except:
                 try:
-                    subprocess.call(('xdg-open', filename))  # Linux
+                    subprocess.call(('open', filename))  # macOS
                 except:
-                    try:
-                        subprocess.call(('open', filename))  # macOS
-                    except:
-                        messagebox.showinfo("Info", f"PDF saved as {filename}, but could not be opened automatically.")
-                        
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate PDF: {str(e)}")
-
-    def __del__(self):
-        """Clean up database connections when object is destroyed"""
-        try:
-            if hasattr(self, 'loan_conn'):
-                self.loan_conn.close()
-            if hasattr(self, 'repay_conn'):
-                self.repay_conn.close()
-        except:
-            pass
+                    messagebox.showinfo("Info", f"PDF saved as {filename}, but could not be opened automatically.")
 
 if __name__ == "__main__":
     root = tk.Tk()
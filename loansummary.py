@@ -0,0 +1,66 @@
+import db
+import ledger
+
+# One pass over loans, grouped by status; replaces six separate COUNT/SUM queries
+SUMMARY_QUERY = '''
+    SELECT status, COUNT(*), COALESCE(SUM(loan_amount), 0), COALESCE(SUM(funds_allocated = 1), 0)
+    FROM loans
+    GROUP BY status
+'''
+
+
+class LoanSummary:
+    """Loan counts and amounts per status, read from the loans table in one query"""
+
+    def __init__(self, rows=()):
+        self.counts = {}
+        self.amounts = {}
+        self.funds_allocated = 0
+        for status, count, amount, allocated in rows:
+            self.counts[status] = count
+            self.amounts[status] = amount
+            self.funds_allocated += allocated
+
+    @property
+    def total_loans(self):
+        return sum(self.counts.values())
+
+    @property
+    def approved(self):
+        return self.counts.get('Approved', 0)
+
+    @property
+    def pending(self):
+        return self.counts.get('Pending', 0)
+
+    @property
+    def approved_amount(self):
+        return self.amounts.get('Approved', 0)
+
+    @property
+    def pending_amount(self):
+        return self.amounts.get('Pending', 0)
+
+    def format(self, available=None):
+        """Render the summary as the one-line text shown on the loan screen"""
+        parts = [
+            f"Total Loans: {self.total_loans}",
+            f"Approved: {self.approved} (₹{self.approved_amount:,.2f})",
+            f"Pending: {self.pending} (₹{self.pending_amount:,.2f})",
+            f"Funds Allocated: {self.funds_allocated}",
+        ]
+        if available is not None:
+            parts.append(f"Available Funds: ₹{available:,.2f}")
+        return "   |   ".join(parts)
+
+
+def load_summary(cursor):
+    """Build a LoanSummary with a single GROUP BY status pass over loans"""
+    cursor.execute(SUMMARY_QUERY)
+    return LoanSummary(cursor.fetchall())
+
+
+def summary_text():
+    """Summary line with available funds, read on the calling thread's own connection"""
+    cursor = db.get_cursor()
+    return load_summary(cursor).format(ledger.get_available_funds(cursor))
@@ -1,10 +1,10 @@
-import subprocess
 import tkinter as tk
 from tkinter import messagebox, font
 
 class LoginSystem:
-    def __init__(self, root):
+    def __init__(self, root, shell=None):
         self.root = root
+        self.shell = shell
         self.root.title("Self Help Group Management System")
         self.root.geometry("{0}x{1}+0+0".format(root.winfo_screenwidth(), root.winfo_screenheight()))
         self.root.configure(bg="#F6DED8")
@@ -114,7 +114,7 @@ class LoginSystem:
             if username == self.admin_username and password == self.admin_password:
                 messagebox.showinfo("Login Successful", "Welcome Admin!")
                 admin_window.destroy()
-                subprocess.Popen(["python", "dash.py"])
+                self.open_admin_dashboard(username)
                 
             else:
                 messagebox.showerror("Login Failed", "Invalid admin credentials")
@@ -189,8 +189,7 @@ class LoginSystem:
             if username == self.member_username and password == self.member_password:
                 messagebox.showinfo("Login Successful", f"Welcome {username}!")
                 member_window.destroy()
-                # You can add member dashboard opening code here
-                subprocess.Popen(["python", "member.py"])
+                self.get_shell().show_member(username)
             else:
                 messagebox.showerror("Login Failed", "Invalid member credentials")
         
@@ -204,19 +203,16 @@ class LoginSystem:
                                  width=15, command=member_window.destroy)
         close_button.pack(pady=10)
         
-    def open_admin_dashboard(self, username):
-        try:
-            import dash
-            dashboard_root = tk.Toplevel(self.root)
-            dashboard_root.protocol("WM_DELETE_WINDOW", lambda: self.on_dashboard_close(dashboard_root))
-            dash.Dashboard(dashboard_root, username)
-        except ImportError:
-            messagebox.showerror("Error", "dash.py module not found!")
+    def get_shell(self):
+        # Navigation stays in this process; see app.AppShell
+        if self.shell is None:
+            import app
+            self.shell = app.AppShell(self.root)
+        return self.shell
 
-    def on_dashboard_close(self, dashboard_window):
-        dashboard_window.destroy()
+    def open_admin_dashboard(self, username):
+        self.get_shell().show_dashboard(username)
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = LoginSystem(root)
-    root.mainloop()
\ No newline at end of file
+    import app
+    app.main()
\ No newline at end of file
@@ -1,8 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import sqlite3
+import db
+import scrolling
+import tasks
 from datetime import datetime
-from fpdf import FPDF
 import os
 
 class LoanManagement:
@@ -20,9 +22,12 @@ class LoanManagement:
         self.create_ui()
 
     def setup_db(self):
-        self.conn = sqlite3.connect('memberloandb.db')
+        self.conn = db.get_connection('memberloandb.db')
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''
+        db.ensure_schema('memberloandb.db', 'member_loans', self.create_tables)
+
+    def create_tables(self, cursor):
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS loans (
                 loan_id TEXT PRIMARY KEY,
                 applicant_name TEXT NOT NULL,
@@ -33,7 +38,6 @@ class LoanManagement:
                 application_date TEXT NOT NULL
             )
         ''')
-        self.conn.commit()
 
     def create_ui(self):
         for widget in self.parent.winfo_children():
@@ -50,7 +54,8 @@ class LoanManagement:
         self.canvas.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
 
-        self.canvas.bind_all("<MouseWheel>", lambda event: self.canvas.yview_scroll(int(-1*(event.delta/120)), "units"))
+        # Wheel scrolling only while the pointer is over this screen (it may be cached and hidden)
+        scrolling.bind_mousewheel(self.canvas)
 
         tk.Label(self.scrollable_frame, text="Loan Management System", font=self.title_font, bg=self.bg_color, fg=self.fg_color).grid(row=0, column=0, columnspan=4, pady=20, sticky='w')
 
@@ -260,34 +265,42 @@ class LoanManagement:
         if not file_path:
             return
 
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", 'B', 16)
-            pdf.cell(0, 10, "Loan Application Details", 0, 1, 'C')
-            pdf.ln(10)
-            pdf.set_font("Arial", '', 12)
-
-            details = [
-                ("Loan ID", loan_dict['loan_id']),
-                ("Applicant Name", loan_dict['applicant_name']),
-                ("Group Name", loan_dict['group_name']),
-                ("Loan Amount", f"₹{float(loan_dict['loan_amount']):,.2f}"),
-                ("Purpose", loan_dict['purpose']),
-                ("Duration", f"{loan_dict['duration_months']} months"),
-                ("Application Date", loan_dict['application_date'])
-            ]
-
-            for label, value in details:
-                pdf.cell(50, 10, label + ":", 0, 0)
-                pdf.cell(0, 10, value, 0, 1)
-
-            pdf.output(file_path)
-            messagebox.showinfo("Success", f"PDF generated successfully:\n{file_path}")
-            if messagebox.askyesno("Open PDF", "Would you like to open the generated PDF?"):
-                os.startfile(file_path)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate PDF: {str(e)}")
+        tasks.get_runner(self.tree).submit(
+            self.write_application, loan_dict, file_path, on_done=self.open_application,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to generate PDF: {str(e)}"))
+
+    def write_application(self, loan_dict, file_path):
+        """Render the loan application PDF (runs on a worker thread)"""
+        from fpdf import FPDF
+
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Arial", 'B', 16)
+        pdf.cell(0, 10, "Loan Application Details", 0, 1, 'C')
+        pdf.ln(10)
+        pdf.set_font("Arial", '', 12)
+
+        details = [
+            ("Loan ID", loan_dict['loan_id']),
+            ("Applicant Name", loan_dict['applicant_name']),
+            ("Group Name", loan_dict['group_name']),
+            ("Loan Amount", f"₹{float(loan_dict['loan_amount']):,.2f}"),
+            ("Purpose", loan_dict['purpose']),
+            ("Duration", f"{loan_dict['duration_months']} months"),
+            ("Application Date", loan_dict['application_date'])
+        ]
+
+        for label, value in details:
+            pdf.cell(50, 10, label + ":", 0, 0)
+            pdf.cell(0, 10, value, 0, 1)
+
+        pdf.output(file_path)
+        return file_path
+
+    def open_application(self, file_path):
+        messagebox.showinfo("Success", f"PDF generated successfully:\n{file_path}")
+        if messagebox.askyesno("Open PDF", "Would you like to open the generated PDF?"):
+            os.startfile(file_path)
 
 
 if __name__ == "__main__":
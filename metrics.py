@@ -0,0 +1,94 @@
+from datetime import date
+
+import changes
+import db
+import ledger
+import money
+
+
+def _fund_balance(cursor):
+    return f"₹{ledger.get_available_funds(cursor):,.2f} available"
+
+
+def _active_members(cursor):
+    cursor.execute("SELECT COUNT(*) FROM users WHERE account_status = 'Active'")
+    return f"{cursor.fetchone()[0]:,} active members"
+
+
+def _pending_loans(cursor):
+    cursor.execute("SELECT COUNT(*), COALESCE(SUM(loan_amount), 0) FROM loans WHERE status = 'Pending'")
+    count, amount = cursor.fetchone()
+    return f"{count:,} pending (₹{amount:,.0f})"
+
+
+def _monthly_collections(cursor):
+    # Verified contributions plus loan repayments dated this calendar month. The
+    # unary + keeps SQLite on the date index, which covers status and amount,
+    # instead of reading every verified contribution through the status index
+    today = date.today()
+    start = today.replace(day=1)
+    end = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    bounds = (start.isoformat(), end.isoformat())
+    cursor.execute('''
+        SELECT (SELECT COALESCE(SUM(amount_paise), 0) FROM contributions
+                WHERE transaction_date >= ? AND transaction_date < ? AND +status = 'Verified')
+             + (SELECT COALESCE(SUM(CAST(ROUND(repay_amount * 100) AS INTEGER)), 0) FROM repayments
+                WHERE repay_date >= ? AND repay_date < ?)
+    ''', bounds + bounds)
+    return f"{money.format_rupees(cursor.fetchone()[0])} collected this month"
+
+
+# KPI -> (tables whose writes change it, function computing its display text)
+KPIS = {
+    'fund_balance': (('contributions', 'credits', 'loans'), _fund_balance),
+    'active_members': (('users',), _active_members),
+    'pending_loans': (('loans',), _pending_loans),
+    'monthly_collections': (('contributions', 'repayments'), _monthly_collections),
+}
+
+
+class MetricsCache:
+    """KPI texts computed once and kept until a table they read is written
+
+    Writes reach it through changes.publish (or invalidate() for bulk
+    writes that do not list their keys); values are also dropped at the
+    end of the day, since some KPIs depend on today's date.
+    """
+
+    def __init__(self, kpis=KPIS):
+        self.kpis = kpis
+        # key -> (day computed, text)
+        self.values = {}
+        for table in {table for tables, _ in kpis.values() for table in tables}:
+            changes.subscribe(table, lambda keys, table=table: self.invalidate(table))
+
+    def invalidate(self, *tables):
+        for key, (depends_on, _) in self.kpis.items():
+            if any(table in depends_on for table in tables):
+                self.values.pop(key, None)
+
+    def get(self, key, cursor=None):
+        today = date.today()
+        cached = self.values.get(key)
+        if cached is None or cached[0] != today:
+            text = self.kpis[key][1](cursor or db.get_cursor())
+            cached = self.values[key] = (today, text)
+        return cached[1]
+
+
+_cache = MetricsCache()
+
+
+def get(key, cursor=None):
+    """Display text of one KPI, from the cache unless its tables changed since"""
+    return _cache.get(key, cursor)
+
+
+def invalidate(*tables):
+    """Drop cached KPIs that read any of these tables"""
+    _cache.invalidate(*tables)
+
+
+def clear():
+    """Drop every cached KPI, e.g. after another connection wrote to the database"""
+    _cache.values.clear()
@@ -0,0 +1,133 @@
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+import schema
+
+# Per-module database files and the tables each one contributes, in
+# dependency order (loans must arrive before the repayments that reference them)
+LEGACY_SOURCES = [
+    ('shg_management.db', ['users']),
+    ('staffdb.db', ['staff']),
+    ('eventdb.db', ['events']),
+    ('bankdb.db', ['bank_accounts']),
+    ('contributiondb.db', ['contributions', 'credits']),
+    ('loandb.db', ['loans', 'fund_allocation']),
+    ('repaymentdb.db', ['repayments']),
+]
+
+
+def _columns(conn, table, database='main'):
+    return [row[1] for row in conn.execute(f"PRAGMA {database}.table_info({table})")]
+
+
+def _copy_table(conn, table):
+    """Copy one attached legacy table into the unified schema, returning (copied, skipped)"""
+    source_columns = _columns(conn, table, 'legacy')
+    if not source_columns:
+        return 0, 0
+    target_columns = _columns(conn, table)
+    columns = ', '.join(c for c in target_columns if c in source_columns)
+
+    where = ""
+    if table == 'repayments':
+        # Rows pointing at unknown loans would violate the foreign key
+        where = " WHERE loan_id IS NULL OR loan_id IN (SELECT loan_id FROM main.loans)"
+    elif table == 'fund_allocation':
+        # The legacy allocation totals replace the row seeded by the new schema
+        conn.execute("DELETE FROM main.fund_allocation")
+
+    total = conn.execute(f"SELECT COUNT(*) FROM legacy.{table}").fetchone()[0]
+    # rowcount, unlike total_changes, leaves out rows written by the fund ledger triggers
+    copied = conn.execute(f"INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM legacy.{table}{where}").rowcount
+    return copied, total - copied
+
+
+def import_legacy(conn, source_dir='.'):
+    """Copy every not-yet-imported legacy database file into the unified schema"""
+    conn.commit()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS legacy_imports (
+            source_file TEXT PRIMARY KEY,
+            imported_at TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+
+    report = []
+    for filename, tables in LEGACY_SOURCES:
+        path = os.path.join(source_dir, filename)
+        if not os.path.exists(path):
+            continue
+        if conn.execute("SELECT 1 FROM legacy_imports WHERE source_file = ?", (filename,)).fetchone():
+            continue
+
+        conn.execute("ATTACH DATABASE ? AS legacy", (path,))
+        try:
+            for table in tables:
+                exists = conn.execute("SELECT 1 FROM legacy.sqlite_master WHERE type='table' AND name=?",
+                                      (table,)).fetchone()
+                if not exists:
+                    continue
+                copied, skipped = _copy_table(conn, table)
+                # Legacy rows still carry their old date and amount formats
+                ambiguous = schema.normalize_dates(conn.cursor(), (table,))
+                schema.normalize_amounts(conn.cursor(), (table,))
+                report.append((filename, table, copied, skipped, len(ambiguous)))
+            conn.execute("INSERT INTO legacy_imports (source_file, imported_at) VALUES (?, ?)",
+                         (filename, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("DETACH DATABASE legacy")
+    return report
+
+
+def date_review(db_path=schema.DB_PATH):
+    """Dates read month-first that may have been meant day-first, as (table, key, column, original, stored)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='date_review'").fetchone():
+            return []
+        return conn.execute("SELECT * FROM date_review ORDER BY table_name, row_key, column_name").fetchall()
+    finally:
+        conn.close()
+
+
+def migrate(db_path=schema.DB_PATH, source_dir='.'):
+    """Create the unified schema and import the legacy files into it"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        schema.apply_migrations(conn.cursor())
+        conn.commit()
+        return import_legacy(conn, source_dir)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the per-module SHG databases into one file")
+    parser.add_argument('--db', default=schema.DB_PATH, help="unified database file to create or update")
+    parser.add_argument('--source-dir', default='.', help="directory holding the legacy .db files")
+    parser.add_argument('--review', action='store_true',
+                        help="list the dates read month-first that may have been meant day-first")
+    args = parser.parse_args()
+
+    if args.review:
+        rows = date_review(args.db)
+        if not rows:
+            print("No ambiguous dates to review")
+        for table, key, column, original, stored in rows:
+            print(f"{table} {key} {column}: {original!r} stored as {stored}")
+    else:
+        report = migrate(args.db, args.source_dir)
+        if not report:
+            print("Nothing to migrate; all legacy files have already been imported")
+        for filename, table, copied, skipped, ambiguous in report:
+            print(f"{filename}:{table}: {copied} copied, {skipped} skipped")
+            if ambiguous:
+                print(f"  {ambiguous} dates read month-first could be day-first; check them with --review")
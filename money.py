@@ -0,0 +1,32 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+def to_paise(value):
+    """Convert a rupee amount (str, int or float) to integer paise"""
+    try:
+        rupees = Decimal(str(value).replace(',', '').replace('₹', '').strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not rupees.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    return int((rupees * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def to_text(value):
+    """Normalize a rupee amount to the plain "rupees.paise" text the amount columns store
+
+    The generated *_paise columns CAST that text, which reads "1,000" as 1
+    and "₹500" as 0, so formatted input must be normalized before storing.
+    """
+    paise = to_paise(value)
+    sign = '-' if paise < 0 else ''
+    return f"{sign}{abs(paise) // 100}.{abs(paise) % 100:02d}"
+
+
+def to_rupees(paise):
+    """Convert integer paise back to rupees for display and arithmetic"""
+    return (paise or 0) / 100
+
+
+def format_rupees(paise):
+    return f"₹{to_rupees(paise):,.2f}"
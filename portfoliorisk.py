@@ -0,0 +1,103 @@
+import tkinter as tk
+from tkinter import ttk
+
+import money
+import risk
+import tasks
+
+# Most overdue loans listed; the totals above the table cover all of them
+MAX_ROWS = 500
+
+
+def bucket(days):
+    """Arrears bucket label for a number of days past due"""
+    lower = 1
+    for upper in risk.PAR_DAYS:
+        if days <= upper:
+            return f"{lower}-{upper} days"
+        lower = upper + 1
+    return f"Over {risk.PAR_DAYS[-1]} days"
+
+
+class PortfolioRisk:
+    """Portfolio at risk (PAR30/60/90) and the loans in arrears, computed in the background"""
+
+    def __init__(self, parent, bg_color, fg_color):
+        self.parent = parent
+        self.bg_color = bg_color
+        self.fg_color = fg_color
+        self.title_font = ('Arial', 18, 'bold')
+        self.label_font = ('Arial', 12)
+        self.button_font = ('Arial', 12, 'bold')
+
+        # Refresh still in flight
+        self.task = None
+
+        self.create_ui()
+        self.refresh()
+
+    def create_ui(self):
+        frame = tk.Frame(self.parent, bg=self.bg_color)
+        frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        header = tk.Frame(frame, bg=self.bg_color)
+        header.pack(fill=tk.X)
+        tk.Label(header, text="Portfolio Risk", font=self.title_font,
+                 bg=self.bg_color, fg=self.fg_color).pack(side=tk.LEFT, pady=10)
+        tk.Button(header, text="Refresh", command=self.refresh, font=self.button_font,
+                  bg=self.fg_color, fg='white', bd=0, padx=15).pack(side=tk.RIGHT)
+
+        # One tile per PAR threshold: share of the portfolio and number of loans
+        tiles = tk.Frame(frame, bg=self.bg_color)
+        tiles.pack(fill=tk.X, pady=10)
+        self.par_labels = {}
+        for column, days in enumerate(risk.PAR_DAYS):
+            tile = tk.Frame(tiles, bg='white', bd=2, relief='groove')
+            tile.grid(row=0, column=column, padx=10, sticky='nsew')
+            tiles.grid_columnconfigure(column, weight=1)
+            tk.Label(tile, text=f"PAR{days}", font=self.button_font, bg='white', fg=self.fg_color).pack(pady=(10, 0))
+            self.par_labels[days] = tk.Label(tile, text="...", font=self.title_font, bg='white')
+            self.par_labels[days].pack(pady=(0, 10))
+
+        self.summary_label = tk.Label(frame, text="Calculating portfolio risk...", font=self.label_font,
+                                      bg=self.bg_color, fg=self.fg_color)
+        self.summary_label.pack(fill=tk.X, pady=5)
+
+        table_frame = tk.Frame(frame)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        columns = [("Loan ID", 120), ("Applicant", 180), ("Group", 140), ("Outstanding", 140),
+                   ("Arrears", 140), ("Days Past Due", 120), ("Bucket", 120)]
+        self.tree = ttk.Treeview(table_frame, columns=[name for name, _ in columns], show='headings', height=15)
+        for name, width in columns:
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=width, anchor='center')
+        scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def on_show(self):
+        """Called by the dashboard when this cached screen is shown again"""
+        self.refresh()
+
+    def refresh(self):
+        if self.task:
+            self.task.cancel()
+        self.summary_label.config(text="Calculating portfolio risk...")
+        self.task = tasks.get_runner(self.tree).submit(
+            risk.portfolio_risk, on_done=self.show_report, owner=self.tree,
+            on_error=lambda e: self.summary_label.config(text=f"Portfolio risk unavailable: {str(e)}"))
+
+    def show_report(self, report):
+        for days, label in self.par_labels.items():
+            _, count = report.par[days]
+            label.config(text=f"{report.par_ratio(days):.1%}  ({count})")
+        text = f"As of {report.as_of.isoformat()}   |   {report.summary()}"
+        if len(report.overdue) > MAX_ROWS:
+            text += f"   |   Showing the {MAX_ROWS} most overdue"
+        self.summary_label.config(text=text)
+
+        self.tree.delete(*self.tree.get_children())
+        for loan_id, applicant, group, outstanding, arrears, days in report.overdue[:MAX_ROWS]:
+            self.tree.insert('', 'end', values=(loan_id, applicant, group, money.format_rupees(outstanding),
+                                                money.format_rupees(arrears), days, bucket(days)))
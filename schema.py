@@ -0,0 +1,770 @@
+import dates
+import indexes
+import money
+import sqlite3
+from datetime import datetime
+
+# Single database file that holds every SHG table
+DB_PATH = 'shg.db'
+
+
+def _execute_script(cursor, script):
+    # Statement by statement: executescript() would commit first and run
+    # outside the migration's transaction
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            cursor.execute(statement)
+            statement = ''
+    if statement.strip():
+        cursor.execute(statement)
+
+
+def create_base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            dob TEXT NOT NULL,
+            gender TEXT NOT NULL,
+            reg_date TEXT NOT NULL,
+            account_status TEXT NOT NULL,
+            primary_phone TEXT UNIQUE NOT NULL,
+            secondary_phone TEXT,
+            email TEXT UNIQUE,
+            emergency_contact TEXT NOT NULL,
+            street TEXT,
+            city TEXT,
+            state TEXT,
+            postal_code TEXT,
+            country TEXT,
+            is_phone_verified INTEGER DEFAULT 0,
+            is_email_verified INTEGER DEFAULT 0
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS staff (
+            staff_id TEXT PRIMARY KEY,
+            full_name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            contact_info TEXT NOT NULL,
+            assigned_groups TEXT NOT NULL,
+            last_login TEXT,
+            activity TEXT,
+            status TEXT NOT NULL,
+            emergency_contact TEXT NOT NULL,
+            is_phone_verified INTEGER DEFAULT 0,
+            is_email_verified INTEGER DEFAULT 0
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            event_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            start_datetime TEXT NOT NULL,
+            end_datetime TEXT NOT NULL,
+            location TEXT NOT NULL,
+            organizer TEXT NOT NULL,
+            status TEXT NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bank_accounts (
+            account_id TEXT PRIMARY KEY,
+            member_id TEXT NOT NULL CHECK (LENGTH(member_id) > 0),
+            account_holder_name TEXT NOT NULL CHECK (LENGTH(account_holder_name) > 0),
+            account_number TEXT NOT NULL UNIQUE CHECK (LENGTH(account_number) >= 10),
+            bank_name TEXT NOT NULL CHECK (LENGTH(bank_name) > 0),
+            ifsc_code TEXT NOT NULL CHECK (LENGTH(ifsc_code) = 11),
+            account_type TEXT NOT NULL CHECK (account_type IN ('Savings', 'Current', 'Joint')),
+            linked_mobile TEXT NOT NULL CHECK (linked_mobile GLOB '[6-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]'),
+            verification_status TEXT NOT NULL CHECK (verification_status IN ('Pending', 'Verified', 'Rejected'))
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contributions (
+            contribution_id TEXT PRIMARY KEY,
+            member_name TEXT NOT NULL,
+            contribution_type TEXT NOT NULL,
+            amount TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            transaction_date TEXT NOT NULL,
+            receipt_proof TEXT,
+            status TEXT NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS credits (
+            credit_id TEXT PRIMARY KEY,
+            member_name TEXT NOT NULL,
+            credit_amount TEXT NOT NULL,
+            credit_date TEXT NOT NULL,
+            credit_reason TEXT NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS loans (
+            loan_id TEXT PRIMARY KEY,
+            applicant_name TEXT NOT NULL,
+            group_name TEXT NOT NULL,
+            loan_amount REAL NOT NULL,
+            purpose TEXT NOT NULL,
+            duration_months INTEGER NOT NULL,
+            interest_rate REAL NOT NULL,
+            status TEXT NOT NULL,
+            rejection_reason TEXT,
+            approved_date TEXT,
+            funds_allocated INTEGER DEFAULT 0
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fund_allocation (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            total_available REAL,
+            total_allocated REAL,
+            last_updated TEXT
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS repayments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            loan_id TEXT REFERENCES loans(loan_id) ON DELETE CASCADE,
+            repay_amount REAL,
+            repay_date TEXT,
+            remaining REAL
+        )
+    ''')
+
+    # Paid and outstanding amount per loan in a single statement (replaced by
+    # a trigger-maintained table in create_loan_balances)
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS loan_balances AS
+        SELECT l.loan_id,
+               l.loan_amount,
+               COALESCE(SUM(r.repay_amount), 0) AS total_paid,
+               l.loan_amount - COALESCE(SUM(r.repay_amount), 0) AS outstanding
+        FROM loans l
+        LEFT JOIN repayments r ON r.loan_id = l.loan_id
+        GROUP BY l.loan_id
+    ''')
+
+    cursor.execute("SELECT COUNT(*) FROM fund_allocation")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("INSERT INTO fund_allocation (total_available, total_allocated, last_updated) VALUES (0, 0, ?)",
+                       (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
+
+
+def create_fund_ledger(cursor):
+    # Single running-balance row kept current by the triggers below
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fund_ledger (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_contributions REAL NOT NULL DEFAULT 0,
+            total_credits REAL NOT NULL DEFAULT 0,
+            total_allocated REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO fund_ledger (id, total_contributions, total_credits, total_allocated)
+        SELECT 1,
+               (SELECT COALESCE(SUM(CAST(amount AS REAL)), 0) FROM contributions WHERE status='Verified'),
+               (SELECT COALESCE(SUM(CAST(credit_amount AS REAL)), 0) FROM credits),
+               (SELECT COALESCE(SUM(loan_amount), 0) FROM loans WHERE funds_allocated = 1)
+    ''')
+
+    _execute_script(cursor, '''
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_contribution_insert AFTER INSERT ON contributions
+        WHEN NEW.status = 'Verified'
+        BEGIN
+            UPDATE fund_ledger SET total_contributions = total_contributions + CAST(NEW.amount AS REAL) WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_contribution_update AFTER UPDATE OF amount, status ON contributions
+        BEGIN
+            UPDATE fund_ledger SET total_contributions = total_contributions
+                - CASE WHEN OLD.status = 'Verified' THEN CAST(OLD.amount AS REAL) ELSE 0 END
+                + CASE WHEN NEW.status = 'Verified' THEN CAST(NEW.amount AS REAL) ELSE 0 END
+            WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_contribution_delete AFTER DELETE ON contributions
+        WHEN OLD.status = 'Verified'
+        BEGIN
+            UPDATE fund_ledger SET total_contributions = total_contributions - CAST(OLD.amount AS REAL) WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_credit_insert AFTER INSERT ON credits
+        BEGIN
+            UPDATE fund_ledger SET total_credits = total_credits + CAST(NEW.credit_amount AS REAL) WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_credit_update AFTER UPDATE OF credit_amount ON credits
+        BEGIN
+            UPDATE fund_ledger SET total_credits = total_credits
+                - CAST(OLD.credit_amount AS REAL) + CAST(NEW.credit_amount AS REAL)
+            WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_credit_delete AFTER DELETE ON credits
+        BEGIN
+            UPDATE fund_ledger SET total_credits = total_credits - CAST(OLD.credit_amount AS REAL) WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_loan_insert AFTER INSERT ON loans
+        WHEN NEW.funds_allocated = 1
+        BEGIN
+            UPDATE fund_ledger SET total_allocated = total_allocated + NEW.loan_amount WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_loan_update AFTER UPDATE OF loan_amount, funds_allocated ON loans
+        BEGIN
+            UPDATE fund_ledger SET total_allocated = total_allocated
+                - CASE WHEN OLD.funds_allocated = 1 THEN OLD.loan_amount ELSE 0 END
+                + CASE WHEN NEW.funds_allocated = 1 THEN NEW.loan_amount ELSE 0 END
+            WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS fund_ledger_loan_delete AFTER DELETE ON loans
+        WHEN OLD.funds_allocated = 1
+        BEGIN
+            UPDATE fund_ledger SET total_allocated = total_allocated - OLD.loan_amount WHERE id = 1;
+        END;
+    ''')
+
+
+# Recomputes the fund ledger totals (in paise) from the source tables
+FUND_LEDGER_TOTALS = """
+    SELECT (SELECT COALESCE(SUM(amount_paise), 0) FROM contributions WHERE status='Verified'),
+           (SELECT COALESCE(SUM(credit_amount_paise), 0) FROM credits),
+           (SELECT COALESCE(SUM(CAST(ROUND(loan_amount * 100) AS INTEGER)), 0) FROM loans WHERE funds_allocated = 1)
+"""
+
+FUND_LEDGER_TRIGGERS = [
+    'fund_ledger_contribution_insert', 'fund_ledger_contribution_update', 'fund_ledger_contribution_delete',
+    'fund_ledger_credit_insert', 'fund_ledger_credit_update', 'fund_ledger_credit_delete',
+    'fund_ledger_loan_insert', 'fund_ledger_loan_update', 'fund_ledger_loan_delete',
+]
+
+
+def convert_money_to_paise(cursor):
+    # Rebuild contributions and credits with INTEGER paise columns that SQLite
+    # computes once on write, so aggregates never cast the TEXT amounts per row
+    cursor.execute('''
+        CREATE TABLE contributions_new (
+            contribution_id TEXT PRIMARY KEY,
+            member_name TEXT NOT NULL,
+            contribution_type TEXT NOT NULL,
+            amount TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            transaction_date TEXT NOT NULL,
+            receipt_proof TEXT,
+            status TEXT NOT NULL,
+            amount_paise INTEGER GENERATED ALWAYS AS (CAST(ROUND(CAST(amount AS REAL) * 100) AS INTEGER)) STORED
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO contributions_new (contribution_id, member_name, contribution_type, amount,
+                                       payment_method, transaction_date, receipt_proof, status)
+        SELECT contribution_id, member_name, contribution_type, amount,
+               payment_method, transaction_date, receipt_proof, status
+        FROM contributions
+    ''')
+    cursor.execute("DROP TABLE contributions")
+    cursor.execute("ALTER TABLE contributions_new RENAME TO contributions")
+
+    cursor.execute('''
+        CREATE TABLE credits_new (
+            credit_id TEXT PRIMARY KEY,
+            member_name TEXT NOT NULL,
+            credit_amount TEXT NOT NULL,
+            credit_date TEXT NOT NULL,
+            credit_reason TEXT NOT NULL,
+            credit_amount_paise INTEGER GENERATED ALWAYS AS (CAST(ROUND(CAST(credit_amount AS REAL) * 100) AS INTEGER)) STORED
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO credits_new (credit_id, member_name, credit_amount, credit_date, credit_reason)
+        SELECT credit_id, member_name, credit_amount, credit_date, credit_reason FROM credits
+    ''')
+    cursor.execute("DROP TABLE credits")
+    cursor.execute("ALTER TABLE credits_new RENAME TO credits")
+
+    # Move the fund ledger to paise as well
+    for trigger in FUND_LEDGER_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS fund_ledger")
+    cursor.execute('''
+        CREATE TABLE fund_ledger (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            contributions_paise INTEGER NOT NULL DEFAULT 0,
+            credits_paise INTEGER NOT NULL DEFAULT 0,
+            allocated_paise INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute(f"INSERT INTO fund_ledger (id, contributions_paise, credits_paise, allocated_paise) "
+                   f"SELECT 1, * FROM ({FUND_LEDGER_TOTALS})")
+
+    _execute_script(cursor, '''
+        CREATE TRIGGER fund_ledger_contribution_insert AFTER INSERT ON contributions
+        WHEN NEW.status = 'Verified'
+        BEGIN
+            UPDATE fund_ledger SET contributions_paise = contributions_paise + NEW.amount_paise WHERE id = 1;
+        END;
+
+        CREATE TRIGGER fund_ledger_contribution_update AFTER UPDATE OF amount, status ON contributions
+        BEGIN
+            UPDATE fund_ledger SET contributions_paise = contributions_paise
+                - CASE WHEN OLD.status = 'Verified' THEN OLD.amount_paise ELSE 0 END
+                + CASE WHEN NEW.status = 'Verified' THEN NEW.amount_paise ELSE 0 END
+            WHERE id = 1;
+        END;
+
+        CREATE TRIGGER fund_ledger_contribution_delete AFTER DELETE ON contributions
+        WHEN OLD.status = 'Verified'
+        BEGIN
+            UPDATE fund_ledger SET contributions_paise = contributions_paise - OLD.amount_paise WHERE id = 1;
+        END;
+
+        CREATE TRIGGER fund_ledger_credit_insert AFTER INSERT ON credits
+        BEGIN
+            UPDATE fund_ledger SET credits_paise = credits_paise + NEW.credit_amount_paise WHERE id = 1;
+        END;
+
+        CREATE TRIGGER fund_ledger_credit_update AFTER UPDATE OF credit_amount ON credits
+        BEGIN
+            UPDATE fund_ledger SET credits_paise = credits_paise
+                - OLD.credit_amount_paise + NEW.credit_amount_paise
+            WHERE id = 1;
+        END;
+
+        CREATE TRIGGER fund_ledger_credit_delete AFTER DELETE ON credits
+        BEGIN
+            UPDATE fund_ledger SET credits_paise = credits_paise - OLD.credit_amount_paise WHERE id = 1;
+        END;
+
+        CREATE TRIGGER fund_ledger_loan_insert AFTER INSERT ON loans
+        WHEN NEW.funds_allocated = 1
+        BEGIN
+            UPDATE fund_ledger SET allocated_paise = allocated_paise
+                + CAST(ROUND(NEW.loan_amount * 100) AS INTEGER) WHERE id = 1;
+        END;
+
+        CREATE TRIGGER fund_ledger_loan_update AFTER UPDATE OF loan_amount, funds_allocated ON loans
+        BEGIN
+            UPDATE fund_ledger SET allocated_paise = allocated_paise
+                - CASE WHEN OLD.funds_allocated = 1 THEN CAST(ROUND(OLD.loan_amount * 100) AS INTEGER) ELSE 0 END
+                + CASE WHEN NEW.funds_allocated = 1 THEN CAST(ROUND(NEW.loan_amount * 100) AS INTEGER) ELSE 0 END
+            WHERE id = 1;
+        END;
+
+        CREATE TRIGGER fund_ledger_loan_delete AFTER DELETE ON loans
+        WHEN OLD.funds_allocated = 1
+        BEGIN
+            UPDATE fund_ledger SET allocated_paise = allocated_paise
+                - CAST(ROUND(OLD.loan_amount * 100) AS INTEGER) WHERE id = 1;
+        END;
+    ''')
+
+
+# table -> (primary key, date columns, converter to the canonical ISO text)
+DATE_COLUMNS = {
+    'users': ('user_id', ('dob', 'reg_date'), dates.to_iso),
+    'events': ('event_id', ('start_datetime', 'end_datetime'), dates.to_iso_datetime),
+    'contributions': ('contribution_id', ('transaction_date',), dates.to_iso),
+    'credits': ('credit_id', ('credit_date',), dates.to_iso),
+    'loans': ('loan_id', ('approved_date',), dates.to_iso),
+    'repayments': ('id', ('repay_date',), dates.to_iso),
+}
+
+
+def normalize_dates(cursor, tables=None):
+    # Rewrite every stored date to ISO text so ORDER BY and range filters on
+    # the date indexes are correct; values that cannot be parsed are kept as-is.
+    # Values that were read month-first but could also be day-first are listed
+    # in date_review with their original text for an operator to check, and
+    # returned as (table, key, column, original, stored).
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS date_review (
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            column_name TEXT NOT NULL,
+            original TEXT NOT NULL,
+            stored TEXT NOT NULL,
+            PRIMARY KEY (table_name, row_key, column_name)
+        )
+    ''')
+    ambiguous = []
+    for table, (key, columns, convert) in DATE_COLUMNS.items():
+        if tables is not None and table not in tables:
+            continue
+        for column in columns:
+            cursor.execute(f"SELECT {key}, {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != ''")
+            updates = []
+            for row_id, value in cursor.fetchall():
+                try:
+                    canonical = convert(value)
+                except ValueError:
+                    continue
+                if canonical != value:
+                    updates.append((canonical, row_id))
+                    if dates.is_ambiguous(value):
+                        ambiguous.append((table, str(row_id), column, value, canonical))
+            cursor.executemany(f"UPDATE {table} SET {column} = ? WHERE {key} = ?", updates)
+    cursor.executemany("INSERT OR REPLACE INTO date_review VALUES (?, ?, ?, ?, ?)", ambiguous)
+    return ambiguous
+
+
+# Rows fed to the global search index: kind -> (table, key column, columns
+# making up the title, columns making up the searchable details)
+SEARCH_SOURCES = {
+    'user': ('users', 'user_id', ('first_name', 'last_name'), ('primary_phone', 'secondary_phone', 'email', 'city')),
+    'staff': ('staff', 'staff_id', ('full_name',), ('role', 'assigned_groups', 'contact_info')),
+    'event': ('events', 'event_id', ('title',), ('location', 'organizer', 'event_type')),
+    'loan': ('loans', 'loan_id', ('applicant_name',), ('purpose', 'group_name', 'loan_id')),
+}
+
+
+def _search_text(columns, prefix=''):
+    return " || ' ' || ".join(f"COALESCE({prefix}{column}, '')" for column in columns)
+
+
+def create_search_index(cursor):
+    # One FTS5 index over every module so hits rank against each other. Its
+    # rowids come from search_docs, which maps them to (kind, key), so the
+    # triggers never depend on the source tables' own rowids.
+    cursor.execute('''
+        CREATE TABLE search_docs (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            UNIQUE (kind, key)
+        )
+    ''')
+    cursor.execute("CREATE VIRTUAL TABLE search_index USING fts5(title, body, tokenize='unicode61', prefix='2 3')")
+
+    for kind, (table, key, title, body) in SEARCH_SOURCES.items():
+        cursor.execute(f"INSERT INTO search_docs (kind, key) SELECT '{kind}', {key} FROM {table}")
+        cursor.execute(f'''
+            INSERT INTO search_index (rowid, title, body)
+            SELECT d.id, {_search_text(title, 't.')}, {_search_text(body, 't.')}
+            FROM {table} t JOIN search_docs d ON d.kind = '{kind}' AND d.key = t.{key}
+        ''')
+
+        doc_id = f"(SELECT id FROM search_docs WHERE kind = '{kind}' AND key = {{}}.{key})"
+        _execute_script(cursor, f'''
+            CREATE TRIGGER search_{table}_insert AFTER INSERT ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = {doc_id.format('NEW')};
+                INSERT OR REPLACE INTO search_docs (kind, key) VALUES ('{kind}', NEW.{key});
+                INSERT INTO search_index (rowid, title, body)
+                VALUES (last_insert_rowid(), {_search_text(title, 'NEW.')}, {_search_text(body, 'NEW.')});
+            END;
+
+            CREATE TRIGGER search_{table}_update AFTER UPDATE OF {', '.join(dict.fromkeys((key,) + title + body))} ON {table}
+            BEGIN
+                UPDATE search_docs SET key = NEW.{key} WHERE kind = '{kind}' AND key = OLD.{key};
+                UPDATE search_index SET title = {_search_text(title, 'NEW.')}, body = {_search_text(body, 'NEW.')}
+                WHERE rowid = {doc_id.format('NEW')};
+            END;
+
+            CREATE TRIGGER search_{table}_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = {doc_id.format('OLD')};
+                DELETE FROM search_docs WHERE kind = '{kind}' AND key = OLD.{key};
+            END;
+        ''')
+
+
+# Repayment amount and loan amount in paise, as the ledgers keep them
+_REPAID_PAISE = "CAST(ROUND(r.repay_amount * 100) AS INTEGER)"
+_LOAN_PAISE = "CAST(ROUND({}.loan_amount * 100) AS INTEGER)"
+
+
+def _remaining_after(loan, date, row_id):
+    # Rewrites `remaining` for one loan's repayments from (date, id) onwards.
+    # Each row's remaining is what is outstanding now plus everything repaid
+    # after it, so rows before the change are not read and appending a
+    # repayment touches only the new row.
+    return f"""
+        UPDATE repayments SET remaining = fixed.remaining
+        FROM (SELECT r.id,
+                     (b.loan_paise - b.paid_paise + COALESCE(SUM({_REPAID_PAISE}) OVER (
+                         ORDER BY r.repay_date DESC, r.id DESC ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0)
+                     ) / 100.0 AS remaining
+              FROM repayments r JOIN loan_balances b ON b.loan_id = r.loan_id
+              WHERE r.loan_id = {loan} AND (r.repay_date, r.id) >= ({date}, {row_id})) AS fixed
+        WHERE repayments.id = fixed.id;
+    """
+
+
+def _remaining_running(where):
+    # Rewrites `remaining` as the loan amount minus the running total of the
+    # loan's repayments in (date, id) order
+    return f"""
+        UPDATE repayments SET remaining = fixed.remaining
+        FROM (SELECT r.id,
+                     (b.loan_paise - SUM({_REPAID_PAISE}) OVER (
+                         PARTITION BY r.loan_id ORDER BY r.repay_date, r.id ROWS UNBOUNDED PRECEDING)
+                     ) / 100.0 AS remaining
+              FROM repayments r JOIN loan_balances b ON b.loan_id = r.loan_id
+              WHERE {where}) AS fixed
+        WHERE repayments.id = fixed.id;
+    """
+
+
+def recompute_remaining(cursor, loan_id=None):
+    """Rewrite the stored `remaining` of every repayment, or only those of one loan"""
+    if loan_id is None:
+        cursor.execute(_remaining_running("1"))
+    else:
+        cursor.execute(_remaining_running("r.loan_id = ?"), (loan_id,))
+
+
+def create_loan_balances(cursor):
+    # Paid and outstanding per loan, kept current by the triggers below instead
+    # of summing a loan's repayments on every write. The repayment triggers
+    # also fix `remaining` on the rows after a back-dated, edited or deleted
+    # repayment, which used to keep the value it had when it was entered.
+    cursor.execute("DROP VIEW IF EXISTS loan_balances")
+    cursor.execute('''
+        CREATE TABLE loan_balances (
+            loan_id TEXT PRIMARY KEY REFERENCES loans(loan_id) ON DELETE CASCADE ON UPDATE CASCADE,
+            loan_paise INTEGER NOT NULL,
+            paid_paise INTEGER NOT NULL DEFAULT 0,
+            loan_amount REAL GENERATED ALWAYS AS (loan_paise / 100.0) VIRTUAL,
+            total_paid REAL GENERATED ALWAYS AS (paid_paise / 100.0) VIRTUAL,
+            outstanding REAL GENERATED ALWAYS AS ((loan_paise - paid_paise) / 100.0) VIRTUAL
+        )
+    ''')
+    cursor.execute(f'''
+        INSERT INTO loan_balances (loan_id, loan_paise, paid_paise)
+        SELECT l.loan_id, {_LOAN_PAISE.format('l')},
+               (SELECT COALESCE(SUM({_REPAID_PAISE}), 0) FROM repayments r WHERE r.loan_id = l.loan_id)
+        FROM loans l
+    ''')
+    recompute_remaining(cursor)
+
+    _execute_script(cursor, f'''
+        CREATE TRIGGER loan_balance_loan_insert AFTER INSERT ON loans
+        BEGIN
+            INSERT OR REPLACE INTO loan_balances (loan_id, loan_paise, paid_paise)
+            VALUES (NEW.loan_id, {_LOAN_PAISE.format('NEW')},
+                    (SELECT COALESCE(SUM({_REPAID_PAISE}), 0) FROM repayments r WHERE r.loan_id = NEW.loan_id));
+        END;
+
+        CREATE TRIGGER loan_balance_loan_update AFTER UPDATE OF loan_amount ON loans
+        BEGIN
+            UPDATE loan_balances SET loan_paise = {_LOAN_PAISE.format('NEW')} WHERE loan_id = NEW.loan_id;
+            {_remaining_running("r.loan_id = NEW.loan_id")}
+        END;
+
+        CREATE TRIGGER loan_balance_repayment_insert AFTER INSERT ON repayments
+        BEGIN
+            UPDATE loan_balances SET paid_paise = paid_paise + CAST(ROUND(NEW.repay_amount * 100) AS INTEGER)
+            WHERE loan_id = NEW.loan_id;
+            {_remaining_after("NEW.loan_id", "NEW.repay_date", "NEW.id")}
+        END;
+
+        CREATE TRIGGER loan_balance_repayment_update AFTER UPDATE OF loan_id, repay_amount, repay_date ON repayments
+        BEGIN
+            UPDATE loan_balances SET paid_paise = paid_paise - CAST(ROUND(OLD.repay_amount * 100) AS INTEGER)
+            WHERE loan_id = OLD.loan_id;
+            UPDATE loan_balances SET paid_paise = paid_paise + CAST(ROUND(NEW.repay_amount * 100) AS INTEGER)
+            WHERE loan_id = NEW.loan_id;
+            {_remaining_after("OLD.loan_id", "OLD.repay_date", "OLD.id")}
+            {_remaining_after("NEW.loan_id", "NEW.repay_date", "NEW.id")}
+        END;
+
+        CREATE TRIGGER loan_balance_repayment_delete AFTER DELETE ON repayments
+        BEGIN
+            UPDATE loan_balances SET paid_paise = paid_paise - CAST(ROUND(OLD.repay_amount * 100) AS INTEGER)
+            WHERE loan_id = OLD.loan_id;
+            {_remaining_after("OLD.loan_id", "OLD.repay_date", "OLD.id")}
+        END;
+    ''')
+
+
+def create_loan_schedule(cursor):
+    # Expected instalments per approved loan, written by amortization.py. A
+    # loan's rows are dropped as soon as its terms change, so a schedule that
+    # exists is never stale and `amortization.py --missing` rebuilds the rest.
+    cursor.execute('''
+        CREATE TABLE loan_schedule (
+            loan_id TEXT NOT NULL REFERENCES loans(loan_id) ON DELETE CASCADE ON UPDATE CASCADE,
+            installment INTEGER NOT NULL,
+            due_date TEXT NOT NULL,
+            due_paise INTEGER NOT NULL,
+            interest_paise INTEGER NOT NULL,
+            principal_paise INTEGER NOT NULL,
+            balance_paise INTEGER NOT NULL,
+            PRIMARY KEY (loan_id, installment)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER loan_schedule_loan_update AFTER UPDATE OF loan_amount, duration_months, interest_rate,
+                                                                 approved_date, status ON loans
+        WHEN OLD.loan_amount IS NOT NEW.loan_amount OR OLD.duration_months IS NOT NEW.duration_months
+          OR OLD.interest_rate IS NOT NEW.interest_rate OR OLD.approved_date IS NOT NEW.approved_date
+          OR OLD.status IS NOT NEW.status
+        BEGIN
+            DELETE FROM loan_schedule WHERE loan_id = NEW.loan_id;
+        END
+    ''')
+
+
+# Contribution rows counted in contribution_monthly: verified, with an ISO transaction date
+def _rolled_up(row):
+    return f"{row}.status = 'Verified' AND {row}.transaction_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-*'"
+
+
+def _rollup_key(row):
+    return (f"month = substr({row}.transaction_date, 1, 7) AND member_name = {row}.member_name "
+            f"AND contribution_type = {row}.contribution_type AND payment_method = {row}.payment_method")
+
+
+def _rollup_add(row):
+    return f"""
+        INSERT INTO contribution_monthly (month, member_name, contribution_type, payment_method, entries, amount_paise)
+        SELECT substr({row}.transaction_date, 1, 7), {row}.member_name, {row}.contribution_type,
+               {row}.payment_method, 1, {row}.amount_paise
+        WHERE {_rolled_up(row)}
+        ON CONFLICT (month, member_name, contribution_type, payment_method)
+        DO UPDATE SET entries = entries + 1, amount_paise = amount_paise + excluded.amount_paise;
+    """
+
+
+def _rollup_remove(row):
+    return f"""
+        UPDATE contribution_monthly SET entries = entries - 1, amount_paise = amount_paise - {row}.amount_paise
+        WHERE {_rollup_key(row)} AND {_rolled_up(row)};
+        DELETE FROM contribution_monthly WHERE {_rollup_key(row)} AND entries = 0;
+    """
+
+
+def rebuild_contribution_rollup(cursor):
+    """Recompute contribution_monthly from every contribution"""
+    cursor.execute("DELETE FROM contribution_monthly")
+    cursor.execute(f'''
+        INSERT INTO contribution_monthly (month, member_name, contribution_type, payment_method, entries, amount_paise)
+        SELECT substr(c.transaction_date, 1, 7), c.member_name, c.contribution_type, c.payment_method,
+               COUNT(*), SUM(c.amount_paise)
+        FROM contributions c
+        WHERE {_rolled_up('c')}
+        GROUP BY 1, 2, 3, 4
+    ''')
+
+
+def create_contribution_rollup(cursor):
+    # Verified collections per month, member, type and payment method, kept
+    # current by the triggers below, so trend reports read one row per group
+    # and month instead of every contribution (see trends.py)
+    cursor.execute('''
+        CREATE TABLE contribution_monthly (
+            month TEXT NOT NULL,
+            member_name TEXT NOT NULL,
+            contribution_type TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            entries INTEGER NOT NULL,
+            amount_paise INTEGER NOT NULL,
+            PRIMARY KEY (month, member_name, contribution_type, payment_method)
+        ) WITHOUT ROWID
+    ''')
+    rebuild_contribution_rollup(cursor)
+
+    _execute_script(cursor, f'''
+        CREATE TRIGGER contribution_monthly_insert AFTER INSERT ON contributions
+        BEGIN
+            {_rollup_add('NEW')}
+        END;
+
+        CREATE TRIGGER contribution_monthly_update AFTER UPDATE OF member_name, contribution_type, payment_method,
+                                                                   transaction_date, amount, status ON contributions
+        BEGIN
+            {_rollup_remove('OLD')}
+            {_rollup_add('NEW')}
+        END;
+
+        CREATE TRIGGER contribution_monthly_delete AFTER DELETE ON contributions
+        BEGIN
+            {_rollup_remove('OLD')}
+        END;
+    ''')
+
+
+# table -> (primary key, amount column holding rupee text)
+AMOUNT_COLUMNS = {
+    'contributions': ('contribution_id', 'amount'),
+    'credits': ('credit_id', 'credit_amount'),
+}
+
+
+def normalize_amounts(cursor, tables=None):
+    # Rewrite amounts saved with separators or a rupee sign ("1,000", "₹500")
+    # as plain rupees; the generated paise columns had read them as 1 and 0.
+    # The fund ledger and rollup triggers pick up the corrected amounts.
+    for table, (key, column) in AMOUNT_COLUMNS.items():
+        if tables is not None and table not in tables:
+            continue
+        cursor.execute(f"SELECT {key}, {column} FROM {table} WHERE {column} GLOB '*[^0-9.]*'")
+        updates = []
+        for row_id, value in cursor.fetchall():
+            try:
+                canonical = money.to_text(value)
+            except ValueError:
+                continue
+            if canonical != value:
+                updates.append((canonical, row_id))
+        cursor.executemany(f"UPDATE {table} SET {column} = ? WHERE {key} = ?", updates)
+
+
+# Ordered schema migrations; the list index + 1 is stored in PRAGMA user_version
+MIGRATIONS = [
+    create_base_tables,
+    create_fund_ledger,
+    convert_money_to_paise,
+    normalize_dates,
+    create_search_index,
+    create_loan_balances,
+    create_loan_schedule,
+    create_contribution_rollup,
+    normalize_amounts,
+]
+
+
+def apply_migrations(cursor):
+    """Bring the database up to the latest schema version
+
+    Each migration runs in one transaction together with its user_version
+    bump, so one that fails leaves nothing of itself behind and runs again
+    from the start next time.
+    """
+    conn = cursor.connection
+    # BEGIN fails inside a transaction; keep whatever the caller already wrote
+    if conn.in_transaction:
+        conn.commit()
+    cursor.execute("PRAGMA user_version")
+    version = cursor.fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        cursor.execute("BEGIN")
+        try:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    # Indexes are declared centrally and created outside the version history
+    indexes.ensure_indexes(cursor)
@@ -0,0 +1,37 @@
+# Canvas currently holding the application-wide mouse wheel binding
+_owner = None
+
+
+def bind_mousewheel(canvas):
+    """Scroll a screen's canvas with the mouse wheel while the pointer is over it
+
+    The wheel is bound application-wide (on Windows it goes to the focused
+    widget, not the one under the pointer) but only between <Enter> and
+    <Leave> of this canvas. A cached screen that is hidden, or one that was
+    destroyed, therefore never receives it and never steals it from the
+    screen on display.
+    """
+    def scroll(event):
+        if canvas.winfo_exists() and canvas.winfo_viewable():
+            canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+
+    def claim(event):
+        global _owner
+        _owner = canvas
+        canvas.bind_all("<MouseWheel>", scroll)
+
+    def release():
+        global _owner
+        if _owner is canvas:
+            _owner = None
+            canvas.unbind_all("<MouseWheel>")
+
+    def leave(event):
+        # Moving onto a widget inside the canvas also fires <Leave>; keep the wheel then
+        inside = str(canvas.tk.call('winfo', 'containing', event.x_root, event.y_root))
+        if inside != str(canvas) and not inside.startswith(f"{canvas}."):
+            release()
+
+    canvas.bind("<Enter>", claim, add='+')
+    canvas.bind("<Leave>", leave, add='+')
+    canvas.bind("<Destroy>", lambda event: release(), add='+')
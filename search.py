@@ -0,0 +1,35 @@
+import re
+
+import db
+
+# Hits returned by one search
+LIMIT = 50
+# bm25 weights: a match in a name or title counts more than one in the details
+TITLE_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+
+KIND_LABELS = {'user': 'Member', 'staff': 'Staff', 'event': 'Event', 'loan': 'Loan'}
+
+SEARCH_QUERY = """
+    SELECT d.kind, d.key, highlight(search_index, 0, '[', ']'), snippet(search_index, 1, '[', ']', '...', 8)
+    FROM search_index JOIN search_docs d ON d.id = search_index.rowid
+    WHERE search_index MATCH ?
+    ORDER BY bm25(search_index, ?, ?)
+    LIMIT ?
+"""
+
+
+def match_expression(text):
+    """Turn typed text into an FTS5 query in which every word must match as a prefix"""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def search(text, limit=LIMIT, cursor=None):
+    """Ranked hits across members, staff, events and loans as (kind, key, title, snippet)"""
+    expression = match_expression(text)
+    if not expression:
+        return []
+    cursor = cursor or db.get_cursor()
+    cursor.execute(SEARCH_QUERY, (expression, TITLE_WEIGHT, BODY_WEIGHT, limit))
+    return cursor.fetchall()
+
@@ -0,0 +1,370 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import changes
+import contacts
+import dates
+import db
+import ledger
+import money
+
+# Business rules for loans, repayments, contributions and members, free of Tk.
+# The screens read their forms and show the outcome; bulk jobs and benchmarks
+# call the same methods without a display (see bench_services.py).
+
+_id_lock = threading.Lock()
+# prefix -> (Unix second of the last id handed out, ids already handed out in it)
+_last_ids = {}
+
+
+class ServiceError(ValueError):
+    """A request the business rules refuse; the message is written for the user"""
+
+
+class InsufficientFunds(ServiceError):
+    """An approval or increase needs more than the fund has available"""
+
+    def __init__(self, message, required, available):
+        super().__init__(message)
+        self.required = required
+        self.available = available
+
+
+def new_id(prefix):
+    """A record id in the screens' format: prefix + Unix time
+
+    Ids issued in the same second by this process get a sequence number
+    after the time, so batch jobs do not collide on the primary key.
+    """
+    with _id_lock:
+        stamp = int(time.time())
+        last, issued = _last_ids.get(prefix, (0, 0))
+        issued = issued + 1 if stamp == last else 0
+        _last_ids[prefix] = (stamp, issued)
+    return f"{prefix}{stamp}" + (f"{issued:04d}" if issued else "")
+
+
+class Service:
+    """Base for the services: one connection, and writes committed and published as a unit
+
+    Connections are per thread (see db.get_connection), so create services
+    on the thread that uses them.
+    """
+
+    def __init__(self, conn=None):
+        self.conn = conn or db.get_connection()
+        self.cursor = self.conn.cursor()
+        # table -> keys written in the open batch, or None outside one
+        self.pending = None
+
+    @contextmanager
+    def batch(self):
+        """Run the writes in the block as one transaction, committed and published at the end
+
+        Every write method runs in its own batch, which joins an enclosing
+        one. An exception leaving the outermost block rolls everything back;
+        one caught inside it (say a ServiceError for a single bad row) does
+        not, so a bulk job can skip that row and carry on.
+        """
+        if self.pending is not None:
+            yield self
+            return
+        self.pending = {}
+        try:
+            yield self
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            written, self.pending = self.pending, None
+        for table, keys in written.items():
+            changes.publish(table, *keys)
+
+    def _changed(self, table, *keys):
+        self.pending.setdefault(table, []).extend(keys)
+
+
+class LoanService(Service):
+    """Loan applications, approvals and the fund checks behind them"""
+
+    def available_funds(self):
+        return ledger.get_available_funds(self.cursor)
+
+    def require_funds(self, amount, message="Insufficient funds available"):
+        """Raise InsufficientFunds unless amount (rupees) fits in the available funds"""
+        available = self.available_funds()
+        if amount > available:
+            raise InsufficientFunds(f"{message}. Required: ₹{amount:,.2f}, Available: ₹{available:,.2f}",
+                                    amount, available)
+
+    def _terms(self, data):
+        data = dict(data)
+        try:
+            data['loan_amount'] = float(data['loan_amount'])
+            data['duration_months'] = int(data['duration_months'])
+            data['interest_rate'] = float(data['interest_rate'])
+        except (KeyError, ValueError):
+            raise ServiceError("Please enter valid numbers for amount, duration and interest rate")
+        return data
+
+    def add(self, data):
+        """Record a loan from a dict of loans columns and return its id
+
+        An approved loan must fit in the available funds; it gets today as
+        its approved date if none is given, and its funds are allocated.
+        """
+        data = self._terms(data)
+        if data['status'] == "Approved":
+            self.require_funds(data['loan_amount'])
+            data['approved_date'] = data.get('approved_date') or dates.today()
+            data['funds_allocated'] = 1
+        else:
+            data['funds_allocated'] = 0
+            data['approved_date'] = ""
+        data['loan_id'] = data.get('loan_id') or new_id('LOAN')
+
+        with self.batch():
+            # The fund ledger triggers allocate funds for approved loans
+            self.cursor.execute(f"INSERT INTO loans ({', '.join(data)}) VALUES ({', '.join('?' * len(data))})",
+                                tuple(data.values()))
+            self._changed('loans', data['loan_id'])
+        return data['loan_id']
+
+    def update(self, loan_id, data):
+        """Change a loan, checking the funds for a new approval or a larger approved amount"""
+        self.cursor.execute("SELECT status, loan_amount, funds_allocated FROM loans WHERE loan_id=?", (loan_id,))
+        original = self.cursor.fetchone()
+        if not original:
+            raise ServiceError("Loan record not found")
+        original_status, original_amount, original_funds_allocated = original
+        original_funds_allocated = original_funds_allocated or 0
+
+        data = self._terms(data)
+        data.pop('loan_id', None)
+        if data['status'] == "Approved" and original_status != "Approved":
+            self.require_funds(data['loan_amount'])
+            # Newly approved loans are dated today unless a date is given
+            data['approved_date'] = data.get('approved_date') or dates.today()
+        if original_status == "Approved" and data['status'] != "Approved" and original_funds_allocated == 1:
+            # The funds go back to the pool through the ledger triggers
+            data['approved_date'] = ""
+        if (data['status'] == "Approved" and original_status == "Approved"
+                and data['loan_amount'] != original_amount and original_funds_allocated == 1):
+            difference = data['loan_amount'] - original_amount
+            if difference > 0:
+                self.require_funds(difference, "Insufficient funds for amount increase")
+        # Funds are allocated exactly for approved loans
+        data['funds_allocated'] = 1 if data['status'] == "Approved" else 0
+
+        with self.batch():
+            self.cursor.execute(f"UPDATE loans SET {', '.join(f'{key}=?' for key in data)} WHERE loan_id=?",
+                                tuple(data.values()) + (loan_id,))
+            self._changed('loans', loan_id)
+
+    def delete(self, loan_id):
+        """Delete a loan and, through ON DELETE CASCADE, its repayments; allocated funds are returned"""
+        with self.batch():
+            self.cursor.execute("SELECT id FROM repayments WHERE loan_id=?", (loan_id,))
+            repayment_ids = [row[0] for row in self.cursor.fetchall()]
+            self.cursor.execute("DELETE FROM loans WHERE loan_id=?", (loan_id,))
+            self._changed('loans', loan_id)
+            self._changed('repayments', *repayment_ids)
+
+
+class RepaymentService(Service):
+    """Repayments, limited to what is still owed on the loan"""
+
+    @staticmethod
+    def parse_amount(value):
+        try:
+            amount = float(str(value).strip())
+        except ValueError:
+            amount = 0
+        if not amount > 0:
+            raise ServiceError("Please enter a valid positive amount")
+        return amount
+
+    def loan_exists(self, loan_id):
+        self.cursor.execute("SELECT 1 FROM loans WHERE loan_id = ?", (loan_id,))
+        return self.cursor.fetchone() is not None
+
+    def _balance(self, loan_id):
+        # Loan amount and total paid so far, kept per loan by the balance triggers
+        self.cursor.execute("SELECT loan_amount, total_paid FROM loan_balances WHERE loan_id = ?", (loan_id,))
+        row = self.cursor.fetchone()
+        if not row:
+            raise ServiceError("Loan not found. Please select a valid loan ID.")
+        return float(row[0]), row[1] or 0.0
+
+    def add(self, loan_id, amount, repay_date):
+        """Record a repayment that does not take the loan past its amount and return its id"""
+        amount = self.parse_amount(amount)
+        loan_amount, total_paid = self._balance(loan_id)
+        if total_paid + amount > loan_amount:
+            raise ServiceError(f"Repayment exceeds loan amount. Maximum payment allowed: {loan_amount - total_paid:,.2f}")
+
+        with self.batch():
+            # The insert trigger sets `remaining` on this and any later repayment of the loan
+            self.cursor.execute("INSERT INTO repayments (loan_id, repay_amount, repay_date) VALUES (?, ?, ?)",
+                                (loan_id, amount, repay_date))
+            repay_id = self.cursor.lastrowid
+            self._changed('repayments', repay_id, *self.repayments_from(loan_id, repay_date, repay_id))
+        return repay_id
+
+    def update(self, repay_id, loan_id, amount, repay_date):
+        """Change a repayment, keeping the (possibly different) loan within its amount"""
+        amount = self.parse_amount(amount)
+        self.cursor.execute("SELECT loan_id, repay_amount, repay_date FROM repayments WHERE id = ?", (repay_id,))
+        old = self.cursor.fetchone()
+        if not old:
+            raise ServiceError("This repayment no longer exists.")
+        loan_amount, total_paid = self._balance(loan_id)
+        # Paid on the loan apart from this repayment
+        other_paid = total_paid - (old[1] if old[0] == loan_id else 0.0)
+        if amount + other_paid > loan_amount:
+            raise ServiceError(f"Updated amount exceeds loan limit. Maximum payment allowed: {loan_amount - other_paid:,.2f}")
+
+        with self.batch():
+            # The update trigger fixes `remaining` from the old and the new position on
+            self.cursor.execute("UPDATE repayments SET loan_id = ?, repay_amount = ?, repay_date = ? WHERE id = ?",
+                                (loan_id, amount, repay_date, repay_id))
+            self._changed('repayments', repay_id, *self.repayments_from(old[0], old[2], repay_id),
+                          *self.repayments_from(loan_id, repay_date, repay_id))
+
+    def delete(self, repay_id):
+        with self.batch():
+            self.cursor.execute("SELECT loan_id, repay_date FROM repayments WHERE id = ?", (repay_id,))
+            old = self.cursor.fetchone()
+            self.cursor.execute("DELETE FROM repayments WHERE id = ?", (repay_id,))
+            # Later repayments of the loan had their `remaining` raised by the delete trigger
+            self._changed('repayments', repay_id, *(self.repayments_from(old[0], old[1], repay_id) if old else ()))
+
+    def repayments_from(self, loan_id, repay_date, repay_id):
+        """Ids of the loan's repayments at or after (repay_date, repay_id), whose `remaining` a write changes"""
+        self.cursor.execute("SELECT id FROM repayments WHERE loan_id = ? AND (repay_date, id) >= (?, ?)",
+                            (loan_id, repay_date, repay_id))
+        return [row[0] for row in self.cursor.fetchall()]
+
+
+class ContributionService(Service):
+    """Contributions, debits (the credits table) and the fund's net total"""
+
+    def add(self, data):
+        """Record a contribution from a dict of contributions columns and return its id"""
+        data = dict(data)
+        # Plain rupees, so the generated amount_paise column reads formatted input right
+        data['amount'] = money.to_text(data['amount'])
+        data['contribution_id'] = data.get('contribution_id') or new_id('CNT')
+        with self.batch():
+            self.cursor.execute(f"INSERT INTO contributions ({', '.join(data)}) VALUES ({', '.join('?' * len(data))})",
+                                tuple(data.values()))
+            self._changed('contributions', data['contribution_id'])
+        return data['contribution_id']
+
+    def update(self, contribution_id, data):
+        data = dict(data)
+        data.pop('contribution_id', None)
+        data['amount'] = money.to_text(data['amount'])
+        with self.batch():
+            self.cursor.execute(f"UPDATE contributions SET {', '.join(f'{k}=?' for k in data)} WHERE contribution_id = ?",
+                                tuple(data.values()) + (contribution_id,))
+            self._changed('contributions', contribution_id)
+
+    def delete(self, contribution_id):
+        with self.batch():
+            self.cursor.execute("DELETE FROM contributions WHERE contribution_id = ?", (contribution_id,))
+            self._changed('contributions', contribution_id)
+
+    def _credit_amount(self, member_name, amount, credit_date, reason):
+        """The amount as plain rupees for credit_amount, once every field is filled in"""
+        if not all([member_name, amount, credit_date, reason]):
+            raise ServiceError("All fields are required")
+        return money.to_text(amount)
+
+    def add_credit(self, member_name, amount, credit_date, reason):
+        """Record a debit against the fund and return its id"""
+        amount = self._credit_amount(member_name, amount, credit_date, reason)
+        credit_id = new_id('CRD')
+        with self.batch():
+            self.cursor.execute("INSERT INTO credits VALUES (?, ?, ?, ?, ?)",
+                                (credit_id, member_name, amount, credit_date, reason))
+            self._changed('credits', credit_id)
+        return credit_id
+
+    def update_credit(self, credit_id, member_name, amount, credit_date, reason):
+        amount = self._credit_amount(member_name, amount, credit_date, reason)
+        with self.batch():
+            self.cursor.execute("""
+                UPDATE credits
+                SET member_name=?, credit_amount=?, credit_date=?, credit_reason=?
+                WHERE credit_id=?
+            """, (member_name, amount, credit_date, reason, credit_id))
+            self._changed('credits', credit_id)
+
+    def delete_credit(self, credit_id):
+        with self.batch():
+            self.cursor.execute("DELETE FROM credits WHERE credit_id=?", (credit_id,))
+            self._changed('credits', credit_id)
+
+    def member_credits(self, member_name):
+        """Rupees debited to one member"""
+        self.cursor.execute("SELECT SUM(credit_amount_paise) FROM credits WHERE member_name=?", (member_name,))
+        return money.to_rupees(self.cursor.fetchone()[0])
+
+    def net_total(self):
+        """(net total, verified contributions, credits) in rupees, from the fund ledger"""
+        balances = ledger.get_balances(self.cursor)
+        return balances['net_total'], balances['total_contributions'], balances['total_credits']
+
+
+class MemberService(Service):
+    """Member (users table) registration and changes"""
+
+    def _clean(self, data):
+        data = dict(data)
+        data['dob'] = dates.to_iso(data['dob'])
+        for field in ('primary_phone', 'secondary_phone'):
+            if data.get(field):
+                data[field] = contacts.clean_phone(data[field])
+        # NULL, not '', so that several members can be left without an email under UNIQUE
+        data['email'] = contacts.clean_email(data.get('email'))
+        return data
+
+    def _check_unique(self, data, user_id=None):
+        # UNIQUE compares values as stored, and older rows may hold them as typed
+        for column, label in (('primary_phone', "phone number"), ('email', "email")):
+            if not data.get(column):
+                continue
+            self.cursor.execute(f"SELECT 1 FROM users WHERE {contacts.USER_KEYS[column]} = ? AND user_id IS NOT ?",
+                                (data[column], user_id))
+            if self.cursor.fetchone():
+                raise ServiceError(f"Another member is already registered with this {label}")
+
+    def add(self, data):
+        """Register a member from a dict of users columns and return the user id"""
+        data = self._clean(data)
+        self._check_unique(data)
+        data['user_id'] = data.get('user_id') or new_id('USR')
+        data['reg_date'] = data.get('reg_date') or dates.today()
+        with self.batch():
+            self.cursor.execute(f"INSERT INTO users ({', '.join(data)}) VALUES ({', '.join('?' * len(data))})",
+                                tuple(data.values()))
+            self._changed('users', data['user_id'])
+        return data['user_id']
+
+    def update(self, user_id, data):
+        data = self._clean(data)
+        self._check_unique(data, user_id)
+        data.pop('user_id', None)
+        data.pop('reg_date', None)
+        with self.batch():
+            self.cursor.execute(f"UPDATE users SET {', '.join(f'{key}=?' for key in data)} WHERE user_id=?",
+                                tuple(data.values()) + (user_id,))
+            self._changed('users', user_id)
+
+    def delete(self, user_id):
+        with self.batch():
+            self.cursor.execute("DELETE FROM users WHERE user_id=?", (user_id,))
+            self._changed('users', user_id)
@@ -1,6 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
+import changes
+import db
+import scrolling
+from virtualtable import VirtualTable
 from datetime import datetime
 
 class StaffManagement:
@@ -18,24 +22,8 @@ class StaffManagement:
         self.create_ui()
 
     def setup_db(self):
-        self.conn = sqlite3.connect('staffdb.db')  # Changed to 'staffdb' database
+        self.conn = db.get_connection()
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS staff (
-                staff_id TEXT PRIMARY KEY,
-                full_name TEXT NOT NULL,
-                role TEXT NOT NULL,
-                contact_info TEXT NOT NULL,
-                assigned_groups TEXT NOT NULL,
-                last_login TEXT,
-                activity TEXT,
-                status TEXT NOT NULL,
-                emergency_contact TEXT NOT NULL,
-                is_phone_verified INTEGER DEFAULT 0,
-                is_email_verified INTEGER DEFAULT 0
-            )
-        ''')
-        self.conn.commit()
 
     def create_ui(self):
         for widget in self.parent.winfo_children():
@@ -53,7 +41,8 @@ class StaffManagement:
         self.canvas.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
 
-        self.canvas.bind_all("<MouseWheel>", lambda event: self.canvas.yview_scroll(int(-1*(event.delta/120)), "units"))
+        # Wheel scrolling only while the pointer is over this screen (it may be cached and hidden)
+        scrolling.bind_mousewheel(self.canvas)
 
         tk.Label(self.scrollable_frame, text="Staff Management", font=self.title_font, bg=self.bg_color, fg=self.fg_color).grid(row=0, column=0, columnspan=4, pady=20, sticky='w')
 
@@ -135,6 +124,8 @@ class StaffManagement:
         self.tree.column('Contact Info', width=200, anchor='w')
         self.tree.heading('Contact Info', text='Contact Info')
 
+        self.table_view = VirtualTable(self.tree, 'staff', ['staff_id', 'full_name', 'role', 'status', 'contact_info'], id_column='staff_id',
+                                       numbered=True)
         self.tree.bind('<<TreeviewSelect>>', self.on_staff_select)
 
         self.scrollable_frame.grid_columnconfigure(0, weight=1)
@@ -160,7 +151,7 @@ class StaffManagement:
             self.cursor.execute(f"INSERT INTO staff ({columns}) VALUES ({placeholders})", values)
             self.conn.commit()
             messagebox.showinfo("Success", "Staff added successfully")
-            self.load_staff()
+            changes.publish('staff', staff_id)
             self.clear_form()
         except sqlite3.IntegrityError as e:
             messagebox.showerror("Error", f"Integrity error: {e}")
@@ -177,7 +168,7 @@ class StaffManagement:
             self.cursor.execute(f"UPDATE staff SET {updates} WHERE staff_id=?", values)
             self.conn.commit()
             messagebox.showinfo("Success", "Staff updated successfully")
-            self.load_staff()
+            changes.publish('staff', staff_id)
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -190,7 +181,7 @@ class StaffManagement:
         self.cursor.execute("DELETE FROM staff WHERE staff_id=?", (staff_id,))
         self.conn.commit()
         messagebox.showinfo("Success", "Staff deleted successfully")
-        self.load_staff()
+        changes.publish('staff', staff_id)
         self.clear_form()
 
     def clear_form(self):
@@ -205,11 +196,7 @@ class StaffManagement:
                 entry.set('')
 
     def load_staff(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        self.cursor.execute("SELECT staff_id, full_name, role, status, contact_info FROM staff")
-        for i, row in enumerate(self.cursor.fetchall(), start=1):
-            self.tree.insert('', 'end', text=str(i), values=row)
+        self.table_view.reload()
 
     def on_staff_select(self, event):
         selected_item = self.tree.selection()
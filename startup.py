@@ -0,0 +1,87 @@
+import os
+import re
+import subprocess
+import sys
+import time
+import tkinter as tk
+
+FLAG = '--profile-startup'
+# Modules that used to be imported at startup and should now load on first use
+HEAVY_MODULES = ('fpdf', 'tkcalendar', 'PIL')
+# How many of the slowest imports the report lists
+REPORT_TOP = 15
+
+# Set by the profiling parent so the child can report time since it was spawned
+_T0_ENV = 'SHG_STARTUP_T0'
+_FIRST_FRAME = 'startup: first frame after '
+_IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def launch(build):
+    """Create the Tk root, build the first screen with build(root) and run it
+
+    With --profile-startup the script is re-run under -X importtime; that child
+    draws the first frame, reports how long it took and exits, and this
+    process prints the import report instead of starting the app.
+    """
+    if FLAG in sys.argv:
+        if 'importtime' not in sys._xoptions:
+            sys.exit(profile(sys.argv[0]))
+        root = tk.Tk()
+        build(root)
+        root.update()
+        print(f"{_FIRST_FRAME}{time.time() - float(os.environ[_T0_ENV]):.6f}", flush=True)
+        root.destroy()
+        return
+
+    root = tk.Tk()
+    build(root)
+    root.mainloop()
+
+
+def parse_importtime(output):
+    """Return (module, self us, cumulative us, depth) for each -X importtime line"""
+    imports = []
+    for line in output.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+
+def profile(script):
+    """Run script once under -X importtime, print the report and return its exit code"""
+    env = dict(os.environ, **{_T0_ENV: repr(time.time())})
+    child = subprocess.run([sys.executable, '-X', 'importtime', script, FLAG],
+                           capture_output=True, text=True, env=env)
+    first_frame = None
+    for line in child.stdout.splitlines():
+        if line.startswith(_FIRST_FRAME):
+            first_frame = float(line[len(_FIRST_FRAME):])
+    imports = parse_importtime(child.stderr)
+
+    if child.returncode != 0 or first_frame is None:
+        errors = [line for line in child.stderr.splitlines() if not line.startswith('import time:')]
+        print(f"{os.path.basename(script)} did not reach its first frame:", file=sys.stderr)
+        print('\n'.join(errors[-20:]), file=sys.stderr)
+        return child.returncode or 1
+
+    report(os.path.basename(script), first_frame, imports)
+    return 0
+
+
+def report(name, first_frame, imports):
+    total = sum(cumulative for _, _, cumulative, depth in imports if depth == 0)
+    print(f"Startup profile for {name}")
+    print(f"  time to first frame  {first_frame * 1000:9.1f} ms")
+    print(f"  imports              {total / 1000:9.1f} ms over {len(imports)} modules")
+    print()
+    print(f"  {'cumulative':>12} {'self':>10}  module")
+    for module, self_us, cumulative_us, depth in sorted(imports, key=lambda i: -i[2])[:REPORT_TOP]:
+        print(f"  {cumulative_us / 1000:9.1f} ms {self_us / 1000:7.1f} ms  {'  ' * depth}{module}")
+
+    loaded = {module.split('.')[0] for module, _, _, _ in imports}
+    eager = [module for module in HEAVY_MODULES if module in loaded]
+    print()
+    print(f"  heavy modules loaded before first frame: {', '.join(eager) if eager else 'none'}")
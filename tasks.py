@@ -0,0 +1,185 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+# Worker threads shared by every screen, and how often the UI thread collects results
+WORKERS = 4
+POLL_INTERVAL_MS = 50
+
+_current = threading.local()
+_runners = {}
+
+
+class Task:
+    """Handle for a submitted job; cancel() drops its result and stops it if not started"""
+
+    def __init__(self, func, args, kwargs, on_done, on_error, owner, on_progress=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.owner = owner
+        self.on_progress = on_progress
+        self.runner = None
+        self.future = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+def cancelled():
+    """Inside a job: True once the task running on this thread has been cancelled"""
+    task = getattr(_current, 'task', None)
+    return task is not None and task.cancelled
+
+
+def report_progress(*args):
+    """Inside a job: call the task's on_progress(*args) on the UI thread
+
+    Reports are coalesced, so only the latest one per poll reaches the UI and
+    a job may report as often as it likes.
+    """
+    task = getattr(_current, 'task', None)
+    if task is not None and task.on_progress is not None:
+        task.runner.progress[task] = args
+
+
+class TaskRunner:
+    """Thread pool whose completion callbacks run on the Tk thread
+
+    Jobs run on worker threads and must not touch widgets; database work in
+    a job gets that thread's own pooled connection from db.get_connection().
+    Results are queued and picked up by root.after polling, which then calls
+    on_done(result) or on_error(exception) on the UI thread.
+    """
+
+    def __init__(self, root, workers=WORKERS):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shg-worker')
+        self.results = queue.Queue()
+        self.progress = {}
+        self.pending = set()
+        self.busy_listeners = []
+        self._polling = False
+
+    def submit(self, func, *args, on_done=None, on_error=None, on_progress=None, owner=None, **kwargs):
+        """Run func(*args, **kwargs) on a worker thread and return its Task
+
+        If an owner widget is given, the callbacks are skipped once it has been
+        destroyed (e.g. the user switched screens while the job was running).
+        The job can feed on_progress through report_progress().
+        """
+        task = Task(func, args, kwargs, on_done, on_error, owner, on_progress)
+        task.runner = self
+        task.future = self.executor.submit(self._run, task)
+        task.future.add_done_callback(lambda future: self._collect_cancelled(task, future))
+        self.pending.add(task)
+        if len(self.pending) == 1:
+            self._set_busy(True)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+        return task
+
+    def _run(self, task):
+        if task.cancelled:
+            self.results.put((task, None, None))
+            return
+        _current.task = task
+        try:
+            self.results.put((task, task.func(*task.args, **task.kwargs), None))
+        except Exception as e:
+            self.results.put((task, None, e))
+        finally:
+            _current.task = None
+
+    def _collect_cancelled(self, task, future):
+        # A job cancelled before it started never reaches _run; still retire it
+        if future.cancelled():
+            self.results.put((task, None, None))
+
+    def _live(self, task):
+        return not task.cancelled and (task.owner is None or task.owner.winfo_exists())
+
+    def _poll(self):
+        # Progress first, so a job's last report lands before its on_done
+        for task in list(self.progress):
+            args = self.progress.pop(task)
+            if task in self.pending and self._live(task):
+                try:
+                    task.on_progress(*args)
+                except Exception as e:
+                    self.report_error(e)
+
+        while True:
+            try:
+                task, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(task)
+            self.progress.pop(task, None)
+            if not self._live(task):
+                continue
+            try:
+                if error is not None:
+                    (task.on_error or self.report_error)(error)
+                elif task.on_done:
+                    task.on_done(result)
+            except Exception as e:
+                # Keep polling for the other jobs even if one callback fails
+                self.report_error(e)
+
+        if self.pending:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+        else:
+            self._polling = False
+            self._set_busy(False)
+
+    def report_error(self, error):
+        messagebox.showerror("Error", str(error))
+
+    def add_busy_listener(self, callback):
+        """Call back with True when the first job starts and False when the last one ends"""
+        self.busy_listeners.append(callback)
+        callback(bool(self.pending))
+
+    def _set_busy(self, busy):
+        self.root.config(cursor='watch' if busy else '')
+        for callback in list(self.busy_listeners):
+            try:
+                callback(busy)
+            except Exception:
+                # Listener widget was destroyed along with its screen
+                self.busy_listeners.remove(callback)
+
+    def cancel_all(self):
+        for task in list(self.pending):
+            task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_runner(widget):
+    """Return the TaskRunner for the Tk application a widget belongs to"""
+    root = widget.nametowidget('.')
+    runner = _runners.get(root)
+    if runner is None:
+        runner = _runners[root] = TaskRunner(root)
+
+        def on_destroy(event):
+            if event.widget is root:
+                _runners.pop(root, runner).shutdown()
+
+        root.bind('<Destroy>', on_destroy, add='+')
+    return runner
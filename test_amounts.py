@@ -0,0 +1,113 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import ledger
+import migrate
+import money
+import schema
+import services
+
+
+class FormattedAmountTest(unittest.TestCase):
+    """Amounts typed with separators or a rupee sign must reach the paise columns intact"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.directory, 'shg.db'))
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.commit()
+        self.contributions = services.ContributionService(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def contribution(self, amount):
+        return {'member_name': 'A', 'contribution_type': 'Donation', 'amount': amount, 'payment_method': 'Cash',
+                'transaction_date': '2025-01-15', 'receipt_proof': '', 'status': 'Verified'}
+
+    def paise(self, sql, *params):
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def test_to_text(self):
+        self.assertEqual(money.to_text("1,000"), "1000.00")
+        self.assertEqual(money.to_text("₹500"), "500.00")
+        self.assertEqual(money.to_text(" ₹1,250.5 "), "1250.50")
+        self.assertEqual(money.to_text("-3"), "-3.00")
+        with self.assertRaises(ValueError):
+            money.to_text("12abc")
+
+    def test_contribution_amounts(self):
+        thousand = self.contributions.add(self.contribution("1,000"))
+        five_hundred = self.contributions.add(self.contribution("₹500"))
+        sql = "SELECT amount_paise FROM contributions WHERE contribution_id = ?"
+        self.assertEqual(self.paise(sql, thousand), 100000)
+        self.assertEqual(self.paise(sql, five_hundred), 50000)
+
+        self.contributions.update(five_hundred, self.contribution("₹2,500.75"))
+        self.assertEqual(self.paise(sql, five_hundred), 250075)
+        self.assertEqual(self.paise("SELECT contributions_paise FROM fund_ledger"), 350075)
+        self.assertEqual(self.paise("SELECT SUM(amount_paise) FROM contribution_monthly"), 350075)
+
+    def test_credit_amounts(self):
+        credit_id = self.contributions.add_credit('A', "₹1,250.50", '2025-01-15', 'Refund')
+        sql = "SELECT credit_amount_paise FROM credits WHERE credit_id = ?"
+        self.assertEqual(self.paise(sql, credit_id), 125050)
+        self.contributions.update_credit(credit_id, 'A', "2,000", '2025-01-15', 'Refund')
+        self.assertEqual(self.paise(sql, credit_id), 200000)
+        self.assertEqual(self.paise("SELECT credits_paise FROM fund_ledger"), 200000)
+
+    def test_stored_amounts_are_repaired(self):
+        # Rows saved before amounts were normalized
+        self.conn.execute("INSERT INTO contributions (contribution_id, member_name, contribution_type, amount, "
+                          "payment_method, transaction_date, receipt_proof, status) "
+                          "VALUES ('OLD', 'A', 'Donation', '1,000', 'Cash', '2025-01-15', '', 'Verified')")
+        self.conn.execute("INSERT INTO credits VALUES ('OLDCRD', 'A', '₹500', '2025-01-15', 'Refund')")
+        schema.normalize_amounts(self.conn.cursor())
+        self.assertEqual(self.paise("SELECT amount_paise FROM contributions WHERE contribution_id = 'OLD'"), 100000)
+        self.assertEqual(self.paise("SELECT credit_amount_paise FROM credits WHERE credit_id = 'OLDCRD'"), 50000)
+        self.assertEqual(ledger.verify(self.conn), {})
+
+
+class LegacyAmountTest(unittest.TestCase):
+    """Formatted amounts in the legacy module databases are cleaned up as they are imported"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_imported_amounts(self):
+        legacy = sqlite3.connect(os.path.join(self.directory, 'contributiondb.db'))
+        legacy.execute("CREATE TABLE contributions (contribution_id TEXT PRIMARY KEY, member_name TEXT, "
+                       "contribution_type TEXT, amount TEXT, payment_method TEXT, transaction_date TEXT, "
+                       "receipt_proof TEXT, status TEXT)")
+        legacy.execute("CREATE TABLE credits (credit_id TEXT PRIMARY KEY, member_name TEXT, credit_amount TEXT, "
+                       "credit_date TEXT, credit_reason TEXT)")
+        legacy.execute("INSERT INTO contributions VALUES ('C1', 'A', 'Donation', '1,500', 'Cash', '15/01/2025', "
+                       "'', 'Verified')")
+        legacy.execute("INSERT INTO credits VALUES ('R1', 'A', '₹250', '2025-01-20', 'Refund')")
+        legacy.commit()
+        legacy.close()
+
+        path = os.path.join(self.directory, 'shg.db')
+        migrate.migrate(path, self.directory)
+        conn = sqlite3.connect(path)
+        try:
+            self.assertEqual(conn.execute("SELECT amount, amount_paise FROM contributions").fetchone(),
+                             ('1500.00', 150000))
+            self.assertEqual(conn.execute("SELECT contributions_paise, credits_paise FROM fund_ledger").fetchone(),
+                             (150000, 25000))
+            self.assertEqual(conn.execute("SELECT SUM(amount_paise) FROM contribution_monthly").fetchone()[0],
+                             150000)
+            self.assertEqual(ledger.verify(conn), {})
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import csv
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import bulkimport
+import schema
+import tasks
+
+CONTRIBUTION_HEADER = ['contribution_id', 'member_name', 'contribution_type', 'amount', 'payment_method',
+                       'transaction_date', 'receipt_proof', 'status']
+USER_HEADER = ['first_name', 'last_name', 'dob', 'gender', 'account_status', 'primary_phone', 'email',
+               'emergency_contact']
+
+
+class BulkImportTest(unittest.TestCase):
+    """Rejected rows, the single transaction and cancellation of the CSV importer"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.directory, 'shg.db'))
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def write_csv(self, header, rows, name='import.csv'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        return path
+
+    def count(self, table):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def contributions_file(self):
+        return self.write_csv(CONTRIBUTION_HEADER, [
+            ['C1', 'A', 'Donation', '1,000', 'Cash', '2025-01-15', '', 'verified'],
+            ['C2', 'B', 'Donation', 'abc', 'Cash', '2025-01-15', '', 'Verified'],
+            ['C1', 'C', 'Donation', '200', 'Cash', '2025-01-15', '', 'Verified'],
+            ['', 'D', 'Donation', '300', 'Cash', '15/01/2025', '', 'Pending'],
+            ['C5', 'E', 'Donation', '400', 'Cash', 'someday', '', 'Verified'],
+        ])
+
+    def test_rejects(self):
+        report = bulkimport.import_file(self.contributions_file(), 'contributions', self.conn, batch_size=2)
+        self.assertEqual(report.inserted, 2)
+        self.assertEqual([line for line, _ in report.errors], [3, 4, 6])
+        self.assertIn("amount", report.errors[0][1])
+        self.assertIn("appears more than once", report.errors[1][1])
+        self.assertIn("transaction_date", report.errors[2][1])
+        self.assertEqual(self.conn.execute("SELECT amount, status FROM contributions WHERE contribution_id = 'C1'")
+                         .fetchone(), ('1000.00', 'Verified'))
+        self.assertEqual(self.conn.execute("SELECT contributions_paise FROM fund_ledger").fetchone()[0], 100000)
+
+        # The reject file keeps the rows as read and can be fixed up and imported again
+        rejects = os.path.join(self.directory, 'rejects.csv')
+        report.write_rejects(rejects)
+        with open(rejects, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], CONTRIBUTION_HEADER + ['line', 'error'])
+        self.assertEqual(rows[1][:8], ['C2', 'B', 'Donation', 'abc', 'Cash', '2025-01-15', '', 'Verified'])
+        again = bulkimport.import_file(rejects, 'contributions', self.conn)
+        self.assertEqual((again.inserted, len(again.errors)), (0, 3))
+
+    def test_existing_ids_are_rejected(self):
+        path = self.write_csv(['credit_id', 'member_name', 'credit_amount', 'credit_date', 'credit_reason'],
+                              [['R1', 'A', '100', '2025-01-15', 'Refund']])
+        self.assertEqual(bulkimport.import_file(path, 'credits', self.conn).inserted, 1)
+        report = bulkimport.import_file(path, 'credits', self.conn)
+        self.assertEqual(report.inserted, 0)
+        self.assertEqual(report.errors, [(2, "credit_id R1 already exists")])
+
+    def test_taken_contacts_match_however_they_were_typed(self):
+        # Rows saved before phone numbers and emails were cleaned on the way in
+        self.conn.execute("INSERT INTO users (user_id, first_name, last_name, dob, gender, reg_date, account_status, "
+                          "primary_phone, email, emergency_contact) VALUES ('U1', 'A', 'B', '1990-01-01', 'Female', "
+                          "'2025-01-01', 'Active', '98765 43210', 'A@X.com', 'C')")
+        self.conn.commit()
+        path = self.write_csv(USER_HEADER, [
+            ['D', 'E', '1991-01-01', 'female', 'active', '98765-43210', '', 'F'],
+            ['G', 'H', '1992-01-01', 'Male', 'Active', '9123456789', 'a@x.COM', 'I'],
+            ['J', 'K', '1993-01-01', 'Male', 'Active', '(91) 234-56780', 'j@x.com', 'L'],
+            ['M', 'N', '1994-01-01', 'Male', 'Active', '91 23456780', 'm@x.com', 'O'],
+        ])
+        report = bulkimport.import_file(path, 'users', self.conn)
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual(sorted(report.errors), [(2, "primary_phone 9876543210 already exists"),
+                                         (3, "email a@x.com already exists"),
+                                         (5, "primary_phone 9123456780 appears more than once in the file")])
+        self.assertEqual(self.conn.execute("SELECT primary_phone, email FROM users WHERE first_name = 'J'").fetchone(),
+                         ('9123456780', 'j@x.com'))
+
+    def test_cancelled_small_import_saves_nothing(self):
+        # Fewer rows than one batch, cancelled while the job runs
+        path = self.contributions_file()
+        runner = tasks.TaskRunner(None, workers=1)
+        task = tasks.Task(lambda: task.cancel() or bulkimport.import_file(path, 'contributions', self.conn),
+                          (), {}, None, None, None)
+        task.runner = runner
+        try:
+            runner._run(task)
+        finally:
+            runner.executor.shutdown()
+        _, report, error = runner.results.get_nowait()
+        self.assertIsNone(error)
+        self.assertTrue(report.cancelled)
+        self.assertEqual(report.inserted, 0)
+        self.assertEqual(self.count('contributions'), 0)
+        self.assertEqual(self.conn.execute("SELECT contributions_paise FROM fund_ledger").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import sqlite3
+import unittest
+
+import dates
+import schema
+
+
+class AmbiguousDateTest(unittest.TestCase):
+    """Legacy dates that could be read either way must be listed for review, not rewritten silently"""
+
+    def test_is_ambiguous(self):
+        self.assertTrue(dates.is_ambiguous('05/04/2025'))
+        self.assertTrue(dates.is_ambiguous('05/04/25 10:30'))
+        self.assertFalse(dates.is_ambiguous('05/05/2025'))
+        self.assertFalse(dates.is_ambiguous('05/25/2025'))
+        self.assertFalse(dates.is_ambiguous('25/05/2025'))
+        self.assertFalse(dates.is_ambiguous('05-04-2025'))
+        self.assertFalse(dates.is_ambiguous('2025-05-04'))
+
+    def test_normalize_dates_records_ambiguous_rows(self):
+        conn = sqlite3.connect(':memory:')
+        cursor = conn.cursor()
+        schema.create_base_tables(cursor)
+        cursor.executemany("INSERT INTO credits VALUES (?, 'A', '100', ?, 'Refund')",
+                           [('C1', '05/04/2025'), ('C2', '25/05/2025'), ('C3', '2025-01-15')])
+
+        ambiguous = schema.normalize_dates(cursor)
+        self.assertEqual(ambiguous, [('credits', 'C1', 'credit_date', '05/04/2025', '2025-05-04')])
+        self.assertEqual(cursor.execute("SELECT * FROM date_review").fetchall(), ambiguous)
+        self.assertEqual(cursor.execute("SELECT credit_date FROM credits ORDER BY credit_id").fetchall(),
+                         [('2025-05-04',), ('2025-05-25',), ('2025-01-15',)])
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
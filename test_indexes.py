@@ -0,0 +1,30 @@
+import sqlite3
+import unittest
+
+import indexes
+import schema
+
+
+class QueryPlanTest(unittest.TestCase):
+    """Every hot query is answered through an index on a freshly migrated database"""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        schema.apply_migrations(self.conn.cursor())
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_hot_queries_use_indexes(self):
+        self.assertEqual(indexes.check_query_plans(self.conn), [])
+
+    def test_unbounded_index_scan_is_a_full_scan(self):
+        cursor = self.conn.cursor()
+        self.assertTrue(indexes.full_scans(cursor, "SELECT id FROM repayments ORDER BY repay_date DESC"))
+        self.assertEqual(indexes.full_scans(cursor, "SELECT id FROM repayments ORDER BY repay_date DESC LIMIT 10"), [])
+        self.assertTrue(indexes.full_scans(cursor, "SELECT * FROM staff"))
+        self.assertEqual(indexes.full_scans(cursor, "SELECT * FROM loans WHERE status = ?", ('Approved',)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
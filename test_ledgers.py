@@ -0,0 +1,180 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import ledger
+import schema
+
+
+class TriggerTestCase(unittest.TestCase):
+    """A fresh, fully migrated database per test"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.directory, 'shg.db'))
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def row(self, sql, *params):
+        return self.conn.execute(sql, params).fetchone()
+
+    def contribution(self, contribution_id, amount, status='Verified', date='2025-01-15', member='A'):
+        self.conn.execute("INSERT INTO contributions (contribution_id, member_name, contribution_type, amount, "
+                          "payment_method, transaction_date, receipt_proof, status) VALUES (?, ?, 'Savings', ?, "
+                          "'Cash', ?, '', ?)", (contribution_id, member, amount, date, status))
+
+    def loan(self, loan_id, amount, allocated=1):
+        self.conn.execute("INSERT INTO loans (loan_id, applicant_name, group_name, loan_amount, purpose, "
+                          "duration_months, interest_rate, status, approved_date, funds_allocated) "
+                          "VALUES (?, 'A', 'G', ?, 'Shop', 12, 12, ?, '2025-01-01', ?)",
+                          (loan_id, amount, 'Approved' if allocated else 'Pending', allocated))
+
+
+class FundLedgerTest(TriggerTestCase):
+
+    def ledger(self):
+        return self.row("SELECT contributions_paise, credits_paise, allocated_paise FROM fund_ledger")
+
+    def test_inserts(self):
+        self.contribution('C1', '1000')
+        self.contribution('C2', '250.50')
+        self.contribution('C3', '999', status='Pending')
+        self.conn.execute("INSERT INTO credits VALUES ('D1', 'A', '100', '2025-01-20', 'Refund')")
+        self.loan('L1', 500)
+        self.loan('L2', 700, allocated=0)
+        self.assertEqual(self.ledger(), (125050, 10000, 50000))
+        self.assertEqual(ledger.get_available_funds(self.conn.cursor()), 650.50)
+
+    def test_updates(self):
+        self.contribution('C1', '1000', status='Pending')
+        self.conn.execute("INSERT INTO credits VALUES ('D1', 'A', '100', '2025-01-20', 'Refund')")
+        self.loan('L1', 500, allocated=0)
+        self.conn.execute("UPDATE contributions SET status = 'Verified' WHERE contribution_id = 'C1'")
+        self.conn.execute("UPDATE contributions SET amount = '1200' WHERE contribution_id = 'C1'")
+        self.conn.execute("UPDATE credits SET credit_amount = '40' WHERE credit_id = 'D1'")
+        self.conn.execute("UPDATE loans SET funds_allocated = 1 WHERE loan_id = 'L1'")
+        self.conn.execute("UPDATE loans SET loan_amount = 800 WHERE loan_id = 'L1'")
+        self.assertEqual(self.ledger(), (120000, 4000, 80000))
+        # Releasing a loan's funds hands them back
+        self.conn.execute("UPDATE loans SET funds_allocated = 0 WHERE loan_id = 'L1'")
+        self.assertEqual(self.ledger()[2], 0)
+        self.assertEqual(ledger.verify(self.conn), {})
+
+    def test_deletes(self):
+        self.contribution('C1', '1000')
+        self.contribution('C2', '300', status='Rejected')
+        self.conn.execute("INSERT INTO credits VALUES ('D1', 'A', '100', '2025-01-20', 'Refund')")
+        self.loan('L1', 500)
+        self.conn.execute("DELETE FROM contributions")
+        self.conn.execute("DELETE FROM credits")
+        self.conn.execute("DELETE FROM loans")
+        self.assertEqual(self.ledger(), (0, 0, 0))
+
+    def test_rebuild_fixes_drift(self):
+        self.contribution('C1', '1000')
+        self.conn.execute("UPDATE fund_ledger SET contributions_paise = 1")
+        self.assertEqual(ledger.verify(self.conn), {'contributions_paise': 1 - 100000})
+        ledger.rebuild(self.conn)
+        self.assertEqual(ledger.verify(self.conn), {})
+
+
+class LoanBalanceTest(TriggerTestCase):
+
+    def repay(self, amount, date):
+        return self.conn.execute("INSERT INTO repayments (loan_id, repay_amount, repay_date) VALUES ('L1', ?, ?)",
+                                 (amount, date)).lastrowid
+
+    def balance(self):
+        return self.row("SELECT loan_amount, total_paid, outstanding FROM loan_balances WHERE loan_id = 'L1'")
+
+    def remaining(self):
+        return [row[0] for row in self.conn.execute("SELECT remaining FROM repayments ORDER BY repay_date, id")]
+
+    def test_new_loan_gets_a_balance(self):
+        self.loan('L1', 1000)
+        self.assertEqual(self.balance(), (1000.0, 0.0, 1000.0))
+
+    def test_repayments_keep_balance_and_remaining(self):
+        self.loan('L1', 1000)
+        self.repay(100, '2025-02-01')
+        self.repay(200, '2025-04-01')
+        self.assertEqual(self.balance(), (1000.0, 300.0, 700.0))
+        self.assertEqual(self.remaining(), [900.0, 700.0])
+
+        # A back-dated repayment lowers `remaining` on the rows after it
+        back_dated = self.repay(50, '2025-03-01')
+        self.assertEqual(self.remaining(), [900.0, 850.0, 650.0])
+
+        self.conn.execute("UPDATE repayments SET repay_amount = 150 WHERE id = ?", (back_dated,))
+        self.assertEqual(self.balance()[1:], (450.0, 550.0))
+        self.assertEqual(self.remaining(), [900.0, 750.0, 550.0])
+
+        self.conn.execute("DELETE FROM repayments WHERE id = ?", (back_dated,))
+        self.assertEqual(self.balance()[1:], (300.0, 700.0))
+        self.assertEqual(self.remaining(), [900.0, 700.0])
+
+    def test_loan_amount_change(self):
+        self.loan('L1', 1000)
+        self.repay(100, '2025-02-01')
+        self.conn.execute("UPDATE loans SET loan_amount = 1500 WHERE loan_id = 'L1'")
+        self.assertEqual(self.balance(), (1500.0, 100.0, 1400.0))
+        self.assertEqual(self.remaining(), [1400.0])
+
+    def test_deleting_the_loan_drops_its_balance(self):
+        self.loan('L1', 1000)
+        self.repay(100, '2025-02-01')
+        self.conn.execute("DELETE FROM loans WHERE loan_id = 'L1'")
+        self.assertIsNone(self.balance())
+        self.assertEqual(self.remaining(), [])
+
+
+class ContributionRollupTest(TriggerTestCase):
+
+    def rollup(self):
+        return self.conn.execute("SELECT month, member_name, entries, amount_paise FROM contribution_monthly "
+                                 "ORDER BY month, member_name").fetchall()
+
+    def assert_matches_rebuild(self):
+        maintained = self.rollup()
+        schema.rebuild_contribution_rollup(self.conn.cursor())
+        self.assertEqual(maintained, self.rollup())
+
+    def test_inserts_group_by_month(self):
+        self.contribution('C1', '100', date='2025-01-05')
+        self.contribution('C2', '200', date='2025-01-25')
+        self.contribution('C3', '50', date='2025-02-01')
+        self.contribution('C4', '70', date='2025-02-02', member='B')
+        # Unverified and unparsed dates stay out
+        self.contribution('C5', '999', status='Pending', date='2025-01-10')
+        self.contribution('C6', '999', date='soon')
+        self.assertEqual(self.rollup(), [('2025-01', 'A', 2, 30000), ('2025-02', 'A', 1, 5000),
+                                         ('2025-02', 'B', 1, 7000)])
+        self.assert_matches_rebuild()
+
+    def test_updates_move_between_groups(self):
+        self.contribution('C1', '100', date='2025-01-05')
+        self.contribution('C2', '200', date='2025-01-25', status='Pending')
+        self.conn.execute("UPDATE contributions SET status = 'Verified' WHERE contribution_id = 'C2'")
+        self.conn.execute("UPDATE contributions SET transaction_date = '2025-03-01' WHERE contribution_id = 'C1'")
+        self.conn.execute("UPDATE contributions SET amount = '250' WHERE contribution_id = 'C2'")
+        self.assertEqual(self.rollup(), [('2025-01', 'A', 1, 25000), ('2025-03', 'A', 1, 10000)])
+        self.assert_matches_rebuild()
+
+    def test_deletes_drop_empty_groups(self):
+        self.contribution('C1', '100', date='2025-01-05')
+        self.contribution('C2', '200', date='2025-01-25')
+        self.conn.execute("DELETE FROM contributions WHERE contribution_id = 'C1'")
+        self.assertEqual(self.rollup(), [('2025-01', 'A', 1, 20000)])
+        self.conn.execute("DELETE FROM contributions")
+        self.assertEqual(self.rollup(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import ledger
+import migrate
+import schema
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class LegacyMigrationTest(unittest.TestCase):
+    """The shipped per-module databases arrive whole in the unified schema"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for filename, _ in migrate.LEGACY_SOURCES:
+            shutil.copy(os.path.join(HERE, filename), self.directory)
+        self.path = os.path.join(self.directory, 'shg.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def count(self, conn, table):
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_round_trip(self):
+        report = migrate.migrate(self.path, self.directory)
+        conn = sqlite3.connect(self.path)
+        try:
+            for filename, table, copied, skipped, _ in report:
+                legacy = sqlite3.connect(os.path.join(self.directory, filename))
+                self.assertEqual(copied + skipped, self.count(legacy, table), table)
+                legacy.close()
+                if table != 'fund_allocation':
+                    self.assertEqual(self.count(conn, table), copied, table)
+            self.assertEqual({table for _, table, _, _, _ in report},
+                             {table for _, tables in migrate.LEGACY_SOURCES for table in tables})
+
+            # Everything derived from the imported rows is in step with them
+            self.assertEqual(ledger.verify(conn), {})
+            self.assertEqual(self.count(conn, 'loan_balances'), self.count(conn, 'loans'))
+            self.assertEqual(self.count(conn, 'search_docs'), sum(self.count(conn, table) for table, *_ in
+                                                                  schema.SEARCH_SOURCES.values()))
+            rollup = conn.execute("SELECT * FROM contribution_monthly ORDER BY 1, 2, 3, 4").fetchall()
+            schema.rebuild_contribution_rollup(conn.cursor())
+            self.assertEqual(conn.execute("SELECT * FROM contribution_monthly ORDER BY 1, 2, 3, 4").fetchall(), rollup)
+            self.assertEqual(conn.execute("PRAGMA foreign_key_check").fetchall(), [])
+            imported = self.count(conn, 'legacy_imports')
+        finally:
+            conn.close()
+        self.assertEqual(imported, len(migrate.LEGACY_SOURCES))
+
+        # Files already imported are not read again
+        self.assertEqual(migrate.migrate(self.path, self.directory), [])
+
+    def test_orphan_repayments_are_skipped(self):
+        legacy = sqlite3.connect(os.path.join(self.directory, 'repaymentdb.db'))
+        legacy.execute("INSERT INTO repayments (loan_id, repay_amount, repay_date, remaining) "
+                       "VALUES ('NO-SUCH-LOAN', 10, '2025-01-01', 0)")
+        legacy.commit()
+        legacy.close()
+        report = migrate.migrate(self.path, self.directory)
+        skipped = {table: skipped for _, table, _, skipped, _ in report}
+        self.assertGreaterEqual(skipped['repayments'], 1)
+        conn = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(self.count(conn, "repayments WHERE loan_id = 'NO-SUCH-LOAN'"), 0)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import importlib.util
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+
+import schema
+import services
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+if HAS_NUMPY:
+    import risk
+
+
+@unittest.skipUnless(HAS_NUMPY, "portfolio risk needs numpy")
+class PortfolioRiskTest(unittest.TestCase):
+    """Arrears are measured on principal, the basis repayments are capped on"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.directory, 'shg.db'))
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.commit()
+        services.ContributionService(self.conn).add({
+            'member_name': 'A', 'contribution_type': 'Donation', 'amount': '50000', 'payment_method': 'Cash',
+            'transaction_date': '2024-12-01', 'receipt_proof': '', 'status': 'Verified'})
+        self.loan_id = services.LoanService(self.conn).add({
+            'applicant_name': 'A', 'group_name': 'G', 'loan_amount': '12000', 'purpose': 'Stock',
+            'duration_months': '12', 'interest_rate': '12', 'status': 'Approved', 'rejection_reason': '',
+            'approved_date': '2025-01-01'})
+        self.repayments = services.RepaymentService(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def report(self):
+        return risk.portfolio_risk(self.conn.cursor(), date(2026, 1, 15))
+
+    def test_unpaid_loan_is_at_risk(self):
+        report = self.report()
+        self.assertEqual(report.portfolio_paise, 1200000)
+        self.assertEqual(report.arrears_paise, 1200000)
+        self.assertEqual(report.par_ratio(90), 1.0)
+        # First instalment fell due on 2025-02-01
+        self.assertEqual(report.overdue[0][5], 348)
+
+    def test_partly_repaid_loan(self):
+        # Covers the principal of the first six instalments, not the seventh (due 2025-08-01)
+        self.repayments.add(self.loan_id, 6000, '2025-07-01')
+        report = self.report()
+        self.assertEqual(report.portfolio_paise, 600000)
+        self.assertEqual(report.arrears_paise, 600000)
+        self.assertEqual(report.overdue[0][5], 167)
+
+    def test_fully_repaid_loan_is_not_at_risk(self):
+        for month in range(1, 13):
+            self.repayments.add(self.loan_id, 1000, f"2025-{month:02d}-15")
+        with self.assertRaises(services.ServiceError):
+            self.repayments.add(self.loan_id, 1, '2025-12-20')
+
+        report = self.report()
+        self.assertEqual(report.loan_count, 1)
+        self.assertEqual(report.portfolio_paise, 0)
+        self.assertEqual(report.arrears_paise, 0)
+        self.assertEqual(report.overdue, [])
+        for days in risk.PAR_DAYS:
+            self.assertEqual(report.par[days], (0, 0))
+            self.assertEqual(report.par_ratio(days), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import importlib.util
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import schema
+import services
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+if HAS_NUMPY:
+    import amortization
+
+LOAN = {'applicant_name': 'A', 'group_name': 'G', 'loan_amount': '12000', 'purpose': 'Stock',
+        'duration_months': '12', 'interest_rate': '12', 'status': 'Approved', 'rejection_reason': '',
+        'approved_date': '2025-01-01'}
+
+
+@unittest.skipUnless(HAS_NUMPY, "loan schedules need numpy")
+class LoanScheduleTest(unittest.TestCase):
+    """The persisted EMI schedule, its invalidation and the schedule-vs-paid view"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'shg.db')
+        self.conn = sqlite3.connect(self.path)
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.commit()
+        services.ContributionService(self.conn).add({
+            'member_name': 'A', 'contribution_type': 'Donation', 'amount': '50000', 'payment_method': 'Cash',
+            'transaction_date': '2024-12-01', 'receipt_proof': '', 'status': 'Verified'})
+        self.loans = services.LoanService(self.conn)
+        self.loan_id = self.loans.add(LOAN)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def instalments(self):
+        return self.conn.execute("SELECT COUNT(*) FROM loan_schedule WHERE loan_id = ?", (self.loan_id,)).fetchone()[0]
+
+    def test_schedule_adds_up(self):
+        self.assertEqual(amortization.regenerate(self.conn, [self.loan_id]), 1)
+        principal, last_balance, first_due = self.conn.execute(
+            "SELECT SUM(principal_paise), MIN(balance_paise), MIN(due_date) FROM loan_schedule").fetchone()
+        self.assertEqual((principal, last_balance, first_due), (1200000, 0, '2025-02-01'))
+
+    def test_changed_terms_drop_the_schedule(self):
+        amortization.regenerate(self.conn, [self.loan_id])
+        self.assertEqual(self.instalments(), 12)
+        self.loans.update(self.loan_id, dict(LOAN, duration_months='6'))
+        self.assertEqual(self.instalments(), 0)
+        self.assertEqual(amortization.regenerate(self.conn, missing_only=True), 1)
+        self.assertEqual(self.instalments(), 6)
+        # Nothing is missing any more
+        self.assertEqual(amortization.regenerate(self.conn, missing_only=True), 0)
+
+    def test_schedule_vs_paid_only_reads(self):
+        watcher = sqlite3.connect(self.path)
+        worker = sqlite3.connect(self.path)
+        try:
+            version = watcher.execute("PRAGMA data_version").fetchone()[0]
+            self.assertEqual(amortization.schedule_vs_paid(self.loan_id, worker), [])
+            self.assertEqual(watcher.execute("PRAGMA data_version").fetchone()[0], version)
+        finally:
+            watcher.close()
+            worker.close()
+
+    def test_repaid_on_time_is_never_short(self):
+        repayments = services.RepaymentService(self.conn)
+        for month in range(1, 13):
+            repayments.add(self.loan_id, 1000, f"2025-{month:02d}-15")
+        amortization.regenerate(self.conn, [self.loan_id], missing_only=True)
+
+        rows = amortization.schedule_vs_paid(self.loan_id, self.conn)
+        self.assertEqual(len(rows), 12)
+        for number, due_date, due, interest, principal, balance, principal_to_date, paid in rows:
+            self.assertGreaterEqual(paid, principal_to_date, f"instalment {number}")
+        self.assertEqual(rows[-1][6:], (1200000, 1200000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import schema
+
+
+def half_done(cursor):
+    schema._execute_script(cursor, '''
+        CREATE TABLE half_done (id INTEGER PRIMARY KEY);
+        CREATE TRIGGER half_done_insert AFTER INSERT ON half_done
+        BEGIN
+            UPDATE fund_ledger SET total_credits = total_credits + 1 WHERE id = 1;
+        END;
+    ''')
+    cursor.execute("UPDATE users SET first_name = 'changed'")
+    raise sqlite3.OperationalError("interrupted")
+
+
+class MigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'shg.db')
+        self.conn = sqlite3.connect(self.path)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def test_fresh_database_reaches_latest_version(self):
+        schema.apply_migrations(self.conn.cursor())
+        self.assertEqual(self.version(), len(schema.MIGRATIONS))
+        self.assertFalse(self.conn.in_transaction)
+
+    def test_failed_migration_leaves_nothing_behind(self):
+        migrations = schema.MIGRATIONS[:2] + [half_done]
+        with mock.patch.object(schema, 'MIGRATIONS', migrations):
+            self.assertRaises(sqlite3.OperationalError, schema.apply_migrations, self.conn.cursor())
+        self.assertEqual(self.version(), 2)
+        self.assertIsNone(self.conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'half_done%'").fetchone())
+
+        # Another connection sees the same state: nothing was committed halfway
+        other = sqlite3.connect(self.path)
+        self.assertEqual(other.execute("PRAGMA user_version").fetchone()[0], 2)
+        other.close()
+
+        schema.apply_migrations(self.conn.cursor())
+        self.assertEqual(self.version(), len(schema.MIGRATIONS))
+
+    def test_caller_writes_are_kept(self):
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.execute("INSERT INTO credits VALUES ('C1', 'A', 100, '2024-01-01', 'x')")
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.rollback()
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM credits").fetchone()[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
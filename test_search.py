@@ -0,0 +1,69 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import schema
+import search
+
+
+class SearchIndexTest(unittest.TestCase):
+    """The search triggers keep the FTS index in step with the source tables"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.directory, 'shg.db'))
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def hits(self, text):
+        return [(kind, key) for kind, key, _, _ in search.search(text, cursor=self.conn.cursor())]
+
+    def row_counts(self):
+        return (self.conn.execute("SELECT COUNT(*) FROM search_docs").fetchone()[0],
+                self.conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0])
+
+    def add_member(self, user_id, first_name, city):
+        self.conn.execute("INSERT INTO users (user_id, first_name, last_name, dob, gender, reg_date, account_status, "
+                          "primary_phone, emergency_contact, city) VALUES (?, ?, 'Devi', '1990-01-01', 'Female', "
+                          "'2025-01-01', 'Active', ?, 'C', ?)", (user_id, first_name, user_id, city))
+
+    def test_match_expression(self):
+        self.assertEqual(search.match_expression('sun  "de'), '"sun"* "de"*')
+        self.assertEqual(search.match_expression(' - '), '')
+        self.assertEqual(search.search('', cursor=self.conn.cursor()), [])
+
+    def test_insert_update_delete(self):
+        self.add_member('U1', 'Sunita', 'Pune')
+        self.conn.execute("INSERT INTO loans (loan_id, applicant_name, group_name, loan_amount, purpose, "
+                          "duration_months, interest_rate, status) VALUES ('L1', 'Sunita Devi', 'G', 100, "
+                          "'Tailoring', 12, 12, 'Pending')")
+        self.assertEqual(sorted(self.hits('sun')), [('loan', 'L1'), ('user', 'U1')])
+        self.assertEqual(self.hits('tailor'), [('loan', 'L1')])
+
+        self.conn.execute("UPDATE users SET first_name = 'Meena' WHERE user_id = 'U1'")
+        self.assertEqual(self.hits('sun'), [('loan', 'L1')])
+        self.assertEqual(self.hits('meena pune'), [('user', 'U1')])
+
+        # A changed key keeps the same index row under the new key
+        self.conn.execute("UPDATE users SET user_id = 'U2' WHERE user_id = 'U1'")
+        self.assertEqual(self.hits('meena'), [('user', 'U2')])
+
+        self.conn.execute("DELETE FROM users")
+        self.conn.execute("DELETE FROM loans")
+        self.assertEqual(self.hits('meena'), [])
+        self.assertEqual(self.row_counts(), (0, 0))
+
+    def test_title_ranks_above_details(self):
+        self.add_member('U1', 'Asha', 'Pune')
+        self.add_member('U2', 'Pune', 'Nagpur')
+        self.assertEqual(self.hits('pune'), [('user', 'U2'), ('user', 'U1')])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import schema
+import services
+
+MEMBER = {'first_name': 'A', 'last_name': 'B', 'dob': '1990-01-01', 'gender': 'Female', 'account_status': 'Active',
+          'primary_phone': '98765 43210', 'email': ' A@X.com ', 'emergency_contact': 'C'}
+
+
+class ServiceTestCase(unittest.TestCase):
+    """A fresh, fully migrated database per test"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.directory, 'shg.db'))
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def row(self, sql, *params):
+        return self.conn.execute(sql, params).fetchone()
+
+
+class MemberServiceTest(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.members = services.MemberService(self.conn)
+
+    def test_contacts_are_stored_clean(self):
+        user_id = self.members.add(MEMBER)
+        self.assertEqual(self.row("SELECT primary_phone, email, reg_date IS NOT NULL FROM users WHERE user_id = ?",
+                                  user_id), ('9876543210', 'a@x.com', 1))
+        # A blank email is NULL, so any number of members can leave it out
+        self.members.add(dict(MEMBER, primary_phone='9123456789', email=''))
+        self.members.add(dict(MEMBER, primary_phone='9123456780', email=''))
+        self.assertEqual(self.row("SELECT COUNT(*) FROM users WHERE email IS NULL")[0], 2)
+
+    def test_taken_contacts_match_however_they_were_typed(self):
+        self.conn.execute("INSERT INTO users (user_id, first_name, last_name, dob, gender, reg_date, account_status, "
+                          "primary_phone, email, emergency_contact) VALUES ('OLD', 'A', 'B', '1990-01-01', 'Female', "
+                          "'2025-01-01', 'Active', '98765-43210', 'Old@X.com', 'C')")
+        self.conn.commit()
+        with self.assertRaisesRegex(services.ServiceError, "phone number"):
+            self.members.add(dict(MEMBER, email=''))
+        with self.assertRaisesRegex(services.ServiceError, "email"):
+            self.members.add(dict(MEMBER, primary_phone='9123456789', email='old@x.com'))
+        # A member keeps their own number and email on update
+        self.members.update('OLD', dict(MEMBER, primary_phone='(98765) 43210', email='OLD@x.com'))
+        self.assertEqual(self.row("SELECT primary_phone, email FROM users WHERE user_id = 'OLD'"),
+                         ('9876543210', 'old@x.com'))
+
+
+LOAN = {'applicant_name': 'A B', 'group_name': 'G', 'loan_amount': '1000', 'purpose': 'Shop',
+        'duration_months': '12', 'interest_rate': '12', 'status': 'Approved'}
+
+
+class FundedTestCase(ServiceTestCase):
+    """Starts with 1,500 rupees of verified contributions in the fund"""
+
+    def setUp(self):
+        super().setUp()
+        self.contributions = services.ContributionService(self.conn)
+        self.contributions.add({'member_name': 'A B', 'contribution_type': 'Savings', 'amount': '1,500',
+                                'payment_method': 'Cash', 'transaction_date': '2025-01-15', 'receipt_proof': '',
+                                'status': 'Verified'})
+        self.loans = services.LoanService(self.conn)
+
+
+class LoanServiceTest(FundedTestCase):
+
+    def test_terms_must_be_numbers(self):
+        with self.assertRaisesRegex(services.ServiceError, "valid numbers"):
+            self.loans.add(dict(LOAN, duration_months='a year'))
+        self.assertEqual(self.row("SELECT COUNT(*) FROM loans")[0], 0)
+
+    def test_approval_needs_funds(self):
+        with self.assertRaises(services.InsufficientFunds) as caught:
+            self.loans.add(dict(LOAN, loan_amount='2000'))
+        self.assertEqual((caught.exception.required, caught.exception.available), (2000.0, 1500.0))
+        # A pending loan needs no funds until it is approved
+        loan_id = self.loans.add(dict(LOAN, loan_amount='2000', status='Pending'))
+        self.assertEqual(self.row("SELECT funds_allocated, approved_date FROM loans WHERE loan_id = ?", loan_id),
+                         (0, ''))
+        self.assertRaises(services.InsufficientFunds, self.loans.update, loan_id, dict(LOAN, loan_amount='2000'))
+
+    def test_allocation_follows_status(self):
+        loan_id = self.loans.add(LOAN)
+        self.assertEqual(self.loans.available_funds(), 500.0)
+        self.assertEqual(self.row("SELECT funds_allocated, approved_date != '' FROM loans WHERE loan_id = ?",
+                                  loan_id), (1, 1))
+        with self.assertRaisesRegex(services.InsufficientFunds, "amount increase"):
+            self.loans.update(loan_id, dict(LOAN, loan_amount='1600'))
+        self.loans.update(loan_id, dict(LOAN, loan_amount='1500'))
+        self.assertEqual(self.loans.available_funds(), 0.0)
+        self.loans.update(loan_id, dict(LOAN, status='Rejected'))
+        self.assertEqual(self.loans.available_funds(), 1500.0)
+        self.assertRaisesRegex(services.ServiceError, "not found", self.loans.update, 'NONE', LOAN)
+
+    def test_delete_returns_funds_and_repayments(self):
+        loan_id = self.loans.add(LOAN)
+        services.RepaymentService(self.conn).add(loan_id, '100', '2025-02-01')
+        self.loans.delete(loan_id)
+        self.assertEqual(self.loans.available_funds(), 1500.0)
+        self.assertEqual(self.row("SELECT COUNT(*) FROM repayments")[0], 0)
+
+
+class RepaymentServiceTest(FundedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loan_id = self.loans.add(LOAN)
+        self.repayments = services.RepaymentService(self.conn)
+
+    def test_amount_must_be_positive(self):
+        for amount in ('', 'ten', '0', '-5'):
+            self.assertRaisesRegex(services.ServiceError, "positive amount",
+                                   self.repayments.add, self.loan_id, amount, '2025-02-01')
+        self.assertRaisesRegex(services.ServiceError, "Loan not found", self.repayments.add, 'NONE', '10', '2025-02-01')
+
+    def test_repayments_stay_within_the_loan(self):
+        first = self.repayments.add(self.loan_id, '600', '2025-02-01')
+        with self.assertRaisesRegex(services.ServiceError, "Maximum payment allowed: 400.00"):
+            self.repayments.add(self.loan_id, '500', '2025-03-01')
+        second = self.repayments.add(self.loan_id, '400', '2025-03-01')
+        # The repayment being changed does not count against itself
+        self.repayments.update(first, self.loan_id, '550', '2025-02-01')
+        with self.assertRaisesRegex(services.ServiceError, "Maximum payment allowed: 450.00"):
+            self.repayments.update(second, self.loan_id, '700', '2025-03-01')
+        self.repayments.delete(first)
+        self.assertEqual(self.row("SELECT total_paid, outstanding FROM loan_balances WHERE loan_id = ?",
+                                  self.loan_id), (400.0, 600.0))
+        self.assertRaisesRegex(services.ServiceError, "no longer exists",
+                               self.repayments.update, first, self.loan_id, '10', '2025-02-01')
+
+
+class ContributionServiceTest(FundedTestCase):
+
+    def test_amounts_are_stored_as_plain_rupees(self):
+        self.assertEqual(self.row("SELECT amount, amount_paise FROM contributions"), ('1500.00', 150000))
+        credit_id = self.contributions.add_credit('A B', '₹200.50', '2025-01-20', 'Refund')
+        self.assertEqual(self.contributions.member_credits('A B'), 200.5)
+        self.assertEqual(self.contributions.net_total(), (1299.5, 1500.0, 200.5))
+        self.contributions.update_credit(credit_id, 'A B', '1,000', '2025-01-20', 'Refund')
+        self.assertEqual(self.contributions.net_total()[0], 500.0)
+        self.contributions.delete_credit(credit_id)
+        self.assertEqual(self.contributions.net_total()[0], 1500.0)
+
+    def test_credit_needs_every_field(self):
+        self.assertRaisesRegex(services.ServiceError, "All fields",
+                               self.contributions.add_credit, 'A B', '100', '', 'Refund')
+        self.assertEqual(self.row("SELECT COUNT(*) FROM credits")[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
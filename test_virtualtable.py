@@ -0,0 +1,64 @@
+import sqlite3
+import unittest
+
+import indexes
+import schema
+from virtualtable import VirtualTable
+
+
+def pager(conn, table, columns, id_column, order_by, descending, page_size):
+    """A VirtualTable without its Treeview; only the paging queries are exercised"""
+    view = VirtualTable.__new__(VirtualTable)
+    view.table, view.columns, view.id_column = table, list(columns), id_column
+    view.order_by, view.descending, view.page_size = list(order_by), descending, page_size
+    view.cursor = conn.cursor()
+    return view
+
+
+class KeysetPagingTest(unittest.TestCase):
+    """Paging the repayments screen visits every row once, NULL dates included"""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        schema.apply_migrations(self.conn.cursor())
+        self.conn.execute("INSERT INTO loans (loan_id, applicant_name, group_name, loan_amount, purpose, "
+                          "duration_months, interest_rate, status) VALUES ('L1', 'A', 'G', 100000, 'P', 12, 0, 'Pending')")
+        dates = ['2025-01-0%d' % (i % 9 + 1) if i % 4 else None for i in range(23)]
+        self.conn.executemany("INSERT INTO repayments (loan_id, repay_amount, repay_date) VALUES ('L1', 1, ?)",
+                              [(date,) for date in dates])
+        self.view = pager(self.conn, 'repayments', ['id', 'repay_date'], 'id', (indexes.REPAYMENT_PAGE_KEY, 'id'),
+                          True, 5)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def walk(self, forward, key=None):
+        seen = []
+        while True:
+            sql, params = self.view._query(forward, key)
+            page = [self.view._split(row) for row in self.conn.execute(sql, params)]
+            seen += [iid for iid, _, _ in page]
+            if len(page) < self.view.page_size:
+                return seen
+            key = page[-1][1]
+
+    def test_pages_cover_every_row_once(self):
+        expected = [str(row[0]) for row in self.conn.execute(
+            "SELECT id FROM repayments ORDER BY COALESCE(repay_date, '') DESC, id DESC")]
+        self.assertEqual(len(expected), 23)
+        self.assertEqual(self.walk(True), expected)
+        # Paging back up from the last row returns the rest in reverse
+        last_key = ('', int(expected[-1]))
+        self.assertEqual(self.walk(False, last_key), expected[-2::-1])
+
+    def test_rows_above_a_key(self):
+        key = ('', 8)
+        condition, params = self.view._past(key, False)
+        above = self.conn.execute(f"SELECT COUNT(*) FROM repayments WHERE {condition}", params).fetchone()[0]
+        expected = self.conn.execute("SELECT COUNT(*) FROM repayments WHERE repay_date IS NOT NULL "
+                                     "OR id > 8").fetchone()[0]
+        self.assertEqual(above, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import argparse
+import time
+from datetime import date
+
+import db
+import money
+import schema
+
+# Trend breakdowns: label -> contribution_monthly column (None for the monthly total)
+BREAKDOWNS = {
+    'Total': None,
+    'Member': 'member_name',
+    'Type': 'contribution_type',
+    'Payment method': 'payment_method',
+}
+
+
+def last_months(count, end=None):
+    """The `count` months up to and including end's month (default this month), as 'YYYY-MM', oldest first"""
+    end = end or date.today()
+    index = end.year * 12 + end.month - 1
+    return [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(index - count + 1, index + 1)]
+
+
+class Trend:
+    """Verified collections per month, split into one series per breakdown value"""
+
+    def __init__(self, months):
+        self.months = months
+        # series name -> [(entries, paise) per month, in the order of months]
+        self.series = {}
+
+    def add(self, month, name, entries, paise):
+        values = self.series.setdefault(name, [(0, 0)] * len(self.months))
+        values[self.months.index(month)] = (entries, paise)
+
+    def totals(self):
+        """Paise collected per month across every series"""
+        return [sum(values[i][1] for values in self.series.values()) for i in range(len(self.months))]
+
+
+def monthly_trend(months=12, by=None, member=None, cursor=None, end=None):
+    """Collections over the last `months` months, read from contribution_monthly only
+
+    by is a BREAKDOWNS label; member restricts the trend to one member's
+    contributions. The rollup holds one row per month and member, type and
+    payment method, so a year's trend reads a few hundred rows however many
+    contributions there are.
+    """
+    column = BREAKDOWNS.get(by)
+    trend = Trend(last_months(months, end))
+    sql = (f"SELECT month, {column or 'NULL'}, SUM(entries), SUM(amount_paise) FROM contribution_monthly "
+           f"WHERE month >= ? AND month <= ?")
+    params = [trend.months[0], trend.months[-1]]
+    if member:
+        sql += " AND member_name = ?"
+        params.append(member)
+    sql += " GROUP BY month" + (f", {column}" if column else "")
+
+    cursor = cursor or db.get_cursor()
+    cursor.execute(sql, params)
+    for month, name, entries, paise in cursor.fetchall():
+        trend.add(month, name if column else 'Total', entries, paise)
+    return trend
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print monthly contribution trends from the rollup table")
+    parser.add_argument('--months', type=int, default=12, help="number of months up to this one")
+    parser.add_argument('--by', choices=list(BREAKDOWNS), default='Total', help="split the trend by this")
+    parser.add_argument('--member', help="only this member's contributions")
+    parser.add_argument('--rebuild', action='store_true', help="recompute the rollup from every contribution first")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        conn = db.get_connection()
+        schema.rebuild_contribution_rollup(conn.cursor())
+        conn.commit()
+    start = time.perf_counter()
+    result = monthly_trend(args.months, args.by, args.member)
+    print(f"Read the trend in {time.perf_counter() - start:.3f}s")
+    for name, values in sorted(result.series.items()):
+        print(name)
+        for month, (entries, paise) in zip(result.months, values):
+            print(f"  {month}: {entries} contributions, {money.format_rupees(paise)}")
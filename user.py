@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
-from datetime import datetime
+import db
+import importdialog
+import scrolling
+import services
+from virtualtable import VirtualTable
 
 class UserManagement:
     def __init__(self, parent_frame, bg_color, fg_color):
@@ -18,31 +22,9 @@ class UserManagement:
         self.create_ui()
 
     def setup_db(self):
-        self.conn = sqlite3.connect('shg_management.db')
+        self.conn = db.get_connection()
         self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id TEXT PRIMARY KEY,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                dob TEXT NOT NULL,
-                gender TEXT NOT NULL,
-                reg_date TEXT NOT NULL,
-                account_status TEXT NOT NULL,
-                primary_phone TEXT UNIQUE NOT NULL,
-                secondary_phone TEXT,
-                email TEXT UNIQUE,
-                emergency_contact TEXT NOT NULL,
-                street TEXT,
-                city TEXT,
-                state TEXT,
-                postal_code TEXT,
-                country TEXT,
-                is_phone_verified INTEGER DEFAULT 0,
-                is_email_verified INTEGER DEFAULT 0
-            )
-        ''')
-        self.conn.commit()
+        self.member_service = services.MemberService(self.conn)
 
     def create_ui(self):
         for widget in self.parent.winfo_children():
@@ -60,7 +42,8 @@ class UserManagement:
         self.canvas.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
 
-        self.canvas.bind_all("<MouseWheel>", lambda event: self.canvas.yview_scroll(int(-1*(event.delta/120)), "units"))
+        # Wheel scrolling only while the pointer is over this screen (it may be cached and hidden)
+        scrolling.bind_mousewheel(self.canvas)
 
         tk.Label(self.scrollable_frame, text="User Management", font=self.title_font, bg=self.bg_color, fg=self.fg_color).grid(row=0, column=0, columnspan=4, pady=20, sticky='w')
 
@@ -119,6 +102,7 @@ class UserManagement:
         tk.Button(button_frame, text="Update", command=self.update_user, bg=self.fg_color, fg='white', **button_config).pack(side='left', padx=10)
         tk.Button(button_frame, text="Clear", command=self.clear_form, bg=self.fg_color, fg='white', **button_config).pack(side='left', padx=10)
         tk.Button(button_frame, text="Delete", command=self.delete_user, bg='red', fg='white', **button_config).pack(side='left', padx=10)
+        tk.Button(button_frame, text="Import", command=self.import_users, bg=self.fg_color, fg='white', **button_config).pack(side='left', padx=10)
 
         table_frame = tk.LabelFrame(self.scrollable_frame, text="User Records", font=self.label_font, bg=self.bg_color, fg=self.fg_color)
         table_frame.grid(row=2, column=0, padx=20, pady=20, sticky='nsew')
@@ -149,6 +133,9 @@ class UserManagement:
         self.tree.column('Email', width=200, anchor='w')
         self.tree.heading('Email', text='Email')
 
+        self.table_view = VirtualTable(self.tree, 'users',
+                                       ['user_id', "first_name || ' ' || last_name AS name", 'primary_phone', 'account_status', 'email'], id_column='user_id',
+                                       numbered=True)
         self.tree.bind('<<TreeviewSelect>>', self.on_user_select)
 
         self.scrollable_frame.grid_columnconfigure(0, weight=1)
@@ -158,28 +145,10 @@ class UserManagement:
 
     def add_user(self):
         try:
-            now = datetime.now().strftime("%Y-%m-%d")
-            user_id = f"USR{int(datetime.now().timestamp())}"
-            self.entries['user_id'].config(state='normal')
-            self.entries['user_id'].delete(0, tk.END)
-            self.entries['user_id'].insert(0, user_id)
-            self.entries['user_id'].config(state='disabled')
-
-            self.entries['reg_date'].config(state='normal')
-            self.entries['reg_date'].delete(0, tk.END)
-            self.entries['reg_date'].insert(0, now)
-            self.entries['reg_date'].config(state='disabled')
-
-            data = {field: (entry.get() if isinstance(entry, tk.Entry) else entry.get()) for field, entry in self.entries.items()}
-
-            columns = ', '.join(data.keys())
-            placeholders = ', '.join(['?'] * len(data))
-            values = tuple(data.values())
-
-            self.cursor.execute(f"INSERT INTO users ({columns}) VALUES ({placeholders})", values)
-            self.conn.commit()
+            # Id, registration date and field clean-up come from the member service
+            data = {field: entry.get() for field, entry in self.entries.items() if field not in ['user_id', 'reg_date']}
+            self.member_service.add(data)
             messagebox.showinfo("Success", "User added successfully")
-            self.load_users()
             self.clear_form()
         except sqlite3.IntegrityError as e:
             messagebox.showerror("Error", f"Integrity error: {e}")
@@ -189,14 +158,9 @@ class UserManagement:
     def update_user(self):
         try:
             user_id = self.entries['user_id'].get()
-            data = {field: (entry.get() if isinstance(entry, tk.Entry) else entry.get()) for field, entry in self.entries.items() if field not in ['user_id', 'reg_date']}
-            updates = ', '.join([f"{key}=?" for key in data])
-            values = tuple(data.values()) + (user_id,)
-
-            self.cursor.execute(f"UPDATE users SET {updates} WHERE user_id=?", values)
-            self.conn.commit()
+            data = {field: entry.get() for field, entry in self.entries.items() if field not in ['user_id', 'reg_date']}
+            self.member_service.update(user_id, data)
             messagebox.showinfo("Success", "User updated successfully")
-            self.load_users()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -205,11 +169,8 @@ class UserManagement:
         if not selected_item:
             messagebox.showwarning("Warning", "Please select a user to delete")
             return
-        user_id = self.tree.item(selected_item)['values'][0]
-        self.cursor.execute("DELETE FROM users WHERE user_id=?", (user_id,))
-        self.conn.commit()
+        self.member_service.delete(self.tree.item(selected_item)['values'][0])
         messagebox.showinfo("Success", "User deleted successfully")
-        self.load_users()
         self.clear_form()
 
     def clear_form(self):
@@ -224,11 +185,11 @@ class UserManagement:
                 entry.set('')
 
     def load_users(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        self.cursor.execute("SELECT user_id, first_name || ' ' || last_name AS name, primary_phone, account_status, email FROM users")
-        for i, row in enumerate(self.cursor.fetchall(), start=1):
-            self.tree.insert('', 'end', text=str(i), values=row)
+        self.table_view.reload()
+
+    def import_users(self):
+        """Onboard members in bulk from a CSV or Excel sheet with the users column names as header"""
+        importdialog.ask_and_import(self.parent, 'users', self.bg_color, self.fg_color, lambda report: self.load_users())
 
     def on_user_select(self, event):
         selected_item = self.tree.selection()
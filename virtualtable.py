@@ -0,0 +1,292 @@
+import changes
+import datawatch
+import db
+
+# Rows fetched per query and the most rows kept in the Treeview at once
+PAGE_SIZE = 100
+MAX_PAGES = 3
+# Fraction of the scroll range from either end at which the next page is fetched
+LOAD_MARGIN = 0.1
+
+
+class VirtualTable:
+    """Treeview adapter that pages rows from SQLite with keyset pagination
+
+    Only a window of at most PAGE_SIZE * MAX_PAGES rows lives in the tree.
+    Scrolling near the bottom fetches the next page after the last key and
+    drops a page from the top; scrolling near the top does the reverse. The
+    order_by expressions must be unique together and never NULL (rowid by
+    default): a NULL breaks the (key) > (?, ?) comparison, so rows would be
+    skipped or repeated. Wrap a nullable column in COALESCE.
+
+    Items use the id_column value as their iid, and writes reported through
+    changes.publish(table, ...) update just the affected items in place.
+    Commits by other connections (see datawatch) refresh the loaded window.
+    """
+
+    def __init__(self, tree, table, columns, id_column='rowid', order_by=('rowid',), descending=False,
+                 formatter=None, numbered=False, page_size=PAGE_SIZE, conn=None):
+        self.tree = tree
+        self.table = table
+        self.id_column = id_column
+        self.columns = list(columns)
+        self.order_by = list(order_by)
+        self.descending = descending
+        self.formatter = formatter
+        self.numbered = numbered
+        self.page_size = page_size
+        self.max_rows = page_size * MAX_PAGES
+        self.cursor = (conn or db.get_connection()).cursor()
+
+        self.keys = {}
+        # iid -> values as last read, to spot rows changed by other connections
+        self.rows = {}
+        self.offset = 0
+        self.more_below = False
+        self._loading = False
+
+        # Route scroll notifications through us, still updating any scrollbar
+        self._scroll_target = tree.cget('yscrollcommand')
+        tree.configure(yscrollcommand=self._on_scroll)
+        changes.subscribe(table, self.apply_changes)
+        datawatch.get_watcher(tree).watch(self.cursor.connection, self.refresh)
+
+    def _select(self):
+        return f"SELECT {', '.join(self.order_by)}, {self.id_column}, {', '.join(self.columns)} FROM {self.table}"
+
+    def _past(self, key, descending):
+        """WHERE condition and parameters for the rows after key in the given direction"""
+        operator = '<' if descending else '>'
+        condition = f"({', '.join(self.order_by)}) {operator} ({', '.join('?' * len(key))})"
+        if len(key) == 1:
+            return condition, list(key)
+        # SQLite seeks an index on a plain column for a row-value comparison,
+        # but not one on an expression such as COALESCE; bounding the first
+        # expression on its own lets it seek either
+        return f"{self.order_by[0]} {operator}= ? AND {condition}", [key[0], *key]
+
+    def _query(self, forward, key):
+        """SELECT for one page after (forward) or before the given key"""
+        descending = self.descending if forward else not self.descending
+        direction = 'DESC' if descending else 'ASC'
+        sql = self._select()
+        params = []
+        if key is not None:
+            condition, params = self._past(key, descending)
+            sql += f" WHERE {condition}"
+        sql += f" ORDER BY {', '.join(f'{c} {direction}' for c in self.order_by)} LIMIT ?"
+        params.append(self.page_size)
+        return sql, params
+
+    def _split(self, row):
+        """Break a fetched row into (iid, order key, display values)"""
+        width = len(self.order_by)
+        return str(row[width]), tuple(row[:width]), row[width + 1:]
+
+    def _fetch(self, forward, key):
+        sql, params = self._query(forward, key)
+        self.cursor.execute(sql, params)
+        return [self._split(row) for row in self.cursor.fetchall()]
+
+    def _display(self, values):
+        return list(self.formatter(values) if self.formatter else values)
+
+    def _insert(self, index, iid, key, values, number):
+        self.tree.insert('', index, iid=iid, text=str(number) if self.numbered else '', values=self._display(values))
+        self.keys[iid] = key
+        self.rows[iid] = values
+
+    def _delete(self, items):
+        self.tree.delete(*items)
+        for item in items:
+            del self.keys[item]
+            del self.rows[item]
+
+    def reload(self):
+        """Drop every row and show the first page again"""
+        self._delete(self.tree.get_children())
+        self.offset = 0
+        page = self._fetch(True, None)
+        for i, (iid, key, values) in enumerate(page, start=1):
+            self._insert('end', iid, key, values, i)
+        self.more_below = len(page) == self.page_size
+        self.tree.yview_moveto(0)
+
+    def show_row(self, iid):
+        """Select and scroll to a row, loading the window around it if it is not loaded"""
+        iid = str(iid)
+        if not self.tree.exists(iid):
+            self.cursor.execute(f"SELECT {', '.join(self.order_by)} FROM {self.table} WHERE {self.id_column} = ?", (iid,))
+            row = self.cursor.fetchone()
+            if row is None:
+                return False
+            key = tuple(row)
+            # Rows before this one, to keep the row numbers right
+            condition, params = self._past(key, not self.descending)
+            self.cursor.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {condition}", params)
+            self._delete(self.tree.get_children())
+            self.offset = self.cursor.fetchone()[0]
+            self.cursor.execute(f"{self._select()} WHERE {self.id_column} = ?", (iid,))
+            _, _, values = self._split(self.cursor.fetchone())
+            self._insert('end', iid, key, values, self.offset + 1)
+            self.more_below = True
+            self._load_below()
+            if self.offset > 0:
+                self._load_above()
+        self.tree.selection_set(iid)
+        self.tree.see(iid)
+        return True
+
+    def _load_below(self):
+        items = self.tree.get_children()
+        if not items:
+            return
+        top = round(self.tree.yview()[0] * len(items))
+        page = self._fetch(True, self.keys[items[-1]])
+        number = self.offset + len(items)
+        for i, (iid, key, values) in enumerate(page, start=1):
+            self._insert('end', iid, key, values, number + i)
+        self.more_below = len(page) == self.page_size
+
+        items = self.tree.get_children()
+        excess = len(items) - self.max_rows
+        if excess > 0:
+            self._delete(items[:excess])
+            self.offset += excess
+            self.tree.yview_moveto(max(top - excess, 0) / (len(items) - excess))
+
+    def _load_above(self):
+        items = self.tree.get_children()
+        if not items:
+            return
+        # Keep the rows on screen in place while the page lands above them
+        top = round(self.tree.yview()[0] * len(items))
+        page = self._fetch(False, self.keys[items[0]])
+        for i, (iid, key, values) in enumerate(page):
+            self._insert(0, iid, key, values, self.offset - i)
+        self.offset -= len(page)
+
+        items = self.tree.get_children()
+        top += len(page)
+        excess = len(items) - self.max_rows
+        if excess > 0:
+            self._delete(items[-excess:])
+            self.more_below = True
+        self.tree.yview_moveto(top / len(self.tree.get_children()))
+
+    def _precedes(self, a, b):
+        return a > b if self.descending else a < b
+
+    def _position(self, key, items):
+        """Index at which a row with this key belongs in the loaded window"""
+        low, high = 0, len(items)
+        while low < high:
+            middle = (low + high) // 2
+            if self._precedes(self.keys[items[middle]], key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def apply_changes(self, ids):
+        """Insert, update, move or remove only the items for the given primary keys
+
+        Rows outside the loaded window are left for paging to pick up; the row
+        numbers of a numbered table are only shifted for rows known to be above it.
+        """
+        if not self.tree.winfo_exists():
+            return
+        self.cursor.execute(f"{self._select()} WHERE {self.id_column} IN ({', '.join('?' * len(ids))})", ids)
+        rows = {iid: (key, values) for iid, key, values in map(self._split, self.cursor.fetchall())}
+
+        first_changed = None
+        for iid in dict.fromkeys(str(i) for i in ids):
+            if self.tree.exists(iid):
+                index = self.tree.index(iid)
+                if iid in rows and rows[iid][0] == self.keys[iid]:
+                    self.tree.item(iid, values=self._display(rows[iid][1]))
+                    self.rows[iid] = rows[iid][1]
+                    continue
+                # Deleted, or its sort key changed: take it out and re-place it below
+                self._delete([iid])
+                first_changed = index if first_changed is None else min(first_changed, index)
+            if iid not in rows:
+                continue
+
+            key, values = rows[iid]
+            items = self.tree.get_children()
+            if items and self.offset > 0 and self._precedes(key, self.keys[items[0]]):
+                self.offset += 1
+                continue
+            if items and self.more_below and self._precedes(self.keys[items[-1]], key):
+                continue
+            index = self._position(key, items)
+            self._insert(index, iid, key, values, 0)
+            first_changed = index if first_changed is None else min(first_changed, index)
+
+        items = self.tree.get_children()
+        if len(items) > self.max_rows:
+            self._delete(items[self.max_rows:])
+            self.more_below = True
+        if self.numbered and first_changed is not None:
+            for number, item in enumerate(items[first_changed:self.max_rows], start=self.offset + first_changed + 1):
+                self.tree.item(item, text=str(number))
+
+    def refresh(self):
+        """Bring the loaded window up to date after writes that were not published here
+
+        The window is read again from its first row and only rows that were
+        added, changed or removed go through apply_changes, so the scroll
+        position and selection survive.
+        """
+        if not self.tree.winfo_exists():
+            return
+        items = self.tree.get_children()
+        if not items:
+            self.reload()
+            return
+
+        if self.numbered and self.offset > 0:
+            # Rows added or removed above the window shift its numbering
+            condition, params = self._past(self.keys[items[0]], not self.descending)
+            self.cursor.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {condition}", params)
+            offset = self.cursor.fetchone()[0]
+            if offset != self.offset:
+                self.offset = offset
+                for number, item in enumerate(items, start=offset + 1):
+                    self.tree.item(item, text=str(number))
+
+        # From the table's start when the window is at the top, so rows added there show up
+        sql, params = self._query(True, self.keys[items[0]] if self.offset > 0 else None)
+        params[-1] = max(len(items), self.page_size)
+        self.cursor.execute(sql, params)
+        fresh = {iid: (key, values) for iid, key, values in map(self._split, self.cursor.fetchall())}
+
+        changed = [iid for iid, (key, values) in fresh.items()
+                   if iid not in self.keys or self.keys[iid] != key or self.rows[iid] != values]
+        # Gone, moved, or (the first row, which the query starts after) not re-read
+        changed += [iid for iid in items if iid not in fresh]
+        if changed:
+            self.apply_changes(changed)
+
+    def _on_scroll(self, first, last):
+        if self._scroll_target:
+            self.tree.tk.call(*self.tree.tk.splitlist(self._scroll_target), first, last)
+        if self._loading:
+            return
+        if float(last) >= 1 - LOAD_MARGIN and self.more_below:
+            self._schedule(self._load_below)
+        elif float(first) <= LOAD_MARGIN and self.offset > 0:
+            self._schedule(self._load_above)
+
+    def _schedule(self, load):
+        # Inserting rows fires yscrollcommand again; load outside the callback
+        self._loading = True
+
+        def run():
+            try:
+                load()
+            finally:
+                self._loading = False
+
+        self.tree.after_idle(run)